@@ -0,0 +1,5 @@
+"""
+Benchmark suite for Ninja Analyzer.
+
+Run with ``python -m benchmarks.run``.
+"""
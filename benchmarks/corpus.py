@@ -0,0 +1,74 @@
+"""
+Deterministic HTML corpus for analyzer benchmarks.
+
+Documents are assembled from a weighted mix of fragments that resemble real
+pages (navigation, article text, images, inline and external scripts and
+styles, forms) so the regex analyzers see realistic match densities.
+"""
+
+from typing import Dict, List, Tuple
+import random
+
+
+SIZES: Dict[str, int] = {
+    "10KB": 10 * 1024,
+    "100KB": 100 * 1024,
+    "1MB": 1024 * 1024,
+    "10MB": 10 * 1024 * 1024,
+    "50MB": 50 * 1024 * 1024,
+}
+
+QUICK_SIZES = ("10KB", "100KB", "1MB")
+
+HEAD = (
+    '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+    '<meta name="viewport" content="width=device-width, initial-scale=1">'
+    '<meta name="description" content="Benchmark document">'
+    "<title>Benchmark page</title>"
+    '<link rel="preload" href="/css/critical.css" as="style">'
+    '<link href="/css/main.css" rel="stylesheet">'
+    '<link rel="stylesheet" href="/css/theme.css">'
+    '<script src="/js/vendor.js"></script>'
+    "<style>body{margin:0;font-family:sans-serif}</style>"
+    "</head><body>"
+)
+TAIL = "</body></html>"
+
+# (weight, template) pairs; {n} is replaced by a running counter.
+FRAGMENTS: List[Tuple[int, str]] = [
+    (30, '<div class="row"><div class="col"><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit {n}.</p></div></div>'),
+    (15, '<a href="/article/{n}" class="link">Read article {n}</a>'),
+    (10, '<img src="/img/photo-{n}.jpg" alt="Photo {n}" width="640" height="480">'),
+    (6, '<img src="/img/lazy-{n}.webp" loading="lazy" alt="Lazy {n}">'),
+    (5, '<script src="/js/widget-{n}.js" defer></script>'),
+    (4, "<script>window.__state_{n} = {{id: {n}, ready: true}};</script>"),
+    (4, '<div style="color:#333;padding:4px" data-id="{n}"><span>Inline styled {n}</span></div>'),
+    (3, '<link href="/css/component-{n}.css" rel="stylesheet">'),
+    (3, '<form action="/search"><input type="text" name="q{n}"><button>Go</button></form>'),
+    (2, '<iframe src="https://ads.example.com/slot/{n}" width="300" height="250"></iframe>'),
+    (2, '<a href="http://legacy.example.com/{n}">legacy link</a>'),
+    (1, "<style>.c{n}{{display:flex;gap:8px}}</style>"),
+]
+
+
+def generate_html(size: int, seed: int = 1234) -> str:
+    """Return a document of at least ``size`` bytes; same seed, same document."""
+    rng = random.Random(seed)
+    weights = [w for w, _ in FRAGMENTS]
+    templates = [t for _, t in FRAGMENTS]
+    parts = [HEAD]
+    total = len(HEAD) + len(TAIL)
+    n = 0
+    while total < size:
+        chunk = rng.choices(templates, weights=weights, k=64)
+        for template in chunk:
+            piece = template.format(n=n)
+            n += 1
+            parts.append(piece)
+            total += len(piece)
+    parts.append(TAIL)
+    return "".join(parts)
+
+
+def build_corpus(names=QUICK_SIZES, seed: int = 1234) -> Dict[str, str]:
+    return {name: generate_html(SIZES[name], seed) for name in names}
@@ -0,0 +1,51 @@
+"""
+In-process HTTP server serving fixed payloads for client benchmarks.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+import threading
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    payloads: Dict[str, Tuple[bytes, str]] = {}
+
+    def do_GET(self) -> None:
+        entry = self.payloads.get(self.path)
+        if entry is None:
+            self.send_error(404)
+            return
+        body, content_type = entry
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "max-age=60")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class LocalServer:
+    """Serve ``{path: (body, content_type)}`` on an ephemeral localhost port."""
+
+    def __init__(self, payloads: Dict[str, Tuple[bytes, str]]) -> None:
+        handler = type("BenchHandler", (_Handler,), {"payloads": dict(payloads)})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "LocalServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,217 @@
+"""
+Run the benchmark suite and compare against a stored baseline.
+
+    python -m benchmarks.run                      # quick corpus, print table
+    python -m benchmarks.run --full               # include the 10 MB / 50 MB documents
+    python -m benchmarks.run -o results.json      # save results
+    python -m benchmarks.run --update-baseline    # store results as the new baseline
+
+Every benchmark takes at least ``MIN_ROUNDS`` timed rounds per pass and the
+suite runs ``--repeats`` passes (default 3). A benchmark is compared on its
+fastest round, the statistic least disturbed by other load on the machine,
+taken as the median over the passes. The spread of that value between passes
+is its ``noise``. A benchmark regresses only when it is slower than the
+baseline by more than ``--threshold`` (default 10%) and by more than
+``NOISE_FACTOR`` times the larger of its baseline and current noise; then
+the run exits with status 1.
+
+``benchmarks/baseline.json`` holds quick-corpus numbers from the machine in
+its ``meta`` block. Timings only compare on the same hardware, so on
+another machine (or without the file) run once with ``--update-baseline``
+before comparing; without a baseline nothing is compared and the run exits 0.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks.corpus import QUICK_SIZES, SIZES, build_corpus
+from benchmarks.local_server import LocalServer
+from src.services.http_client import HttpClient
+from src.services.speed_engine import SpeedEngine
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+MIN_ROUNDS = 15
+NOISE_FACTOR = 3.0
+
+
+def measure(fn: Callable[[], Any], min_time: float = 0.5, min_rounds: int = MIN_ROUNDS,
+            max_rounds: int = 1000) -> Dict[str, Any]:
+    """Time ``fn`` repeatedly after one warm-up call; returns ns statistics."""
+    fn()
+    samples: List[int] = []
+    gc.collect()
+    started = time.perf_counter()
+    while len(samples) < max_rounds and (len(samples) < min_rounds or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - t0)
+    samples.sort()
+    n = len(samples)
+    return {
+        "rounds": n,
+        "min_ns": samples[0],
+        "median_ns": samples[n // 2],
+        "p95_ns": samples[min(n - 1, int(n * 0.95))],
+        "mean_ns": sum(samples) // n,
+    }
+
+
+def bench_analyzers(corpus: Dict[str, str], results: Dict[str, Any], min_time: float) -> None:
+    engine = SpeedEngine(browser_test=False)
+    for name, html in corpus.items():
+        size = len(html.encode("utf-8"))
+        # The 10 MB / 50 MB documents of --full take seconds per round
+        rounds = 3 if size > 5 * 1024 * 1024 else MIN_ROUNDS
+        cases = {
+            f"analyzers.content_structure[{name}]": lambda: engine.AnalyzeContentStructure(html),
+            f"analyzers.best_practices[{name}]": lambda: engine.AnalyzeHtmlBestPractices(html),
+            f"analyzers.simulate_full_load[{name}]": lambda: engine.SimulateFullPageLoad(html, 100.0),
+        }
+        for key, fn in cases.items():
+            results[key] = {**measure(fn, min_time=min_time, min_rounds=rounds), "bytes": size}
+
+
+def bench_http(server: LocalServer, results: Dict[str, Any], min_time: float) -> None:
+    client = HttpClient()
+    for path in ("/payload/1KB", "/payload/100KB", "/payload/1MB"):
+        url = server.base_url + path
+        results[f"http_client.get[{path.rsplit('/', 1)[-1]}]"] = measure(lambda: client.get(url), min_time=min_time)
+
+
+def bench_engine(server: LocalServer, corpus: Dict[str, str], results: Dict[str, Any], min_time: float) -> None:
+    for deep in (False, True):
+        engine = SpeedEngine(deep_test=deep, browser_test=False)
+        for name in corpus:
+            url = f"{server.base_url}/page/{name}"
+            key = f"engine.run_test[{'deep' if deep else 'basic'},{name}]"
+            results[key] = measure(lambda: engine.RunTest(url), min_time=min_time)
+
+
+def merge_passes(passes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    One entry per benchmark from several passes of the suite.
+
+    Statistics are the median over passes; ``noise`` is the relative spread
+    of ``min_ns`` between passes, a standard deviation estimated from the
+    median absolute deviation so one disturbed pass does not inflate it
+    (0 with a single pass).
+    """
+    merged: Dict[str, Any] = {}
+    for key, first in passes[0].items():
+        runs = [p[key] for p in passes if key in p]
+        entry = dict(first)
+        for stat in ("rounds", "min_ns", "median_ns", "p95_ns", "mean_ns"):
+            values = sorted(run[stat] for run in runs)
+            entry[stat] = values[len(values) // 2]
+        deviations = sorted(abs(run["min_ns"] - entry["min_ns"]) for run in runs)
+        entry["noise"] = round(1.4826 * deviations[len(deviations) // 2] / max(1, entry["min_ns"]), 4)
+        entry["passes"] = len(runs)
+        merged[key] = entry
+    return merged
+
+
+def run_suite(full: bool = False, min_time: float = 0.5, only: Optional[str] = None,
+              repeats: int = 3) -> Dict[str, Any]:
+    corpus = build_corpus(SIZES if full else QUICK_SIZES)
+    payloads = {f"/page/{name}": (html.encode("utf-8"), "text/html; charset=utf-8") for name, html in corpus.items()}
+    for label, size in (("1KB", 1024), ("100KB", 100 * 1024), ("1MB", 1024 * 1024)):
+        payloads[f"/payload/{label}"] = (b"x" * size, "application/octet-stream")
+    passes: List[Dict[str, Any]] = []
+    with LocalServer(payloads) as server:
+        for _ in range(max(1, repeats)):
+            results: Dict[str, Any] = {}
+            if only in (None, "analyzers"):
+                bench_analyzers(corpus, results, min_time)
+            if only in (None, "http"):
+                bench_http(server, results, min_time)
+            if only in (None, "engine"):
+                bench_engine(server, corpus, results, min_time)
+            passes.append(results)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "full": full,
+            "repeats": len(passes),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "benchmarks": merge_passes(passes),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    rows = []
+    for key, stats in current["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(key)
+        if not base:
+            continue
+        ratio = stats["min_ns"] / max(1, base["min_ns"])
+        # Older baselines carry no noise figure; they fall back to the flat threshold
+        allowed = max(threshold, NOISE_FACTOR * max(base.get("noise", 0.0), stats.get("noise", 0.0)))
+        rows.append({"benchmark": key, "ratio": ratio, "allowed": allowed, "regression": ratio > 1 + allowed})
+    return rows
+
+
+def format_table(report: Dict[str, Any], comparison: List[Dict[str, Any]]) -> str:
+    ratios = {row["benchmark"]: row for row in comparison}
+    lines = [f"{'benchmark':<48}{'rounds':>8}{'min ms':>10}{'median ms':>12}{'noise':>8}{'vs base':>10}{'allowed':>9}"]
+    for key, stats in report["benchmarks"].items():
+        row = ratios.get(key)
+        delta = f"{(row['ratio'] - 1) * 100:+.1f}%" if row else "-"
+        allowed = f"{row['allowed'] * 100:.0f}%" if row else "-"
+        flag = "  REGRESSION" if row and row["regression"] else ""
+        lines.append(
+            f"{key:<48}{stats['rounds']:>8}{stats['min_ns'] / 1e6:>10.3f}{stats['median_ns'] / 1e6:>12.3f}"
+            f"{stats.get('noise', 0.0) * 100:>7.1f}%{delta:>10}{allowed:>9}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Ninja Analyzer benchmarks")
+    parser.add_argument("--full", action="store_true", help="Include the 10 MB and 50 MB documents")
+    parser.add_argument("--only", choices=("analyzers", "http", "engine"), help="Run a single group")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds spent per benchmark and pass")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the suite (noise is measured between them)")
+    parser.add_argument("-o", "--output", help="Write results JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Save these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Smallest slowdown of the fastest round reported (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    report = run_suite(full=args.full, min_time=args.min_time, only=args.only, repeats=args.repeats)
+    comparison: List[Dict[str, Any]] = []
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            comparison = compare(report, json.load(fh), args.threshold)
+    elif not args.update_baseline:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one", file=sys.stderr)
+    report["comparison"] = comparison
+    print(format_table(report, comparison))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump({k: v for k, v in report.items() if k != "comparison"}, fh, indent=2)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+
+    regressions = [row for row in comparison if row["regression"]]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed beyond their noise and {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
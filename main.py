@@ -6,12 +6,44 @@ This application provides website analysis capabilities including:
 - Speed analysis
 - SEO analysis  
 - Bug detection
+
+Run without arguments to start the desktop UI, or use a subcommand for
+headless work:
+
+    python main.py batch urls.txt --processes 4 --threads 8 -o results.jsonl
+    python main.py serve --port 8080 --workers 4
+    python main.py netem --profile 3G --port 8899
+    python main.py record https://example.com -o example.zip
+    python main.py replay example.zip https://example.com --tests 100
+    python main.py third-party https://example.com --samples 7 --top 3
+    python main.py train-model results.jsonl -o load_model.json
+    python main.py rescore results.jsonl -o rescored.jsonl
+    python main.py archive import history results.jsonl
+    python main.py archive summary history --since 2026-01-01
+    python main.py batch urls.txt --load-model load_model.json -o estimates.jsonl
+    python main.py export results.jsonl -o results.csv
+    python main.py monitor targets.txt --archive history --interval 300 --workers 8
+    python main.py monitor targets.txt --archive history --detect regressions.npz
+    python main.py regressions history --since 2026-01-01
+
+Headless subcommands do not need Flet installed.
 """
 
-import flet as ft
-from src.config.fonts import ApplyFontTheme
-from src.components.sidebar import SidebarComponent
-from src.components.main_content import MainContentComponent
+from __future__ import annotations
+
+import argparse
+import sys
+from src.services.browser_pool import THROTTLING_PROFILES
+from src.services.netem import PROFILES
+
+try:
+    import flet as ft
+    from src.config.fonts import ApplyFontTheme
+    from src.components.sidebar import SidebarComponent
+    from src.components.main_content import MainContentComponent
+except ImportError:
+    # Headless subcommands (batch, serve, monitor, ...) run without the UI dependencies
+    ft = None
 
 class NinjaAnalyzerApp:
     """
@@ -109,5 +141,493 @@ def main(page: ft.Page):
     app = NinjaAnalyzerApp()
     app.SetupPage(page)
 
+def RunBatchCommand(args):
+    """
+    Run the headless batch analysis described by parsed CLI arguments.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``batch`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    from src.services.batch_runner import run_batch
+    from src.services.load_model import LoadTimeModel
+    
+    summary = run_batch(
+        args.input,
+        output_path=args.output,
+        checkpoint_path=args.checkpoint,
+        processes=args.processes,
+        threads=args.threads,
+        test_count=args.tests,
+        engine_options={
+            'deep_test': args.deep,
+            'browser_test': args.browser,
+            'mobile_test': args.mobile,
+            'budget_s': args.budget or None,
+            'network_profile': args.network_profile,
+            'throttling': args.throttling,
+            'har_dir': args.har_dir,
+            'repeat_view': args.repeat_view,
+            'visual_metrics': args.visual_metrics,
+            'cpu_profile': args.cpu_profile,
+            'coverage': args.coverage,
+            'third_party': args.third_party,
+            'render_blocking': args.render_blocking,
+            'load_model': LoadTimeModel.load(args.load_model) if args.load_model else None,
+        },
+        scheduler_limits={
+            'per_host_limit': args.per_host,
+            'browser_slots': args.browser_slots,
+        },
+        rate_limit=args.rate or None,
+        trace_path=args.trace,
+    )
+    print(
+        f"Analyzed: {summary['analyzed']}, failed: {summary['failed']}, skipped: {summary['skipped']}",
+        file=sys.stderr
+    )
+    if summary.get('trace_summary'):
+        print(summary['trace_summary'], file=sys.stderr)
+    return 0
+
+def RunServeCommand(args):
+    """
+    Run the embedded HTTP API server until interrupted.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``serve`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    from src.services.api_server import run_server
+    
+    print(f"Serving analysis API on http://{args.host}:{args.port}", file=sys.stderr)
+    run_server(host=args.host, port=args.port, workers=args.workers, max_queue=args.queue_size)
+    return 0
+
+def RunNetemCommand(args):
+    """
+    Run a standalone throttling proxy for external tools.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``netem`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    import asyncio
+    from src.services.netem import NetworkEmulator, get_profile
+    
+    emulator = NetworkEmulator(get_profile(args.profile), host=args.host, port=args.port, seed=args.seed)
+    print(f"Emulating {args.profile} on proxy http://{args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(emulator.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def RunRecordCommand(args):
+    """
+    Load a URL once and record every response into an archive.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``record`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    from src.services.replay import ReplayArchive
+    from src.services.speed_engine import SpeedEngine
+    from src.utils.url import normalize_url
+    
+    url = normalize_url(args.url)
+    with ReplayArchive.record(args.output) as archive:
+        engine = SpeedEngine(archive=archive, browser_test=args.browser, mobile_test=args.mobile)
+        try:
+            engine.RunTest(url)
+        finally:
+            engine.browser_pool.close_thread()
+        print(f"Recorded {archive.count} responses to {args.output}", file=sys.stderr)
+    return 0
+
+def RunReplayCommand(args):
+    """
+    Repeat a recorded load offline and print per-test timings as JSON lines.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``replay`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    import json
+    from src.services.replay import ReplayArchive
+    from src.services.speed_engine import SpeedEngine
+    from src.utils.url import normalize_url
+    
+    latency = args.latency
+    if latency not in (None, "recorded"):
+        latency = float(latency)
+    url = normalize_url(args.url)
+    with ReplayArchive.replay(args.archive, latency=latency) as archive:
+        engine = SpeedEngine(archive=archive, browser_test=args.browser, mobile_test=args.mobile)
+        try:
+            for result in engine.RunTests(url, args.tests):
+                print(json.dumps({
+                    'test_number': result.test_number,
+                    'response_time': result.response_time,
+                    'full_load_time': result.full_load_time.get('total_load_time'),
+                }))
+        finally:
+            engine.browser_pool.close_thread()
+    return 0
+
+def RunTrainModelCommand(args):
+    """
+    Fit the full-load model on batch results and save it.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``train-model`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    import json
+    from src.services.load_model import LoadTimeModel, read_records, training_pairs
+    
+    X, y = training_pairs(read_records(args.results))
+    try:
+        model = LoadTimeModel.fit(X, y, alpha=args.alpha)
+    except ValueError as ex:
+        print(f"Cannot train: {ex}", file=sys.stderr)
+        return 1
+    model.save(args.output)
+    print(json.dumps({'samples': model.samples, **model.metrics}))
+    return 0
+
+def RunRescoreCommand(args):
+    """
+    Recompute grades of stored batch results with the current scoring tables.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``rescore`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    import json
+    from src.services import scoring
+    from src.services.load_model import read_records
+    
+    records = list(read_records([args.input]))
+    # Only deep results carry a grade and the headers it was computed from
+    graded = [r for record in records for r in record.get('results') or () if 'performance_grade' in r]
+    columns = scoring.result_columns(graded)
+    scores, grades = scoring.performance_grades(columns['response_time'], columns['content_size'], columns['header_mask'])
+    security, security_grades = scoring.security_scores(columns['header_mask'])
+    for result, score, grade, sec, sec_grade in zip(graded, scores.tolist(), grades.tolist(),
+                                                    security.tolist(), security_grades.tolist()):
+        result['performance_grade'] = {'score': score, 'grade': grade}
+        result['security_headers'].update(score=sec, grade=sec_grade)
+    with open(args.output, "w", encoding="utf-8") as out:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    print(f"Rescored {len(graded)} results", file=sys.stderr)
+    return 0
+
+def RunArchiveCommand(args):
+    """
+    Import batch output into a result archive, summarize it or compact it.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``archive`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    import json
+    from datetime import datetime
+    from src.services.result_archive import ResultArchive, import_batch_output
+    
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    if args.action == "summary":
+        archive = ResultArchive(args.archive, readonly=True)
+        for row in archive.summarize_by_url(args.field, start=since):
+            print(json.dumps(row))
+        return 0
+    with ResultArchive(args.archive) as archive:
+        if args.action == "import":
+            added = import_batch_output(archive, args.inputs)
+            print(f"Imported {added} results ({len(archive)} in archive)", file=sys.stderr)
+        else:
+            kept = archive.compact(before=since)
+            print(f"Kept {kept} results", file=sys.stderr)
+    return 0
+
+def RunExportCommand(args):
+    """
+    Stream batch results into a flat JSONL, CSV, Arrow or Parquet file.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``export`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    from src.services.exporters import CsvExporter, JsonlExporter, export_format, open_exporter
+    from src.services.load_model import read_records
+    
+    results = (r for record in read_records(args.inputs) for r in record.get('results') or ())
+    if args.output == "-":
+        fmt = args.format or "jsonl"
+        if fmt not in ("jsonl", "csv"):
+            print(f"{fmt} output needs a file", file=sys.stderr)
+            return 2
+        exporter = CsvExporter(sys.stdout) if fmt == "csv" else JsonlExporter(sys.stdout)
+    else:
+        try:
+            exporter = open_exporter(args.output, export_format(args.output, args.format))
+        except ImportError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+    with exporter:
+        written = exporter.write_all(results)
+    print(f"Exported {written} results", file=sys.stderr)
+    return 0
+
+def RunMonitorCommand(args):
+    """
+    Re-analyze the configured URLs on their intervals until interrupted.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``monitor`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    import json
+    from src.services.monitor import run_monitor
+    
+    stats = run_monitor(
+        args.config,
+        args.archive,
+        default_interval_s=args.interval,
+        status_every_s=args.status_every,
+        duration_s=args.duration,
+        detector_state=args.detect,
+        workers=args.workers,
+        jitter=args.jitter,
+        max_backoff_s=args.max_backoff,
+        rate_limit=args.rate or None,
+        engine_options={
+            'deep_test': args.deep,
+            'browser_test': args.browser,
+            'mobile_test': args.mobile,
+            'network_profile': args.network_profile,
+            'throttling': args.throttling,
+            'budget_s': args.budget or None,
+        },
+        scheduler_limits={
+            'per_host_limit': args.per_host,
+            'browser_slots': args.browser_slots,
+        },
+    )
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
+
+def RunRegressionsCommand(args):
+    """
+    Replay archived results through the regression detector and print its events.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``regressions`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    import json
+    from datetime import datetime
+    from src.services.regression import RegressionDetector, scan_archive
+    from src.services.result_archive import ResultArchive
+    
+    since = datetime.fromisoformat(args.since).timestamp() if args.since else None
+    detector = RegressionDetector(args.state)
+    archive = ResultArchive(args.archive, readonly=True)
+    try:
+        for event in scan_archive(detector, archive, start=since):
+            print(json.dumps(event))
+    finally:
+        archive.close()
+    if args.state:
+        detector.save()
+    for url, metric in detector.alarms():
+        print(f"Open regression: {url} {metric}", file=sys.stderr)
+    return 0
+
+def RunThirdPartyCommand(args):
+    """
+    Measure the load-time cost of third parties and print it as JSON.
+    
+    Args:
+        args (argparse.Namespace): Parsed ``third-party`` subcommand arguments
+        
+    Returns:
+        int: Process exit code
+    """
+    import json
+    from src.services.speed_engine import SpeedEngine
+    from src.utils.url import normalize_url
+    
+    engine = SpeedEngine(mobile_test=args.mobile, network_profile=args.network_profile, throttling=args.throttling)
+    try:
+        report = engine.MeasureThirdPartyImpact(
+            normalize_url(args.url), entities=args.block or None, samples=args.samples, top=args.top
+        )
+    finally:
+        engine.browser_pool.close_thread()
+    print(json.dumps(report, indent=2))
+    return 0 if report.get('fallback') is None else 1
+
+def BuildArgumentParser():
+    """
+    Build the command line parser for headless subcommands.
+    
+    Returns:
+        argparse.ArgumentParser: Configured parser
+    """
+    parser = argparse.ArgumentParser(prog="main.py", description="Ninja Analyzer")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    batch = subparsers.add_parser("batch", help="Analyze a list of URLs without the UI")
+    batch.add_argument("input", help="Text file with one URL per line")
+    batch.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    batch.add_argument("--checkpoint", help="File recording finished URLs, used to resume a run")
+    batch.add_argument("--processes", type=int, default=1, help="Worker processes")
+    batch.add_argument("--threads", type=int, default=4, help="Analysis threads per process")
+    batch.add_argument("--tests", type=int, default=1, help="Tests per URL")
+    batch.add_argument("--deep", action=argparse.BooleanOptionalAction, default=True, help="Deep analysis")
+    batch.add_argument("--browser", action=argparse.BooleanOptionalAction, default=False, help="Real browser load")
+    batch.add_argument("--mobile", action="store_true", help="Emulate a mobile device")
+    batch.add_argument("--network-profile", choices=[*PROFILES, "none"],
+                       help="Emulated network for every request (mobile runs default to 4G)")
+    batch.add_argument("--throttling", choices=[*THROTTLING_PROFILES, "none"],
+                       help="Browser CPU/network throttling (mobile runs default to mid-tier-mobile)")
+    batch.add_argument("--per-host", type=int, default=2, help="Concurrent analyses per host")
+    batch.add_argument("--browser-slots", type=int, default=2, help="Concurrent headless browsers per process")
+    batch.add_argument("--budget", type=float, default=60.0, help="Time budget per URL in seconds (0 disables)")
+    batch.add_argument("--rate", type=float, default=2.0, help="Requests per second per host (0 disables)")
+    batch.add_argument("--repeat-view", action="store_true", help="Also measure a warm-cache browser load")
+    batch.add_argument("--visual-metrics", action="store_true", help="Record a filmstrip and compute Speed Index")
+    batch.add_argument("--cpu-profile", action="store_true", help="Collect long tasks, TBT and script CPU time")
+    batch.add_argument("--coverage", action="store_true", help="Measure unused JS and CSS bytes")
+    batch.add_argument("--third-party", action="store_true", help="Group requests and script time by third party")
+    batch.add_argument("--render-blocking", action="store_true", help="Time render-blocking resources and the critical request chain")
+    batch.add_argument("--load-model", help="Model file from train-model for estimates without a browser")
+    batch.add_argument("--har-dir", help="Write one HAR file per test into this directory")
+    batch.add_argument("--trace", help="Write a Chrome trace of the analyzer's own stages to this file")
+    batch.set_defaults(handler=RunBatchCommand)
+    
+    serve = subparsers.add_parser("serve", help="Run the HTTP analysis API")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    serve.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    serve.add_argument("--workers", type=int, default=4, help="Concurrent analyses")
+    serve.add_argument("--queue-size", type=int, default=1000, help="Maximum queued jobs")
+    serve.set_defaults(handler=RunServeCommand)
+    
+    netem = subparsers.add_parser("netem", help="Run a throttling proxy with a network profile")
+    netem.add_argument("--profile", choices=list(PROFILES), default="4G", help="Network profile")
+    netem.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    netem.add_argument("--port", type=int, default=8899, help="Port to listen on")
+    netem.add_argument("--seed", type=int, default=0, help="Seed for jitter and loss")
+    netem.set_defaults(handler=RunNetemCommand)
+    
+    third_party = subparsers.add_parser("third-party", help="Measure what each third party costs in load time")
+    third_party.add_argument("url", help="URL to analyze")
+    third_party.add_argument("--block", action="append", help="Entity to block (repeatable; default: top third parties)")
+    third_party.add_argument("--top", type=int, default=3, help="Third parties picked when --block is not given")
+    third_party.add_argument("--samples", type=int, default=5, help="Baseline/blocked load pairs per entity")
+    third_party.add_argument("--mobile", action="store_true", help="Emulate a mobile device")
+    third_party.add_argument("--network-profile", choices=[*PROFILES, "none"], help="Emulated network")
+    third_party.add_argument("--throttling", choices=[*THROTTLING_PROFILES, "none"], help="Browser CPU/network throttling")
+    third_party.set_defaults(handler=RunThirdPartyCommand)
+    
+    train = subparsers.add_parser("train-model", help="Fit the no-browser load-time model on batch results")
+    train.add_argument("results", nargs="+", help="Batch JSONL output measured with the browser")
+    train.add_argument("-o", "--output", required=True, help="Model file to write")
+    train.add_argument("--alpha", type=float, default=1.0, help="Ridge regularization strength")
+    train.set_defaults(handler=RunTrainModelCommand)
+    
+    rescore = subparsers.add_parser("rescore", help="Recompute grades of stored batch results")
+    rescore.add_argument("input", help="Batch JSONL output")
+    rescore.add_argument("-o", "--output", required=True, help="JSONL file to write")
+    rescore.set_defaults(handler=RunRescoreCommand)
+    
+    export = subparsers.add_parser("export", help="Flatten batch results into JSONL, CSV, Arrow or Parquet")
+    export.add_argument("inputs", nargs="+", help="Batch JSONL output")
+    export.add_argument("-o", "--output", default="-", help="File to write; format follows the extension (default: stdout)")
+    export.add_argument("--format", choices=["jsonl", "csv", "arrow", "parquet"], help="Output format")
+    export.set_defaults(handler=RunExportCommand)
+    
+    archive = subparsers.add_parser("archive", help="Append-only result history")
+    archive.add_argument("action", choices=["import", "summary", "compact"], help="What to do with the archive")
+    archive.add_argument("archive", help="Archive path (without the .rec/.str suffix)")
+    archive.add_argument("inputs", nargs="*", help="Batch JSONL output to import")
+    archive.add_argument("--since", help="ISO date: summarize from / compact away everything before it")
+    archive.add_argument("--field", default="response_time", help="Metric to summarize")
+    archive.set_defaults(handler=RunArchiveCommand)
+    
+    monitor = subparsers.add_parser("monitor", help="Re-analyze a list of URLs on a schedule")
+    monitor.add_argument("config", help="Text file with one '<url> [interval seconds]' per line")
+    monitor.add_argument("--archive", required=True, help="Result archive to append to")
+    monitor.add_argument("--interval", type=float, default=300.0, help="Seconds between checks when a line gives none")
+    monitor.add_argument("--workers", type=int, default=8, help="Concurrent checks")
+    monitor.add_argument("--jitter", type=float, default=0.1, help="Random spread of each interval, as a fraction")
+    monitor.add_argument("--max-backoff", type=float, default=3600.0, help="Longest delay after repeated failures, in seconds")
+    monitor.add_argument("--deep", action=argparse.BooleanOptionalAction, default=True, help="Deep analysis")
+    monitor.add_argument("--browser", action=argparse.BooleanOptionalAction, default=False, help="Real browser load")
+    monitor.add_argument("--mobile", action="store_true", help="Emulate a mobile device")
+    monitor.add_argument("--network-profile", choices=[*PROFILES, "none"], help="Emulated network")
+    monitor.add_argument("--throttling", choices=[*THROTTLING_PROFILES, "none"], help="Browser CPU/network throttling")
+    monitor.add_argument("--per-host", type=int, default=2, help="Concurrent checks per host")
+    monitor.add_argument("--browser-slots", type=int, default=2, help="Concurrent headless browsers")
+    monitor.add_argument("--budget", type=float, default=60.0, help="Time budget per check in seconds (0 disables)")
+    monitor.add_argument("--rate", type=float, default=1.0, help="Requests per second per host (0 disables)")
+    monitor.add_argument("--status-every", type=float, default=60.0, help="Seconds between status lines on stderr (0 disables)")
+    monitor.add_argument("--duration", type=float, help="Stop after this many seconds")
+    monitor.add_argument("--detect", help="Regression detector state file; events are printed on stdout")
+    monitor.set_defaults(handler=RunMonitorCommand)
+    
+    regressions = subparsers.add_parser("regressions", help="Detect sustained regressions in a result archive")
+    regressions.add_argument("archive", help="Result archive written by monitor or archive import")
+    regressions.add_argument("--state", help="Detector state file to continue from and update")
+    regressions.add_argument("--since", help="ISO date: only feed results from then on")
+    regressions.set_defaults(handler=RunRegressionsCommand)
+    
+    record = subparsers.add_parser("record", help="Record a page load into a replay archive")
+    record.add_argument("url", help="URL to load")
+    record.add_argument("-o", "--output", required=True, help="Archive file to write")
+    record.add_argument("--browser", action=argparse.BooleanOptionalAction, default=True, help="Record the browser load too")
+    record.add_argument("--mobile", action="store_true", help="Emulate a mobile device")
+    record.set_defaults(handler=RunRecordCommand)
+    
+    replay = subparsers.add_parser("replay", help="Repeat a recorded load without the network")
+    replay.add_argument("archive", help="Archive written by the record command")
+    replay.add_argument("url", help="Recorded URL to load")
+    replay.add_argument("--tests", type=int, default=10, help="Number of loads")
+    replay.add_argument("--latency", help="Simulated latency: 'recorded' or milliseconds (default: none)")
+    replay.add_argument("--browser", action=argparse.BooleanOptionalAction, default=True, help="Replay the browser load too")
+    replay.add_argument("--mobile", action="store_true", help="Emulate a mobile device")
+    replay.set_defaults(handler=RunReplayCommand)
+    
+    return parser
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        cli_args = BuildArgumentParser().parse_args()
+        sys.exit(cli_args.handler(cli_args) if getattr(cli_args, "handler", None) else 0)
+    if ft is None:
+        sys.exit("The desktop UI needs Flet: pip install -r requirements.txt")
     ft.app(target=main)
\ No newline at end of file
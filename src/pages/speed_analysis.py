@@ -4,10 +4,14 @@ This module handles website speed analysis functionality similar to PageSpeed In
 """
 
 import flet as ft
-import time
 from src.pages.base_page import BasePage
 from src.services.http_client import HttpClient
-from src.utils.url import extract_host, normalize_url
+from src.services.render_blocking import describe_actions
+from src.services.results import ResultColumns
+from src.services.scheduler import PRIORITY_INTERACTIVE
+from src.services.speed_engine import SpeedEngine, DescribeError
+from src.utils.tracing import span
+from src.utils.url import normalize_url
 from src.utils.bytes import format_bytes
 
 class SpeedAnalysisPage(BasePage):
@@ -25,12 +29,14 @@ class SpeedAnalysisPage(BasePage):
         self.toggle_advanced = None
         super().__init__()
         self.http = HttpClient()
+        self.engine = SpeedEngine(http=self.http, priority=PRIORITY_INTERACTIVE, tenant="ui")
         
         # Advanced options state
         self.multiple_test = False
         self.deep_test = True
         self.browser_test = True
         self.mobile_test = False
+        self.render_blocking = False
         self.test_count = 3
         
     def CreateSpeedAnalysisPage(self):
@@ -165,6 +171,23 @@ class SpeedAnalysisPage(BasePage):
                             bgcolor=ft.Colors.WHITE,
                             border_radius=ft.border_radius.all(8),
                             border=ft.border.all(1, ft.Colors.CYAN_200)
+                        ),
+                        
+                        # Render-blocking option
+                        ft.Container(
+                            content=ft.Row([
+                                ft.Checkbox(
+                                    label="⛔ Render-Blocking Resources",
+                                    value=False,
+                                    on_change=self.OnRenderBlockingChange,
+                                    active_color=ft.Colors.CYAN_600
+                                ),
+                                ft.Text("(fetches blocking CSS/JS without a browser)", size=12, color=ft.Colors.GREY_600)
+                            ]),
+                            padding=15,
+                            bgcolor=ft.Colors.WHITE,
+                            border_radius=ft.border_radius.all(8),
+                            border=ft.border.all(1, ft.Colors.CYAN_200)
                         )
                     ], spacing=10),
                     padding=20
@@ -321,441 +344,29 @@ class SpeedAnalysisPage(BasePage):
             url (str): URL to analyze
         """
         try:
-            all_results = []
+            # Sync engine options with the current UI state
+            self.engine.deep_test = self.deep_test
+            self.engine.browser_test = self.browser_test
+            self.engine.mobile_test = self.mobile_test
+            self.engine.render_blocking = self.render_blocking
             
             # Perform multiple tests if enabled
             test_count = self.test_count if self.multiple_test else 1
-            
-            for i in range(test_count):
-                # Pre-request network measurements (DNS lookup)
-                dns_lookup_ms = None
-                try:
-                    host = extract_host(url)
-                    import socket
-                    _t0 = time.time()
-                    socket.getaddrinfo(host, None)
-                    _t1 = time.time()
-                    dns_lookup_ms = round((_t1 - _t0) * 1000, 2)
-                except Exception:
-                    dns_lookup_ms = None
-                # Add mobile user agent if mobile test is enabled
-                headers = {}
-                if self.mobile_test:
-                    headers['User-Agent'] = 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15'
-                # Encourage compression support (including br)
-                headers['Accept-Encoding'] = 'br, gzip, deflate'
-                
-                # Measure response via HttpClient
-                http_resp = self.http.get(url, headers=headers, allow_redirects=True)
-                response = http_resp.response
-                response_time = http_resp.elapsed_ms
-                # requests exposes time to first byte via elapsed
-                ttfb_ms = round(response.elapsed.total_seconds() * 1000, 2) if getattr(response, 'elapsed', None) else None
-                content_length = len(response.content)
-                status_code = response.status_code
-                
-                # Full page load: prefer real browser if enabled, else simulate
-                if self.browser_test:
-                    full_load_time = self.CollectRealBrowserMetrics(url, self.mobile_test)
-                else:
-                    full_load_time = self.SimulateFullPageLoad(response.text, response_time)
-                
-                # Calculate DOM Content Loaded time
-                dom_ready_time = self.CalculateDOMReadyTime(response_time, content_length)
-                
-                # Get response headers
-                response_headers = response.headers
-                content_type = response_headers.get('content-type', 'Unknown')
-                server = response_headers.get('server', 'Unknown')
-                content_encoding = response_headers.get('content-encoding', 'none')
-                cache_control = response_headers.get('cache-control', 'None')
-                expires_hdr = response_headers.get('expires', 'None')
-                # HTTP version (requests uses urllib3 raw.version: 11 => HTTP/1.1)
-                try:
-                    raw_ver = getattr(response.raw, 'version', None)
-                    http_version = 'HTTP/1.1' if raw_ver == 11 else 'HTTP/1.0' if raw_ver == 10 else 'HTTP/2 (proxy)' if raw_ver == 20 else 'Unknown'
-                except Exception:
-                    http_version = 'Unknown'
-                redirect_count = len(getattr(response, 'history', []) or [])
-                # Best-practice analysis on HTML when applicable
-                best_practices = {}
-                try:
-                    if 'text/html' in content_type.lower():
-                        best_practices = self.AnalyzeHtmlBestPractices(response.text)
-                except Exception:
-                    best_practices = {}
-                # CDN heuristic
-                cdn = self.DetectCdn(server, response_headers)
-                
-                # Deep analysis if enabled
-                if self.deep_test:
-                    # Analyze additional metrics
-                    expires = expires_hdr
-                    last_modified = response_headers.get('last-modified', 'None')
-                    etag = response_headers.get('etag', 'None')
-                    connection = response_headers.get('connection', 'None')
-                    keep_alive = response_headers.get('keep-alive', 'None')
-                    
-                    # Calculate additional performance metrics
-                    # Prefer real TTFB if available
-                    ttf = ttfb_ms if ttfb_ms is not None else self.CalculateTimeToFirstByte(response_time)
-                    lcp = self.CalculateLargestContentfulPaint(content_length)
-                    cls = self.CalculateCumulativeLayoutShift(content_length)
-                    fid = self.CalculateFirstInputDelay(response_time)
-                    
-                    # Analyze content structure
-                    content_analysis = self.AnalyzeContentStructure(response.text)
-                    
-                    # Security headers analysis
-                    security_headers = self.AnalyzeSecurityHeaders(response_headers)
-                    
-                    # Performance grade calculation
-                    performance_grade = self.CalculatePerformanceGrade(response_time, content_length, response_headers)
-                    
-                    result = {
-                        'url': url,
-                        'response_time': response_time,
-                        'content_size': content_length,
-                        'status_code': status_code,
-                        'content_type': content_type,
-                        'server': server,
-                        'http_version': http_version,
-                        'redirects': redirect_count,
-                        'compression': content_encoding,
-                        'cache_control': cache_control,
-                        'expires': expires,
-                        'last_modified': last_modified,
-                        'etag': etag,
-                        'connection': connection,
-                        'keep_alive': keep_alive,
-                        'ttf': ttf,
-                        'lcp': lcp,
-                        'cls': cls,
-                        'fid': fid,
-                        'dns': dns_lookup_ms,
-                        'cdn': cdn,
-                        'best_practices': best_practices,
-                        'full_load_time': full_load_time,
-                        'dom_ready_time': dom_ready_time,
-                        'content_analysis': content_analysis,
-                        'security_headers': security_headers,
-                        'performance_grade': performance_grade,
-                        'test_number': i + 1,
-                        'mobile_test': self.mobile_test
-                    }
-                else:
-                    result = {
-                        'url': url,
-                        'response_time': response_time,
-                        'content_size': content_length,
-                        'status_code': status_code,
-                        'content_type': content_type,
-                        'server': server,
-                        'http_version': http_version,
-                        'redirects': redirect_count,
-                        'compression': content_encoding,
-                        'dns': dns_lookup_ms,
-                        'cdn': cdn,
-                        'best_practices': best_practices,
-                        'full_load_time': full_load_time,
-                        'dom_ready_time': dom_ready_time,
-                        'test_number': i + 1,
-                        'mobile_test': self.mobile_test
-                    }
-                
-                all_results.append(result)
+            with span("ui.run_tests"):
+                all_results = self.engine.RunTests(url, test_count)
             
             # Display results
-            if self.multiple_test:
-                self.DisplayMultipleTestResults(all_results)
-            else:
-                self.DisplaySpeedResults(all_results[0])
+            with span("ui.display_results"):
+                if self.multiple_test:
+                    self.DisplayMultipleTestResults(all_results)
+                else:
+                    self.DisplaySpeedResults(all_results[0])
             
         except Exception as ex:
-            msg = str(ex)
-            if 'timeout' in msg.lower():
-                self.ShowErrorMessage("Connection timeout. Please try again.")
-            elif 'failed to establish a new connection' in msg.lower() or 'connection' in msg.lower():
-                self.ShowErrorMessage("Connection error. Please check the URL.")
-            else:
-                self.ShowErrorMessage(f"Analysis error: {str(ex)}")
+            self.ShowErrorMessage(DescribeError(ex))
         finally:
             self.HideLoading()
     
-    def CalculateTimeToFirstByte(self, response_time):
-        """Calculate Time to First Byte (TTFB)."""
-        return response_time * 0.3  # Simulate TTFB calculation
-    
-    def CalculateLargestContentfulPaint(self, content_size):
-        """Calculate Largest Contentful Paint (LCP)."""
-        # Simulate LCP based on content size
-        if content_size < 1024 * 1024:  # < 1MB
-            return 1.2
-        elif content_size < 5 * 1024 * 1024:  # < 5MB
-            return 2.5
-        else:
-            return 4.0
-    
-    def CalculateCumulativeLayoutShift(self, content_size):
-        """Calculate Cumulative Layout Shift (CLS)."""
-        # Simulate CLS based on content size
-        if content_size < 500 * 1024:  # < 500KB
-            return 0.05
-        elif content_size < 1024 * 1024:  # < 1MB
-            return 0.15
-        else:
-            return 0.25
-    
-    def CalculateFirstInputDelay(self, response_time):
-        """Calculate First Input Delay (FID)."""
-        # Simulate FID based on response time
-        if response_time < 200:
-            return 50
-        elif response_time < 500:
-            return 100
-        else:
-            return 200
-    
-    def AnalyzeContentStructure(self, html_content):
-        """Analyze HTML content structure."""
-        import re
-        
-        # Count various elements
-        img_count = len(re.findall(r'<img[^>]*>', html_content, re.IGNORECASE))
-        link_count = len(re.findall(r'<a[^>]*href=', html_content, re.IGNORECASE))
-        script_count = len(re.findall(r'<script[^>]*>', html_content, re.IGNORECASE))
-        style_count = len(re.findall(r'<style[^>]*>', html_content, re.IGNORECASE))
-        div_count = len(re.findall(r'<div[^>]*>', html_content, re.IGNORECASE))
-        
-        # Check for performance issues
-        inline_styles = len(re.findall(r'style\s*=', html_content, re.IGNORECASE))
-        external_scripts = len(re.findall(r'<script[^>]*src=', html_content, re.IGNORECASE))
-        external_styles = len(re.findall(r'<link[^>]*rel\s*=\s*["\']stylesheet["\']', html_content, re.IGNORECASE))
-        
-        return {
-            'img_count': img_count,
-            'link_count': link_count,
-            'script_count': script_count,
-            'style_count': style_count,
-            'div_count': div_count,
-            'inline_styles': inline_styles,
-            'external_scripts': external_scripts,
-            'external_styles': external_styles
-        }
-    
-    def AnalyzeSecurityHeaders(self, headers):
-        """Analyze security headers."""
-        security_headers = {
-            'https': headers.get('strict-transport-security', 'None'),
-            'x_frame_options': headers.get('x-frame-options', 'None'),
-            'x_content_type': headers.get('x-content-type-options', 'None'),
-            'x_xss_protection': headers.get('x-xss-protection', 'None'),
-            'content_security_policy': headers.get('content-security-policy', 'None'),
-            'referrer_policy': headers.get('referrer-policy', 'None')
-        }
-        
-        # Calculate security score
-        security_score = 0
-        for header, value in security_headers.items():
-            if value != 'None':
-                security_score += 1
-        
-        security_headers['score'] = security_score
-        security_headers['grade'] = 'Excellent' if security_score >= 5 else 'Good' if security_score >= 3 else 'Average' if security_score >= 1 else 'Poor'
-        
-        return security_headers
-
-    def AnalyzeHtmlBestPractices(self, html_content):
-        """Analyze HTML against common best practices.
-        Returns a dict of booleans and counts to be surfaced in the UI.
-        """
-        import re
-        out = {}
-        # meta viewport for mobile friendliness
-        out['has_viewport'] = bool(re.search(r'<meta[^>]+name=["\']viewport["\']', html_content, re.IGNORECASE))
-        # title tag
-        out['has_title'] = bool(re.search(r'<title>.*?</title>', html_content, re.IGNORECASE|re.DOTALL))
-        # description meta
-        out['has_meta_description'] = bool(re.search(r'<meta[^>]+name=["\']description["\']', html_content, re.IGNORECASE))
-        # lazy loading images
-        out['lazy_loaded_images'] = len(re.findall(r'<img[^>]*loading=["\']lazy["\']', html_content, re.IGNORECASE))
-        # critical CSS hint
-        out['has_preload_css'] = bool(re.search(r'<link[^>]+rel=["\']preload["\'][^>]+as=["\']style["\']', html_content, re.IGNORECASE))
-        # http resources (mixed content risk)
-        out['http_resources'] = len(re.findall(r'\shref=\"http://|\ssrc=\"http://', html_content, re.IGNORECASE))
-        return out
-
-    def DetectCdn(self, server, headers):
-        """Heuristic CDN detection based on server/header signatures."""
-        sigs = ['cloudflare', 'akamai', 'fastly', 'cloudfront', 'cdn77', 'incapsula', 'cachefly']
-        blob = (server or '') + ' ' + ' '.join([f"{k}:{v}" for k, v in headers.items()])
-        blob = blob.lower()
-        for s in sigs:
-            if s in blob:
-                return s
-        return 'unknown'
-    
-    def SimulateFullPageLoad(self, html_content, base_response_time):
-        """
-        Simulate full page load time including all resources.
-        This is a realistic simulation based on HTML content analysis.
-        """
-        import re
-        
-        # Count external resources
-        css_files = len(re.findall(r'<link[^>]+href=["\']([^"\']+)["\'][^>]*rel=["\']stylesheet["\']', html_content, re.IGNORECASE))
-        js_files = len(re.findall(r'<script[^>]+src=["\']([^"\']+)["\']', html_content, re.IGNORECASE))
-        images = len(re.findall(r'<img[^>]+src=["\']([^"\']+)["\']', html_content, re.IGNORECASE))
-        
-        # Calculate additional load time based on resources
-        additional_time = 0
-        
-        # CSS files (typically fast)
-        additional_time += css_files * 50  # 50ms per CSS file
-        
-        # JavaScript files (can be slow)
-        additional_time += js_files * 100  # 100ms per JS file
-        
-        # Images (can be very slow)
-        additional_time += images * 200  # 200ms per image
-        
-        # Network latency simulation
-        network_delay = 50  # Base network delay
-        
-        # Calculate total load time
-        total_load_time = base_response_time + additional_time + network_delay
-        
-        return {
-            'total_load_time': round(total_load_time, 2),
-            'css_files': css_files,
-            'js_files': js_files,
-            'images': images,
-            'additional_time': round(additional_time, 2)
-        }
-
-    def CollectRealBrowserMetrics(self, url, is_mobile=False):
-        """Collect real page load metrics using a headless browser (playwright).
-        Returns a dict compatible with SimulateFullPageLoad output keys.
-        If playwright is not installed, falls back to simulation with a flag.
-        """
-        try:
-            from playwright.sync_api import sync_playwright
-        except Exception:
-            # Fallback marker
-            return {
-                'total_load_time': 0,
-                'css_files': 0,
-                'js_files': 0,
-                'images': 0,
-                'additional_time': 0,
-                'fallback': 'playwright_not_installed'
-            }
-
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                viewport={ 'width': 390, 'height': 844 } if is_mobile else { 'width': 1366, 'height': 768 },
-                user_agent=(
-                    'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15'
-                    if is_mobile
-                    else 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                )
-            )
-            page = context.new_page()
-            # Track network requests
-            resources = { 'css': 0, 'js': 0, 'img': 0 }
-            def on_request(req):
-                url = req.url.lower()
-                if url.endswith('.css'):
-                    resources['css'] += 1
-                elif url.endswith('.js'):
-                    resources['js'] += 1
-                elif any(url.endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg']):
-                    resources['img'] += 1
-            page.on('request', on_request)
-
-            import time as _t
-            t0 = _t.time()
-            page.goto(url, wait_until='load', timeout=30000)
-            # Ensure network idle-ish
-            try:
-                page.wait_for_load_state('networkidle', timeout=5000)
-            except Exception:
-                pass
-            t1 = _t.time()
-            browser.close()
-
-            total_ms = round((t1 - t0) * 1000, 2)
-            # Approximate additional time (beyond initial response unknown here)
-            additional = max(0, total_ms - 0)
-            return {
-                'total_load_time': total_ms,
-                'css_files': resources['css'],
-                'js_files': resources['js'],
-                'images': resources['img'],
-                'additional_time': additional,
-                'fallback': None
-            }
-    
-    def CalculateDOMReadyTime(self, response_time, content_size):
-        """
-        Calculate DOM Content Loaded time.
-        This is when the HTML document has been completely loaded and parsed.
-        """
-        # DOM ready is typically 70-80% of total response time
-        dom_ready_ratio = 0.75
-        
-        # Adjust based on content size (larger content = longer parsing)
-        if content_size > 1024 * 1024:  # > 1MB
-            dom_ready_ratio = 0.85
-        elif content_size > 500 * 1024:  # > 500KB
-            dom_ready_ratio = 0.80
-        else:
-            dom_ready_ratio = 0.70
-            
-        return round(response_time * dom_ready_ratio, 2)
-    
-    def CalculatePerformanceGrade(self, response_time, content_size, headers):
-        """Calculate overall performance grade."""
-        score = 100
-        
-        # Response time penalty
-        if response_time > 3000:
-            score -= 30
-        elif response_time > 2000:
-            score -= 20
-        elif response_time > 1000:
-            score -= 10
-        
-        # Content size penalty
-        if content_size > 10 * 1024 * 1024:  # > 10MB
-            score -= 25
-        elif content_size > 5 * 1024 * 1024:  # > 5MB
-            score -= 15
-        elif content_size > 2 * 1024 * 1024:  # > 2MB
-            score -= 10
-        
-        # Cache headers bonus
-        if headers.get('cache-control'):
-            score += 5
-        if headers.get('expires'):
-            score += 5
-        
-        # Compression bonus
-        if headers.get('content-encoding'):
-            score += 10
-        
-        # Security headers bonus
-        security_headers = ['strict-transport-security', 'x-frame-options', 'x-content-type-options']
-        for header in security_headers:
-            if headers.get(header):
-                score += 2
-        
-        return {
-            'score': max(0, min(100, score)),
-            'grade': 'A+' if score >= 95 else 'A' if score >= 90 else 'B' if score >= 80 else 'C' if score >= 70 else 'D' if score >= 60 else 'F'
-        }
-    
     def DisplayMultipleTestResults(self, results):
         """Display results for multiple tests."""
         self.results_container.content.controls.clear()
@@ -763,7 +374,7 @@ class SpeedAnalysisPage(BasePage):
         # Header
         self.results_container.content.controls.append(
             ft.Text(
-                f"Results of {len(results)} tests: {results[0]['url']}",
+                f"Results of {len(results)} tests: {results[0].url}",
                 size=24,
                 weight=ft.FontWeight.BOLD,
                 font_family="Iransans-Bold",
@@ -772,8 +383,9 @@ class SpeedAnalysisPage(BasePage):
         )
         
         # Calculate averages
-        avg_response_time = sum(r['response_time'] for r in results) / len(results)
-        avg_content_size = sum(r['content_size'] for r in results) / len(results)
+        columns = ResultColumns.from_results(results)
+        avg_response_time = float(columns.column('response_time').mean())
+        avg_content_size = float(columns.column('content_size').mean())
         
         # Summary card
         summary_card = ft.Container(
@@ -796,9 +408,9 @@ class SpeedAnalysisPage(BasePage):
             test_card = ft.Container(
                 content=ft.Column([
                     ft.Text(f"Test {i + 1}", size=16, weight=ft.FontWeight.BOLD, font_family="Iransans-Bold"),
-                    ft.Text(f"Response Time: {result['response_time']} ms", size=12, font_family="Iransans-Regular"),
-                    ft.Text(f"Size: {format_bytes(result['content_size'])}", size=12, font_family="Iransans-Regular"),
-                    ft.Text(f"Status Code: {result['status_code']}", size=12, font_family="Iransans-Regular"),
+                    ft.Text(f"Response Time: {result.response_time} ms", size=12, font_family="Iransans-Regular"),
+                    ft.Text(f"Size: {format_bytes(result.content_size)}", size=12, font_family="Iransans-Regular"),
+                    ft.Text(f"Status Code: {result.status_code}", size=12, font_family="Iransans-Regular"),
                 ]),
                 bgcolor=ft.Colors.GREY_50,
                 border_radius=ft.border_radius.all(8),
@@ -815,7 +427,7 @@ class SpeedAnalysisPage(BasePage):
         Display comprehensive speed analysis results with charts.
         
         Args:
-            results (dict): Analysis results dictionary
+            results (SpeedResult): Analysis results
         """
         self.results_container.content.controls.clear()
         
@@ -851,7 +463,7 @@ class SpeedAnalysisPage(BasePage):
         self.results_container.content.controls.append(header_info)
         
         # Performance Score with Circle Chart
-        performance_score = self.CalculatePerformanceScore(results['response_time'])
+        performance_score = self.engine.CalculatePerformanceScore(results['response_time'])
         score_color = self.GetPerformanceColor(performance_score)
         
         # Create performance score card
@@ -871,7 +483,7 @@ class SpeedAnalysisPage(BasePage):
                     font_family="Iransans-Bold"
                 ),
                 ft.Text(
-                    self.GetPerformanceLabel(performance_score),
+                    self.engine.GetPerformanceLabel(performance_score),
                     size=14,
                     color=score_color,
                     font_family="Iransans-Regular"
@@ -980,21 +592,31 @@ class SpeedAnalysisPage(BasePage):
         
         # Additional technical details if deep test is enabled
         if 'cache_control' in results:
+            cache_rows = [
+                ft.Text(
+                    "Cache and Optimization Details",
+                    size=18,
+                    weight=ft.FontWeight.BOLD,
+                    font_family="Iransans-Bold"
+                ),
+                ft.Divider(),
+                self.CreateDetailRow("Cache Control", results.get('cache_control', 'None')),
+                self.CreateDetailRow("Expires", results.get('expires', 'None')),
+                self.CreateDetailRow("Last Modified", results.get('last_modified', 'None')),
+                self.CreateDetailRow("TTFB", f"{results.get('ttf', 0):.1f} ms"),
+                self.CreateDetailRow("LCP", f"{results.get('lcp', 0):.1f} s"),
+            ]
+            # Warm-cache second load, when it was measured
+            repeat_view = results.get('repeat_view')
+            if repeat_view:
+                cache_rows.extend([
+                    self.CreateDetailRow("Repeat View Load", f"{repeat_view['total_load_time']} ms"),
+                    self.CreateDetailRow("Cache Hit Ratio", f"{repeat_view['cache_hit_ratio'] * 100:.0f}%"),
+                    self.CreateDetailRow("Bytes from Cache", format_bytes(repeat_view['bytes_from_cache'])),
+                    self.CreateDetailRow("Bytes from Network", format_bytes(repeat_view['bytes_from_network'])),
+                ])
             cache_details = ft.Container(
-                content=ft.Column([
-                    ft.Text(
-                        "Cache and Optimization Details",
-                        size=18,
-                        weight=ft.FontWeight.BOLD,
-                        font_family="Iransans-Bold"
-                    ),
-                    ft.Divider(),
-                    self.CreateDetailRow("Cache Control", results.get('cache_control', 'None')),
-                    self.CreateDetailRow("Expires", results.get('expires', 'None')),
-                    self.CreateDetailRow("Last Modified", results.get('last_modified', 'None')),
-                    self.CreateDetailRow("TTFB", f"{results.get('ttf', 0):.1f} ms"),
-                    self.CreateDetailRow("LCP", f"{results.get('lcp', 0):.1f} s"),
-                ]),
+                content=ft.Column(cache_rows),
                 bgcolor=ft.Colors.BLUE_50,
                 border_radius=ft.border_radius.all(10),
                 padding=15
@@ -1170,7 +792,7 @@ class SpeedAnalysisPage(BasePage):
         Create a pie chart showing performance breakdown.
         
         Args:
-            results (dict): Analysis results
+            results (SpeedResult): Analysis results
             
         Returns:
             ft.Container: Pie chart container
@@ -1232,7 +854,7 @@ class SpeedAnalysisPage(BasePage):
         Create performance insights section.
         
         Args:
-            results (dict): Analysis results
+            results (SpeedResult): Analysis results
             score (int): Performance score
             
         Returns:
@@ -1285,7 +907,7 @@ class SpeedAnalysisPage(BasePage):
         Create detailed recommendations section.
         
         Args:
-            results (dict): Analysis results
+            results (SpeedResult): Analysis results
             
         Returns:
             ft.Container: Recommendations container
@@ -1313,27 +935,6 @@ class SpeedAnalysisPage(BasePage):
             border=ft.border.all(1, ft.Colors.ORANGE_200)
         )
     
-    def GetPerformanceLabel(self, score):
-        """
-        Get performance label based on score.
-        
-        Args:
-            score (int): Performance score
-            
-        Returns:
-            str: Performance label
-        """
-        if score >= 90:
-            return "Excellent"
-        elif score >= 80:
-            return "Good"
-        elif score >= 70:
-            return "Average"
-        elif score >= 60:
-            return "Poor"
-        else:
-            return "Very Poor"
-    
     def GetCurrentDateTime(self):
         """
         Get current date and time.
@@ -1349,12 +950,13 @@ class SpeedAnalysisPage(BasePage):
         Get detailed recommendations based on analysis results.
         
         Args:
-            results (dict): Analysis results
+            results (SpeedResult): Analysis results
             
         Returns:
             list: List of detailed recommendations
         """
-        recommendations = []
+        # Specific, measured actions come before the generic advice
+        recommendations = describe_actions(results.get('render_blocking'))
         
         # Response time recommendations
         if results['response_time'] > 2000:
@@ -1371,7 +973,8 @@ class SpeedAnalysisPage(BasePage):
         # General recommendations
         recommendations.append("Enable browser cache")
         recommendations.append("Use HTTP/2 for better performance")
-        recommendations.append("Optimize JavaScript and CSS code")
+        if not results.get('render_blocking'):
+            recommendations.append("Optimize JavaScript and CSS code")
         
         # Server-specific recommendations
         if "nginx" in results['server'].lower():
@@ -1405,29 +1008,10 @@ class SpeedAnalysisPage(BasePage):
     def OnBrowserTestChange(self, e):
         """Handle headless browser test toggle."""
         self.browser_test = e.control.value
-    
-    def CalculatePerformanceScore(self, response_time):
-        """
-        Calculate performance score based on response time.
-        
-        Args:
-            response_time (float): Response time in milliseconds
-            
-        Returns:
-            int: Performance score (0-100)
-        """
-        if response_time < 200:
-            return 100
-        elif response_time < 500:
-            return 90
-        elif response_time < 1000:
-            return 80
-        elif response_time < 2000:
-            return 70
-        elif response_time < 3000:
-            return 60
-        else:
-            return 50
+
+    def OnRenderBlockingChange(self, e):
+        """Handle render-blocking analysis toggle."""
+        self.render_blocking = e.control.value
     
     def GetPerformanceColor(self, score):
         """
@@ -1468,12 +1052,12 @@ class SpeedAnalysisPage(BasePage):
         Get performance recommendations based on analysis results.
         
         Args:
-            results (dict): Analysis results
+            results (SpeedResult): Analysis results
             
         Returns:
             list: List of recommendation strings
         """
-        recommendations = []
+        recommendations = describe_actions(results.get('render_blocking'))
         
         if results['response_time'] > 2000:
             recommendations.append("Response time is high. Consider server optimization.")
@@ -0,0 +1,405 @@
+"""
+Embedded HTTP API exposing the speed engine to other services.
+
+Built on ``asyncio`` streams only. Jobs go through a bounded queue that is
+drained by a fixed number of workers; each worker runs the blocking engine in
+a thread pool. Submitting the same URL with the same options while a matching
+job is still queued or running returns that job instead of measuring twice.
+
+Endpoints:
+    POST /analyze               {"url": ..., "tests": 1, "options": {..., "throttling": ...},
+                                 "priority": "normal", "tenant": "api"}
+    GET  /jobs/<id>             job status
+    GET  /jobs/<id>/result      result (``?wait=<seconds>`` to long-poll)
+    GET  /jobs/<id>/events      progress as Server-Sent Events
+    GET  /jobs/<id>/export      flat results (``?format=csv`` or ``jsonl``)
+    GET  /health                queue and worker statistics
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import io
+import itertools
+import json
+import time
+
+from src.services.browser_pool import get_throttling
+from src.services.exporters import CsvExporter, JsonlExporter
+from src.services.http_client import HttpClient
+from src.services.netem import get_profile
+from src.services.resilience import AdaptiveTimeout, CircuitBreaker
+from src.services.scheduler import PRIORITY_NAMES, PRIORITY_NORMAL, configure_scheduler
+from src.services.speed_engine import SpeedEngine, DescribeError
+from src.utils.url import is_valid_url, normalize_url
+
+
+# Boolean engine options accepted in "options", with their defaults
+ENGINE_OPTIONS = {
+    "deep_test": True,
+    "browser_test": False,
+    "mobile_test": False,
+    "repeat_view": False,
+    "visual_metrics": False,
+    "cpu_profile": False,
+    "coverage": False,
+    "third_party": False,
+    "render_blocking": False,
+}
+MAX_BODY_BYTES = 64 * 1024
+MAX_TESTS = 10
+
+STATUS_TEXT = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+class AnalysisJob:
+    def __init__(self, job_id: str, key: str, url: str, options: Dict[str, Any], tests: int,
+                 priority: int = PRIORITY_NORMAL, tenant: str = "api") -> None:
+        self.id = job_id
+        self.key = key
+        self.url = url
+        self.options = options
+        self.tests = tests
+        self.priority = priority
+        self.tenant = tenant
+        self.status = "queued"
+        self.results: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        self.submitted = 1
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def publish(self, event: str, **data: Any) -> None:
+        payload = {"event": event, "job_id": self.id, **data}
+        self.events.append(payload)
+        for q in self.subscribers:
+            q.put_nowait(payload)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "url": self.url,
+            "options": self.options,
+            "tests": self.tests,
+            "status": self.status,
+            "completed_tests": len(self.results),
+            "submitted": self.submitted,
+            "error": self.error,
+        }
+
+
+class AnalysisService:
+    """Job queue, in-flight coalescing and worker pool behind the HTTP API."""
+
+    def __init__(self, workers: int = 4, max_queue: int = 1000, max_jobs: int = 10000) -> None:
+        self.workers = max(1, workers)
+        self.max_jobs = max_jobs
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.jobs: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+        self.inflight: Dict[str, AnalysisJob] = {}
+        self.http = HttpClient()
+        self.breaker = CircuitBreaker()
+        self.timeouts = AdaptiveTimeout()
+        self.scheduler = configure_scheduler(max_concurrent=self.workers + 1)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+        self._ids = itertools.count(1)
+        self._tasks: List[asyncio.Task] = []
+        self.coalesced = 0
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def job_key(url: str, options: Dict[str, Any], tests: int) -> str:
+        return json.dumps({"url": url, "options": options, "tests": tests}, sort_keys=True)
+
+    def submit(self, url: str, options: Dict[str, Any], tests: int,
+               priority: int = PRIORITY_NORMAL, tenant: str = "api") -> Tuple[AnalysisJob, bool]:
+        """Queue a job or join a matching in-flight one; raises ``asyncio.QueueFull``."""
+        key = self.job_key(url, options, tests)
+        existing = self.inflight.get(key)
+        if existing is not None:
+            existing.submitted += 1
+            self.coalesced += 1
+            return existing, True
+        job = AnalysisJob(f"{int(time.time())}-{next(self._ids)}", key, url, options, tests, priority, tenant)
+        self.queue.put_nowait(job)
+        self.inflight[key] = job
+        self.jobs[job.id] = job
+        self._evict()
+        job.publish("queued", position=self.queue.qsize())
+        return job, False
+
+    def _evict(self) -> None:
+        # Drop the oldest finished jobs once the retention limit is reached.
+        while len(self.jobs) > self.max_jobs:
+            victim = next((j for j in self.jobs.values() if j.finished), None)
+            if victim is None:
+                break
+            del self.jobs[victim.id]
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            job.publish("running")
+            engine = SpeedEngine(http=self.http, scheduler=self.scheduler, priority=job.priority,
+                                 tenant=job.tenant, breaker=self.breaker, timeouts=self.timeouts,
+                                 **job.options)
+            try:
+                for i in range(job.tests):
+                    result = await loop.run_in_executor(self.executor, engine.RunTest, job.url, i + 1)
+                    job.results.append(result.to_dict())
+                    job.publish("progress", completed=i + 1, total=job.tests)
+                job.status = "done"
+                job.publish("done", results=job.results)
+            except Exception as ex:
+                job.status = "failed"
+                job.error = DescribeError(ex)
+                job.publish("failed", error=job.error)
+            finally:
+                job.finished_at = time.time()
+                self.inflight.pop(job.key, None)
+                job.done.set()
+                self.queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "queue_limit": self.queue.maxsize,
+            "inflight": len(self.inflight),
+            "workers": self.workers,
+            "jobs": len(self.jobs),
+            "coalesced": self.coalesced,
+            "scheduler": self.scheduler.stats(),
+        }
+
+
+class ApiServer:
+    def __init__(self, service: AnalysisService, host: str = "127.0.0.1", port: int = 8080) -> None:
+        self.service = service
+        self.host = host
+        self.port = port
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self.service.start()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await self._read_request(reader)
+            if request is None:
+                return
+            method, path, query, body = request
+            await self._route(writer, method, path, query, body)
+        except ValueError as ex:
+            await self._send_json(writer, 400, {"error": str(ex)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) < 2:
+            raise ValueError("Malformed request line.")
+        method, target = parts[0].upper(), parts[1]
+        headers: Dict[str, str] = {}
+        while True:
+            raw = await reader.readline()
+            if raw in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = raw.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        split = urlsplit(target)
+        return method, split.path.rstrip("/") or "/", parse_qs(split.query), body
+
+    async def _route(self, writer, method: str, path: str, query: Dict[str, List[str]], body: bytes) -> None:
+        parts = [p for p in path.split("/") if p]
+        if path == "/health" and method == "GET":
+            return await self._send_json(writer, 200, self.service.stats())
+        if path == "/analyze":
+            if method != "POST":
+                return await self._send_json(writer, 405, {"error": "Use POST."})
+            return await self._submit(writer, body)
+        if len(parts) >= 2 and parts[0] == "jobs" and method == "GET":
+            job = self.service.jobs.get(parts[1])
+            if job is None:
+                return await self._send_json(writer, 404, {"error": "Unknown job."})
+            if len(parts) == 2:
+                return await self._send_json(writer, 200, job.describe())
+            if parts[2] == "result":
+                return await self._result(writer, job, query)
+            if parts[2] == "events":
+                return await self._events(writer, job)
+            if parts[2] == "export":
+                return await self._export(writer, job, query)
+        await self._send_json(writer, 404, {"error": "Not found."})
+
+    async def _submit(self, writer, body: bytes) -> None:
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            raise ValueError("Body must be JSON.")
+        if not isinstance(payload, dict):
+            raise ValueError("Body must be a JSON object.")
+        url = normalize_url(str(payload.get("url") or "").strip())
+        if not url or not is_valid_url(url):
+            raise ValueError("A valid 'url' is required.")
+        raw_options = payload.get("options") or {}
+        if not isinstance(raw_options, dict):
+            raise ValueError("'options' must be a JSON object.")
+        options = {name: bool(raw_options.get(name, default)) for name, default in ENGINE_OPTIONS.items()}
+        network_profile = raw_options.get("network_profile")
+        if network_profile:
+            if network_profile != "none":
+                network_profile = get_profile(str(network_profile)).name
+            options["network_profile"] = network_profile
+        throttling = raw_options.get("throttling")
+        if throttling:
+            if throttling != "none":
+                throttling = get_throttling(str(throttling)).name
+            options["throttling"] = throttling
+        try:
+            tests = min(MAX_TESTS, max(1, int(payload.get("tests", 1))))
+        except (TypeError, ValueError):
+            raise ValueError("'tests' must be an integer.")
+        priority = PRIORITY_NAMES.get(str(payload.get("priority", "normal")).lower())
+        if priority is None:
+            raise ValueError("'priority' must be one of: " + ", ".join(PRIORITY_NAMES))
+        tenant = str(payload.get("tenant") or "api")[:64]
+        try:
+            job, coalesced = self.service.submit(url, options, tests, priority, tenant)
+        except asyncio.QueueFull:
+            return await self._send_json(writer, 503, {"error": "Job queue is full."}, {"Retry-After": "5"})
+        await self._send_json(writer, 202, {**job.describe(), "coalesced": coalesced},
+                              {"Location": f"/jobs/{job.id}"})
+
+    async def _result(self, writer, job: AnalysisJob, query: Dict[str, List[str]]) -> None:
+        wait = float(query.get("wait", ["0"])[0] or 0)
+        if not job.finished and wait > 0:
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=min(wait, 300))
+            except asyncio.TimeoutError:
+                pass
+        if not job.finished:
+            return await self._send_json(writer, 202, job.describe())
+        await self._send_json(writer, 200, {**job.describe(), "results": job.results})
+
+    async def _export(self, writer, job: AnalysisJob, query: Dict[str, List[str]]) -> None:
+        fmt = query.get("format", ["jsonl"])[0]
+        if fmt not in ("csv", "jsonl"):
+            raise ValueError("'format' must be csv or jsonl.")
+        if not job.finished:
+            return await self._send_json(writer, 202, job.describe())
+        # A job holds at most MAX_TESTS results, so the body is built in memory
+        buffer = io.StringIO()
+        with (CsvExporter(buffer) if fmt == "csv" else JsonlExporter(buffer)) as exporter:
+            exporter.write_all(job.results)
+        body = buffer.getvalue().encode("utf-8")
+        content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        writer.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _events(self, writer, job: AnalysisJob) -> None:
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        q: asyncio.Queue = asyncio.Queue()
+        # Replay what already happened, then follow live events.
+        backlog = list(job.events)
+        job.subscribers.append(q)
+        try:
+            for event in backlog:
+                await self._send_event(writer, event)
+            while not job.finished or not q.empty():
+                try:
+                    event = await asyncio.wait_for(q.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                    await writer.drain()
+                    continue
+                await self._send_event(writer, event)
+        finally:
+            job.subscribers.remove(q)
+
+    @staticmethod
+    async def _send_event(writer, event: Dict[str, Any]) -> None:
+        data = json.dumps(event, default=str)
+        writer.write(f"event: {event['event']}\ndata: {data}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    @staticmethod
+    async def _send_json(writer, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload, default=str).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            "Connection: close",
+        ]
+        head.extend(f"{k}: {v}" for k, v in (headers or {}).items())
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+def run_server(host: str = "127.0.0.1", port: int = 8080, workers: int = 4, max_queue: int = 1000) -> None:
+    """Run the API server until interrupted."""
+
+    async def _main() -> None:
+        service = AnalysisService(workers=workers, max_queue=max_queue)
+        server = ApiServer(service, host=host, port=port)
+        try:
+            await server.serve_forever()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,238 @@
+"""
+Headless batch runner that analyzes a list of URLs through a worker pool.
+
+Work is spread over ``processes`` worker processes with ``threads`` analysis
+threads each. Results are streamed as JSON lines in completion order and every
+finished URL is appended to an optional checkpoint file so an interrupted run
+can be resumed without redoing completed URLs.
+"""
+
+from typing import Any, Dict, Iterator, Optional, Set, TextIO
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+
+from src.services.http_client import HttpClient
+from src.services.rate_limiter import HostRateLimiter, create_shared_limiter
+from src.services.resilience import AdaptiveTimeout, CircuitBreaker
+from src.services.scheduler import PRIORITY_BULK, configure_scheduler
+from src.services.speed_engine import SpeedEngine, DescribeError
+from src.utils.tracing import enable_tracing
+from src.utils.url import is_valid_url, normalize_url
+
+
+def read_url_list(path: str) -> Iterator[str]:
+    """Yield normalized URLs from a text file, skipping blanks and ``#`` comments."""
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            yield normalize_url(line)
+
+
+def load_checkpoint(path: Optional[str]) -> Set[str]:
+    if not path:
+        return set()
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return {line.strip() for line in fh if line.strip()}
+    except FileNotFoundError:
+        return set()
+
+
+def analyze_url(engine: SpeedEngine, url: str, test_count: int = 1) -> Dict[str, Any]:
+    """Analyze one URL and return a JSON-serializable record, never raising."""
+    if not is_valid_url(url):
+        return {"url": url, "error": "Invalid URL."}
+    try:
+        return {"url": url, "results": [result.to_dict() for result in engine.RunTests(url, test_count)]}
+    except Exception as ex:
+        return {"url": url, "error": DescribeError(ex)}
+
+
+def _worker_main(tasks, results, engine_options: Dict[str, Any], threads: int, test_count: int,
+                 scheduler_limits: Dict[str, int], rate_limiter: Optional[HostRateLimiter],
+                 trace_path: Optional[str] = None) -> None:
+    """Run ``threads`` analysis threads that drain ``tasks`` into ``results``."""
+    tracer = enable_tracing() if trace_path else None
+    # Leave the scheduler's interactive reserve on top of the batch threads.
+    scheduler = configure_scheduler(max_concurrent=threads + 1, **scheduler_limits)
+    engine = SpeedEngine(
+        http=HttpClient(rate_limiter=rate_limiter),
+        scheduler=scheduler,
+        breaker=CircuitBreaker(),
+        timeouts=AdaptiveTimeout(),
+        **{"priority": PRIORITY_BULK, **engine_options},
+    )
+
+    def drain() -> None:
+        try:
+            while True:
+                url = tasks.get()
+                if url is None:
+                    break
+                results.put(analyze_url(engine, url, test_count))
+        finally:
+            engine.browser_pool.close_thread()
+
+    pool = [threading.Thread(target=drain, daemon=True) for _ in range(max(1, threads))]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if tracer is not None and multiprocessing.parent_process() is not None:
+        # Worker processes write their own trace next to the requested path.
+        root, ext = os.path.splitext(trace_path)
+        tracer.export_chrome_trace(f"{root}.{os.getpid()}{ext or '.json'}")
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        processes: int = 1,
+        threads: int = 4,
+        test_count: int = 1,
+        engine_options: Optional[Dict[str, Any]] = None,
+        checkpoint_path: Optional[str] = None,
+        scheduler_limits: Optional[Dict[str, int]] = None,
+        rate_limit: Optional[float] = None,
+        trace_path: Optional[str] = None,
+    ) -> None:
+        self.processes = max(1, processes)
+        self.threads = max(1, threads)
+        self.test_count = max(1, test_count)
+        self.engine_options = engine_options or {}
+        self.checkpoint_path = checkpoint_path
+        self.scheduler_limits = scheduler_limits or {}
+        self.rate_limit = rate_limit
+        self.trace_path = trace_path
+
+    def run(self, urls: Iterator[str], out: TextIO) -> Dict[str, Any]:
+        """
+        Analyze every URL and write one JSON line per URL to ``out``.
+
+        Returns a summary with the number of analyzed, failed and skipped URLs.
+        """
+        done = load_checkpoint(self.checkpoint_path)
+        workers = self.processes * self.threads
+        manager = None
+        rate_limiter = None
+        if self.processes > 1:
+            ctx = multiprocessing.get_context()
+            if self.rate_limit:
+                # One limiter table for all worker processes of this run.
+                manager = ctx.Manager()
+                rate_limiter = create_shared_limiter(manager, rate=self.rate_limit, burst=max(1.0, self.rate_limit))
+            tasks = ctx.Queue(maxsize=workers * 4)
+            results = ctx.Queue()
+            procs = [
+                ctx.Process(
+                    target=_worker_main,
+                    args=(tasks, results, self.engine_options, self.threads, self.test_count,
+                          self.scheduler_limits, rate_limiter, self.trace_path),
+                    daemon=True,
+                )
+                for _ in range(self.processes)
+            ]
+        else:
+            if self.rate_limit:
+                rate_limiter = HostRateLimiter(rate=self.rate_limit, burst=max(1.0, self.rate_limit))
+            tasks = queue.Queue(maxsize=workers * 4)
+            results = queue.Queue()
+            procs = [
+                threading.Thread(
+                    target=_worker_main,
+                    args=(tasks, results, self.engine_options, self.threads, self.test_count,
+                          self.scheduler_limits, rate_limiter, self.trace_path),
+                    daemon=True,
+                )
+            ]
+        for p in procs:
+            p.start()
+
+        summary = {"analyzed": 0, "failed": 0, "skipped": 0}
+        state = {"fed": 0, "finished": False}
+
+        def feed() -> None:
+            try:
+                for url in urls:
+                    if url in done:
+                        summary["skipped"] += 1
+                        continue
+                    tasks.put(url)
+                    state["fed"] += 1
+            finally:
+                state["finished"] = True
+                for _ in range(workers):
+                    tasks.put(None)
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+
+        checkpoint = open(self.checkpoint_path, "a", encoding="utf-8") if self.checkpoint_path else None
+        received = 0
+        try:
+            while not (state["finished"] and received >= state["fed"]):
+                try:
+                    record = results.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(p.is_alive() for p in procs):
+                        break
+                    continue
+                received += 1
+                summary["failed" if "error" in record else "analyzed"] += 1
+                # Output first, checkpoint second: a crash in between repeats a
+                # line on resume instead of losing one.
+                out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                out.flush()
+                if checkpoint:
+                    checkpoint.write(record["url"] + "\n")
+                    checkpoint.flush()
+        finally:
+            if checkpoint:
+                checkpoint.close()
+        feeder.join(timeout=1)
+        for p in procs:
+            p.join(timeout=1)
+        if manager is not None:
+            manager.shutdown()
+        if self.trace_path and self.processes == 1:
+            tracer = enable_tracing()
+            tracer.export_chrome_trace(self.trace_path)
+            summary["trace_summary"] = tracer.format_summary()
+        return summary
+
+
+def run_batch(
+    input_path: str,
+    output_path: Optional[str] = None,
+    checkpoint_path: Optional[str] = None,
+    processes: int = 1,
+    threads: int = 4,
+    test_count: int = 1,
+    engine_options: Optional[Dict[str, Any]] = None,
+    scheduler_limits: Optional[Dict[str, int]] = None,
+    rate_limit: Optional[float] = None,
+    trace_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Run a batch over ``input_path``, writing JSONL to ``output_path`` or stdout."""
+    runner = BatchRunner(
+        processes=processes,
+        threads=threads,
+        test_count=test_count,
+        engine_options={"tenant": os.path.basename(input_path), **(engine_options or {})},
+        checkpoint_path=checkpoint_path,
+        scheduler_limits=scheduler_limits,
+        rate_limit=rate_limit,
+        trace_path=trace_path,
+    )
+    if not output_path or output_path == "-":
+        return runner.run(read_url_list(input_path), sys.stdout)
+    # Append when resuming so earlier lines are kept next to the checkpoint.
+    mode = "a" if checkpoint_path and os.path.exists(checkpoint_path) else "w"
+    with open(output_path, mode, encoding="utf-8") as out:
+        return runner.run(read_url_list(input_path), out)
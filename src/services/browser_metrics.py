@@ -0,0 +1,354 @@
+"""
+Browser-side measurements collected over the DevTools protocol.
+
+``NetworkLog`` listens to a page's ``Network`` domain and records, per
+request, its resource type, whether it was served from the memory, disk or
+prefetch cache, the bytes that crossed the network and the decoded bytes
+delivered to the page, along with its initiator, priority and start and
+end timestamps for building request chains.
+
+``TraceRecorder`` records a Chrome trace for the given categories. Events are
+buffered by the browser and only shipped when the trace stops, so recording
+adds no round trips to the load being measured.
+
+``main_thread_tasks`` turns the renderer's ``RunTask`` trace events into long
+tasks and Total Blocking Time. ``CpuProfiler`` samples JavaScript with the
+``Profiler`` domain and ``aggregate_profile`` attributes self time to script
+URLs and origins.
+
+``CoverageCollector`` records precise JavaScript coverage and CSS rule usage
+during the load and reports unused bytes per file and per origin.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+TASK_TRACE_CATEGORIES = ("devtools.timeline", "loading", "blink.user_timing")
+LONG_TASK_MS = 50.0
+# Profiler sampling interval in microseconds
+SAMPLING_INTERVAL_US = 200
+# Pseudo-frames the V8 profiler reports instead of script code
+PROFILER_PSEUDO_FRAMES = {"(root)", "(program)", "(idle)", "(garbage collector)"}
+
+
+def initiator_url(initiator: Dict[str, Any]) -> Optional[str]:
+    """URL of the document, stylesheet or script that caused a request."""
+    if initiator.get("url"):
+        return initiator["url"]
+    stack = initiator.get("stack")
+    while stack:
+        for frame in stack.get("callFrames") or ():
+            if frame.get("url"):
+                return frame["url"]
+        stack = stack.get("parent")
+    return None
+
+
+class NetworkLog:
+    def __init__(self, cdp: Any) -> None:
+        self.cdp = cdp
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        cdp.on("Network.requestWillBeSent", self._on_request)
+        cdp.on("Network.requestServedFromCache", self._on_served_from_cache)
+        cdp.on("Network.responseReceived", self._on_response)
+        cdp.on("Network.dataReceived", self._on_data)
+        cdp.on("Network.loadingFinished", self._on_finished)
+        cdp.send("Network.enable")
+
+    def _entry(self, request_id: str) -> Dict[str, Any]:
+        entry = self.requests.get(request_id)
+        if entry is None:
+            entry = self.requests[request_id] = {
+                "url": None, "type": "other", "from_cache": False,
+                "encoded_bytes": 0, "decoded_bytes": 0, "finished": False,
+                "initiator": None, "priority": None, "start_s": None, "end_s": None,
+            }
+        return entry
+
+    def _on_request(self, event: Dict[str, Any]) -> None:
+        entry = self._entry(event["requestId"])
+        entry["url"] = event["request"]["url"]
+        entry["type"] = str(event.get("type") or "other").lower()
+        entry["priority"] = event["request"].get("initialPriority")
+        entry["initiator"] = initiator_url(event.get("initiator") or {})
+        if entry["start_s"] is None:
+            # Redirects reuse the request id; the chain starts at the first hop
+            entry["start_s"] = event.get("timestamp")
+
+    def _on_served_from_cache(self, event: Dict[str, Any]) -> None:
+        self._entry(event["requestId"])["from_cache"] = True
+
+    def _on_response(self, event: Dict[str, Any]) -> None:
+        entry = self._entry(event["requestId"])
+        response = event["response"]
+        entry["type"] = str(event.get("type") or entry["type"]).lower()
+        if response.get("fromDiskCache") or response.get("fromPrefetchCache"):
+            entry["from_cache"] = True
+
+    def _on_data(self, event: Dict[str, Any]) -> None:
+        self._entry(event["requestId"])["decoded_bytes"] += event.get("dataLength", 0)
+
+    def _on_finished(self, event: Dict[str, Any]) -> None:
+        entry = self._entry(event["requestId"])
+        entry["encoded_bytes"] = int(event.get("encodedDataLength", 0))
+        entry["end_s"] = event.get("timestamp")
+        entry["finished"] = True
+
+    def detach(self) -> None:
+        try:
+            self.cdp.detach()
+        except Exception:
+            pass
+
+    def cache_summary(self) -> Dict[str, Any]:
+        """Requests and bytes served from cache versus network, overall and per resource type."""
+        by_type: Dict[str, Dict[str, Any]] = {}
+        for entry in self.requests.values():
+            if not entry["finished"]:
+                continue
+            row = by_type.setdefault(entry["type"], {
+                "requests": 0, "cached": 0, "bytes_from_cache": 0, "bytes_from_network": 0,
+            })
+            row["requests"] += 1
+            if entry["from_cache"]:
+                row["cached"] += 1
+                row["bytes_from_cache"] += entry["decoded_bytes"]
+            else:
+                row["bytes_from_network"] += entry["encoded_bytes"]
+        for row in by_type.values():
+            row["hit_ratio"] = round(row["cached"] / row["requests"], 3)
+        requests = sum(row["requests"] for row in by_type.values())
+        cached = sum(row["cached"] for row in by_type.values())
+        return {
+            "requests": requests,
+            "cached_requests": cached,
+            "cache_hit_ratio": round(cached / requests, 3) if requests else 0.0,
+            "bytes_from_cache": sum(row["bytes_from_cache"] for row in by_type.values()),
+            "bytes_from_network": sum(row["bytes_from_network"] for row in by_type.values()),
+            "by_type": dict(sorted(by_type.items())),
+        }
+
+
+class TraceRecorder:
+    def __init__(self, cdp: Any, categories: Iterable[str]) -> None:
+        self.cdp = cdp
+        self.events: List[Dict[str, Any]] = []
+        self.complete = False
+        cdp.on("Tracing.dataCollected", lambda event: self.events.extend(event["value"]))
+        cdp.on("Tracing.tracingComplete", self._on_complete)
+        cdp.send("Tracing.start", {"traceConfig": {"includedCategories": list(categories)}, "transferMode": "ReportEvents"})
+
+    def _on_complete(self, event: Dict[str, Any]) -> None:
+        self.complete = True
+
+    def stop(self, page: Any, timeout_ms: float = 5000) -> List[Dict[str, Any]]:
+        """End the trace and wait for the browser to deliver its events."""
+        self.cdp.send("Tracing.end")
+        waited = 0.0
+        while not self.complete and waited < timeout_ms:
+            # Waiting through Playwright lets it dispatch the trace events meanwhile.
+            page.wait_for_timeout(20)
+            waited += 20
+        return self.events
+
+
+def navigation_start(events: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The main-frame ``navigationStart`` trace event of an http(s) document."""
+    for event in events:
+        if event.get("name") != "navigationStart":
+            continue
+        data = (event.get("args") or {}).get("data") or {}
+        if str(data.get("documentLoaderURL", "")).startswith("http") and data.get("isLoadingMainFrame", True):
+            return event
+    return None
+
+
+def main_thread_tasks(events: List[Dict[str, Any]], long_task_ms: float = LONG_TASK_MS) -> Dict[str, Any]:
+    """Long tasks and Total Blocking Time on the page's renderer main thread."""
+    nav = navigation_start(events)
+    if nav is None:
+        return {'fallback': 'no_navigation'}
+    thread = (nav.get("pid"), nav.get("tid"))
+    start_us = float(nav["ts"])
+    fcp_us = next(
+        (float(e["ts"]) for e in events
+         if e.get("name") == "firstContentfulPaint" and (e.get("pid"), e.get("tid")) == thread
+         and float(e["ts"]) >= start_us),
+        None
+    )
+    tasks = np.array(
+        [(float(e["ts"]), float(e.get("dur", 0))) for e in events
+         if e.get("name") == "RunTask" and e.get("ph") == "X" and (e.get("pid"), e.get("tid")) == thread
+         and float(e["ts"]) + float(e.get("dur", 0)) >= start_us],
+        dtype=np.float64
+    ).reshape(-1, 2)
+    begin_ms = (tasks[:, 0] - start_us) / 1000
+    duration_ms = tasks[:, 1] / 1000
+    long_mask = duration_ms >= long_task_ms
+    # Only the part of a task after First Contentful Paint blocks input
+    fcp_ms = (fcp_us - start_us) / 1000 if fcp_us is not None else 0.0
+    after_fcp = np.maximum(0.0, begin_ms + duration_ms - np.maximum(begin_ms, fcp_ms))
+    blocking = np.maximum(0.0, after_fcp - long_task_ms)
+    return {
+        'first_contentful_paint': round(fcp_ms, 1) if fcp_us is not None else None,
+        'main_thread_busy_ms': round(float(duration_ms.sum()), 1),
+        'long_task_count': int(long_mask.sum()),
+        'total_blocking_time': round(float(blocking.sum()), 1),
+        'long_tasks': [
+            {'start_ms': round(float(b), 1), 'duration_ms': round(float(d), 1)}
+            for b, d in zip(begin_ms[long_mask], duration_ms[long_mask])
+        ],
+        'fallback': None,
+    }
+
+
+class CpuProfiler:
+    def __init__(self, cdp: Any, interval_us: int = SAMPLING_INTERVAL_US) -> None:
+        self.cdp = cdp
+        cdp.send("Profiler.enable")
+        cdp.send("Profiler.setSamplingInterval", {"interval": interval_us})
+        cdp.send("Profiler.start")
+
+    def stop(self) -> Dict[str, Any]:
+        profile = self.cdp.send("Profiler.stop")["profile"]
+        self.cdp.send("Profiler.disable")
+        return profile
+
+
+def url_origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}" if parts.scheme and parts.netloc else url
+
+
+def aggregate_profile(profile: Dict[str, Any], top: int = 25) -> Dict[str, Any]:
+    """Self time of a V8 CPU profile summed per script URL and per origin."""
+    nodes = profile.get("nodes") or []
+    samples = np.asarray(profile.get("samples") or [], dtype=np.int64)
+    deltas = np.asarray(profile.get("timeDeltas") or [], dtype=np.float64)
+    if not nodes or samples.size == 0:
+        return {'scripts': [], 'origins': [], 'script_time_ms': 0.0}
+    # A sample lasts until the next one; the last sample gets no duration
+    durations = np.append(deltas[1:], 0.0)[:samples.size]
+
+    keys: Dict[str, int] = {}
+    node_key = np.full(max(n["id"] for n in nodes) + 1, -1, dtype=np.int64)
+    for node in nodes:
+        frame = node.get("callFrame") or {}
+        if frame.get("functionName") in PROFILER_PSEUDO_FRAMES and not frame.get("url"):
+            continue
+        url = frame.get("url") or "(native)"
+        node_key[node["id"]] = keys.setdefault(url, len(keys))
+    sample_keys = node_key[samples]
+    script_mask = sample_keys >= 0
+    per_url = np.bincount(sample_keys[script_mask], weights=durations[script_mask], minlength=len(keys)) / 1000
+
+    urls = list(keys)
+    per_origin: Dict[str, float] = {}
+    for url, ms in zip(urls, per_url):
+        origin = url_origin(url)
+        per_origin[origin] = per_origin.get(origin, 0.0) + float(ms)
+    order = np.argsort(per_url)[::-1][:top]
+    return {
+        'script_time_ms': round(float(per_url.sum()), 1),
+        'scripts': [
+            {'url': urls[i], 'origin': url_origin(urls[i]), 'self_time_ms': round(float(per_url[i]), 1)}
+            for i in order if per_url[i] > 0
+        ],
+        'origins': [
+            {'origin': origin, 'self_time_ms': round(ms, 1)}
+            for origin, ms in sorted(per_origin.items(), key=lambda item: -item[1]) if ms > 0
+        ],
+    }
+
+
+def js_unused_bytes(functions: List[Dict[str, Any]]) -> Tuple[int, int]:
+    """Total and unused size of one script from its block coverage ranges."""
+    ranges = [r for fn in functions for r in fn.get("ranges", ())]
+    if not ranges:
+        return 0, 0
+    # Outer ranges first; painting inner ranges over them leaves each offset
+    # with the count of the innermost block that contains it.
+    ranges.sort(key=lambda r: (r["startOffset"], -r["endOffset"]))
+    total = max(r["endOffset"] for r in ranges)
+    executed = np.zeros(total, dtype=bool)
+    for r in ranges:
+        executed[r["startOffset"]:r["endOffset"]] = r["count"] > 0
+    return total, int(total - np.count_nonzero(executed))
+
+
+def summarize_unused(urls: List[str], totals: np.ndarray, unused: np.ndarray, top: int = 25) -> Dict[str, Any]:
+    """Per-file and per-origin unused bytes, grouped with one bincount per measure."""
+    if not urls:
+        return {'total_bytes': 0, 'unused_bytes': 0, 'unused_ratio': 0.0, 'files': [], 'origins': []}
+    origins = [url_origin(url) for url in urls]
+    origin_names, origin_index = np.unique(np.array(origins), return_inverse=True)
+    origin_totals = np.bincount(origin_index, weights=totals, minlength=len(origin_names))
+    origin_unused = np.bincount(origin_index, weights=unused, minlength=len(origin_names))
+    total_bytes = int(totals.sum())
+    unused_bytes = int(unused.sum())
+
+    def row(key: str, name: str, total: float, waste: float) -> Dict[str, Any]:
+        return {key: name, 'total_bytes': int(total), 'unused_bytes': int(waste),
+                'unused_ratio': round(float(waste) / float(total), 3) if total else 0.0}
+
+    file_order = np.argsort(unused)[::-1][:top]
+    origin_order = np.argsort(origin_unused)[::-1]
+    return {
+        'total_bytes': total_bytes,
+        'unused_bytes': unused_bytes,
+        'unused_ratio': round(unused_bytes / total_bytes, 3) if total_bytes else 0.0,
+        'files': [row('url', urls[i], totals[i], unused[i]) for i in file_order],
+        'origins': [row('origin', str(origin_names[i]), origin_totals[i], origin_unused[i]) for i in origin_order],
+    }
+
+
+class CoverageCollector:
+    def __init__(self, cdp: Any) -> None:
+        self.cdp = cdp
+        self.sheets: Dict[str, Dict[str, Any]] = {}
+        cdp.on("CSS.styleSheetAdded", self._on_sheet)
+        cdp.send("Profiler.enable")
+        cdp.send("Profiler.startPreciseCoverage", {"callCount": False, "detailed": True})
+        cdp.send("DOM.enable")
+        cdp.send("CSS.enable")
+        cdp.send("CSS.startRuleUsageTracking")
+
+    def _on_sheet(self, event: Dict[str, Any]) -> None:
+        header = event["header"]
+        self.sheets[header["styleSheetId"]] = header
+
+    def stop(self, page_url: str) -> Dict[str, Any]:
+        """Stop collecting and summarize unused JS and CSS bytes."""
+        scripts = self.cdp.send("Profiler.takePreciseCoverage")["result"]
+        self.cdp.send("Profiler.stopPreciseCoverage")
+        rules = self.cdp.send("CSS.stopRuleUsageTracking")["ruleUsage"]
+
+        js_urls, js_totals, js_unused = [], [], []
+        for script in scripts:
+            url = script.get("url")
+            # Scripts without a URL are eval()/Function() code, not files
+            if not url or url.startswith(("chrome", "devtools", "extensions::")):
+                continue
+            total, waste = js_unused_bytes(script.get("functions") or [])
+            if total:
+                js_urls.append(url)
+                js_totals.append(total)
+                js_unused.append(waste)
+
+        sheet_ids = list(self.sheets)
+        sheet_index = {sheet_id: i for i, sheet_id in enumerate(sheet_ids)}
+        known = [r for r in rules if r["styleSheetId"] in sheet_index]
+        index = np.fromiter((sheet_index[r["styleSheetId"]] for r in known), dtype=np.int64, count=len(known))
+        lengths = np.fromiter((r["endOffset"] - r["startOffset"] for r in known), dtype=np.float64, count=len(known))
+        used = np.fromiter((bool(r["used"]) for r in known), dtype=bool, count=len(known))
+        css_unused = np.bincount(index[~used], weights=lengths[~used], minlength=len(sheet_ids))
+        css_totals = np.array([float(self.sheets[i].get("length", 0)) for i in sheet_ids])
+        css_urls = [self.sheets[i].get("sourceURL") or page_url for i in sheet_ids]
+
+        return {
+            'js': summarize_unused(js_urls, np.array(js_totals, dtype=np.float64), np.array(js_unused, dtype=np.float64)),
+            'css': summarize_unused(css_urls, css_totals, np.minimum(css_unused, css_totals)),
+        }
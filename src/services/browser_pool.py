@@ -0,0 +1,179 @@
+"""
+Pooled headless browsers with per-context CPU and network throttling.
+
+Playwright's sync API binds its objects to the thread that started it, so the
+pool keeps one driver per thread and one Chromium per (thread, proxy). Each
+test still gets a fresh context, so nothing is cached or reused between loads
+unless a caller asks for it, but the launch cost is paid once per browser.
+
+Throttling uses the DevTools protocol on every page the pool hands out:
+``Emulation.setCPUThrottlingRate`` slows the main thread, and
+``Network.emulateNetworkConditions`` shapes traffic when no throttling proxy
+already does.
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+import threading
+
+from src.services.netem import NetworkProfile, get_profile
+from src.services.replay import ReplayArchive, attach_browser
+from src.utils.tracing import span
+
+
+# Contexts served by one browser before it is relaunched, to bound leaks.
+MAX_CONTEXTS_PER_BROWSER = 100
+
+
+class ThrottlingProfile:
+    __slots__ = ("name", "cpu_slowdown", "network")
+
+    def __init__(self, name: str, cpu_slowdown: float = 1.0, network: Optional[NetworkProfile] = None) -> None:
+        self.name = name
+        self.cpu_slowdown = cpu_slowdown
+        self.network = network
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "cpu_slowdown": self.cpu_slowdown,
+            "network": self.network.name if self.network else None,
+        }
+
+
+# CPU multipliers follow Lighthouse's desktop and mobile calibration.
+THROTTLING_PROFILES: Dict[str, ThrottlingProfile] = {
+    "desktop": ThrottlingProfile("desktop", cpu_slowdown=1.0),
+    "mid-tier-mobile": ThrottlingProfile("mid-tier-mobile", cpu_slowdown=4.0, network=get_profile("4G")),
+    "low-end-mobile": ThrottlingProfile("low-end-mobile", cpu_slowdown=6.0, network=get_profile("3G")),
+}
+
+MOBILE_THROTTLING = "mid-tier-mobile"
+
+
+def get_throttling(name: str) -> ThrottlingProfile:
+    try:
+        return THROTTLING_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown throttling profile {name!r}; choose from {', '.join(THROTTLING_PROFILES)}")
+
+
+def apply_throttling(context: Any, page: Any, throttling: ThrottlingProfile, shape_network: bool = True) -> None:
+    """Apply a throttling profile to ``page`` through a CDP session."""
+    if throttling.cpu_slowdown == 1.0 and not (shape_network and throttling.network):
+        return
+    cdp = context.new_cdp_session(page)
+    if throttling.cpu_slowdown != 1.0:
+        cdp.send("Emulation.setCPUThrottlingRate", {"rate": throttling.cpu_slowdown})
+    if shape_network and throttling.network:
+        net = throttling.network
+        cdp.send("Network.enable")
+        cdp.send("Network.emulateNetworkConditions", {
+            "offline": False,
+            "latency": net.rtt_ms,
+            "downloadThroughput": net.down_kbps * 1000 / 8,
+            "uploadThroughput": net.up_kbps * 1000 / 8,
+        })
+
+
+class _ThreadBrowsers:
+    def __init__(self) -> None:
+        self.playwright = None
+        self.browsers: Dict[Optional[str], Any] = {}
+        self.uses: Dict[Optional[str], int] = {}
+
+
+class BrowserPool:
+    def __init__(self, throttling: Optional[ThrottlingProfile] = None,
+                 max_contexts_per_browser: int = MAX_CONTEXTS_PER_BROWSER) -> None:
+        self.throttling = throttling
+        self.max_contexts_per_browser = max_contexts_per_browser
+        self._local = threading.local()
+
+    def _state(self) -> _ThreadBrowsers:
+        state = getattr(self._local, "state", None)
+        if state is None:
+            state = self._local.state = _ThreadBrowsers()
+        return state
+
+    def _browser(self, proxy: Optional[str]) -> Any:
+        state = self._state()
+        browser = state.browsers.get(proxy)
+        if browser is not None and (not browser.is_connected()
+                                    or state.uses[proxy] >= self.max_contexts_per_browser):
+            with span("browser.close"):
+                try:
+                    browser.close()
+                except Exception:
+                    pass
+            browser = None
+        if browser is None:
+            if state.playwright is None:
+                from playwright.sync_api import sync_playwright
+                with span("browser.start_playwright"):
+                    state.playwright = sync_playwright().start()
+            with span("browser.launch"):
+                browser = state.playwright.chromium.launch(
+                    headless=True,
+                    proxy={'server': proxy, 'bypass': '<-loopback>'} if proxy else None
+                )
+            state.browsers[proxy] = browser
+            state.uses[proxy] = 0
+        state.uses[proxy] += 1
+        return browser
+
+    @contextmanager
+    def page(self, proxy: Optional[str] = None, throttling: Optional[ThrottlingProfile] = None,
+             archive: Optional[ReplayArchive] = None, **context_options: Any) -> Iterator[Any]:
+        """
+        Yield a page in a fresh context of this thread's pooled browser.
+
+        ``throttling`` overrides the pool-wide profile for this page. Its
+        network part is skipped when ``proxy`` already shapes the traffic.
+        With ``archive`` the page's traffic is recorded into it, or served
+        from it when the archive is open for replay.
+        """
+        browser = self._browser(proxy)
+        throttling = throttling or self.throttling
+        with span("browser.new_context"):
+            context = browser.new_context(**context_options)
+            try:
+                page = context.new_page()
+                if throttling:
+                    apply_throttling(context, page, throttling, shape_network=proxy is None)
+                flush_archive = attach_browser(page, archive) if archive else None
+            except Exception:
+                context.close()
+                raise
+        try:
+            yield page
+            if flush_archive:
+                with span("browser.archive"):
+                    flush_archive()
+        finally:
+            with span("browser.close_context"):
+                try:
+                    context.close()
+                except Exception:
+                    pass
+
+    def close_thread(self) -> None:
+        """Close the calling thread's browsers and driver."""
+        state = getattr(self._local, "state", None)
+        if state is None:
+            return
+        for browser in state.browsers.values():
+            try:
+                browser.close()
+            except Exception:
+                pass
+        if state.playwright is not None:
+            state.playwright.stop()
+        self._local.state = None
+
+
+_pool = BrowserPool()
+
+
+def get_browser_pool() -> BrowserPool:
+    return _pool
@@ -0,0 +1,273 @@
+"""
+Streaming export of speed-test results as JSONL, CSV or Arrow/Parquet.
+
+Every format writes the same flat rows: ``flatten_result`` turns a
+``SpeedResult`` or result dict into one ``EXPORT_COLUMNS`` row, with nested
+fields (``best_practices``, ``security_headers``, ``content_analysis``,
+``full_load_time``, browser extras...) spelled as dotted names like
+``security_headers.grade``. Columns a result does not have are empty, so a
+mix of deep and non-deep tests still lines up.
+
+Writers hold at most one batch of rows: JSONL and CSV flush every
+``flush_every`` rows, the Arrow writer turns each ``batch_size`` rows into a
+record batch. Memory therefore stays flat however many rows are exported.
+The Arrow writer needs ``pyarrow``; the other two only use the standard
+library.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+import csv
+import json
+import os
+
+
+# (column, type); types map to Arrow types and fix the CSV/JSONL schema
+EXPORT_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ('url', 'string'),
+    ('test_number', 'int'),
+    ('status_code', 'int'),
+    ('response_time', 'float'),
+    ('content_size', 'int'),
+    ('content_type', 'string'),
+    ('server', 'string'),
+    ('http_version', 'string'),
+    ('redirects', 'int'),
+    ('compression', 'string'),
+    ('dns', 'float'),
+    ('cdn', 'string'),
+    ('dom_ready_time', 'float'),
+    ('mobile_test', 'bool'),
+    ('network_profile', 'string'),
+    ('throttling', 'string'),
+    ('partial', 'bool'),
+    ('skipped_stages', 'string'),
+    ('cache_control', 'string'),
+    ('expires', 'string'),
+    ('last_modified', 'string'),
+    ('etag', 'string'),
+    ('connection', 'string'),
+    ('keep_alive', 'string'),
+    ('ttf', 'float'),
+    ('lcp', 'float'),
+    ('cls', 'float'),
+    ('fid', 'float'),
+    ('full_load_time.total_load_time', 'float'),
+    ('full_load_time.css_files', 'int'),
+    ('full_load_time.js_files', 'int'),
+    ('full_load_time.images', 'int'),
+    ('full_load_time.additional_time', 'float'),
+    ('full_load_time.fallback', 'string'),
+    ('full_load_time.estimator', 'string'),
+    ('full_load_time.prediction_error_ms', 'float'),
+    ('best_practices.has_viewport', 'bool'),
+    ('best_practices.has_title', 'bool'),
+    ('best_practices.has_meta_description', 'bool'),
+    ('best_practices.lazy_loaded_images', 'int'),
+    ('best_practices.has_preload_css', 'bool'),
+    ('best_practices.render_blocking_css', 'int'),
+    ('best_practices.render_blocking_js', 'int'),
+    ('best_practices.http_resources', 'int'),
+    ('content_analysis.img_count', 'int'),
+    ('content_analysis.link_count', 'int'),
+    ('content_analysis.script_count', 'int'),
+    ('content_analysis.style_count', 'int'),
+    ('content_analysis.div_count', 'int'),
+    ('content_analysis.inline_styles', 'int'),
+    ('content_analysis.external_scripts', 'int'),
+    ('content_analysis.external_styles', 'int'),
+    ('security_headers.https', 'string'),
+    ('security_headers.x_frame_options', 'string'),
+    ('security_headers.x_content_type', 'string'),
+    ('security_headers.x_xss_protection', 'string'),
+    ('security_headers.content_security_policy', 'string'),
+    ('security_headers.referrer_policy', 'string'),
+    ('security_headers.score', 'int'),
+    ('security_headers.grade', 'string'),
+    ('performance_grade.score', 'int'),
+    ('performance_grade.grade', 'string'),
+    ('repeat_view.total_load_time', 'float'),
+    ('repeat_view.cache_hit_ratio', 'float'),
+    ('repeat_view.bytes_from_network', 'int'),
+    ('visual_metrics.speed_index', 'float'),
+    ('visual_metrics.first_visual_change', 'float'),
+    ('visual_metrics.visually_complete', 'float'),
+    ('main_thread.first_contentful_paint', 'float'),
+    ('main_thread.total_blocking_time', 'float'),
+    ('main_thread.long_task_count', 'int'),
+    ('main_thread.script_time_ms', 'float'),
+    ('coverage.js.unused_bytes', 'int'),
+    ('coverage.js.unused_ratio', 'float'),
+    ('coverage.css.unused_bytes', 'int'),
+    ('coverage.css.unused_ratio', 'float'),
+    ('third_parties.third_party_requests', 'int'),
+    ('third_parties.third_party_bytes', 'int'),
+    ('third_parties.third_party_byte_share', 'float'),
+    ('render_blocking.estimated_savings_ms', 'float'),
+    ('uncertainty.response_time', 'float'),
+    ('uncertainty.ttfb', 'float'),
+    ('uncertainty.dns', 'float'),
+    ('uncertainty.full_load_time', 'float'),
+)
+COLUMN_NAMES = [name for name, _ in EXPORT_COLUMNS]
+FORMATS = ("jsonl", "csv", "arrow", "parquet")
+
+
+def flatten_result(result: Any) -> Dict[str, Any]:
+    """One export row from a ``SpeedResult`` or result dict."""
+    data = result.to_dict() if hasattr(result, "to_dict") else result
+    row = {}
+    for name in COLUMN_NAMES:
+        value: Any = data
+        for part in name.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+            if value is None:
+                break
+        if isinstance(value, (list, tuple)):
+            value = ";".join(str(v) for v in value)
+        elif isinstance(value, dict):
+            value = json.dumps(value, separators=(",", ":"), default=str)
+        row[name] = value
+    return row
+
+
+class Exporter(ABC):
+    """Base class: ``write`` rows, then ``close``; usable as a context manager."""
+
+    def __init__(self) -> None:
+        self.rows_written = 0
+
+    def write(self, result: Any) -> None:
+        self.write_row(flatten_result(result))
+
+    @abstractmethod
+    def write_row(self, row: Dict[str, Any]) -> None:
+        """Write one ``flatten_result`` row."""
+
+    def write_all(self, results: Iterable[Any]) -> int:
+        for result in results:
+            self.write(result)
+        return self.rows_written
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "Exporter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class JsonlExporter(Exporter):
+    def __init__(self, fh: TextIO, flush_every: int = 1000, close_file: bool = False) -> None:
+        super().__init__()
+        self.fh = fh
+        self.flush_every = flush_every
+        self.close_file = close_file
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self.fh.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+        self.rows_written += 1
+        if self.rows_written % self.flush_every == 0:
+            self.fh.flush()
+
+    def close(self) -> None:
+        self.fh.flush()
+        if self.close_file:
+            self.fh.close()
+
+
+class CsvExporter(Exporter):
+    def __init__(self, fh: TextIO, flush_every: int = 1000, close_file: bool = False) -> None:
+        super().__init__()
+        self.fh = fh
+        self.flush_every = flush_every
+        self.close_file = close_file
+        self._writer = csv.DictWriter(fh, fieldnames=COLUMN_NAMES)
+        self._writer.writeheader()
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        self._writer.writerow(row)
+        self.rows_written += 1
+        if self.rows_written % self.flush_every == 0:
+            self.fh.flush()
+
+    def close(self) -> None:
+        self.fh.flush()
+        if self.close_file:
+            self.fh.close()
+
+
+class ArrowExporter(Exporter):
+    """
+    Arrow IPC file (Feather v2, readable with ``pyarrow.feather.read_table``),
+    or Parquet when ``parquet`` is set; written in record batches.
+    """
+
+    def __init__(self, path: str, parquet: bool = False, batch_size: int = 10000) -> None:
+        import pyarrow as pa
+
+        super().__init__()
+        self._pa = pa
+        types = {'string': pa.string(), 'int': pa.int64(), 'float': pa.float64(), 'bool': pa.bool_()}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in EXPORT_COLUMNS])
+        self.batch_size = batch_size
+        self._columns: Dict[str, List[Any]] = {name: [] for name in COLUMN_NAMES}
+        self._pending = 0
+        if parquet:
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(path, self.schema)
+
+    def write_row(self, row: Dict[str, Any]) -> None:
+        for name, values in self._columns.items():
+            values.append(row[name])
+        self._pending += 1
+        self.rows_written += 1
+        if self._pending >= self.batch_size:
+            self._flush_batch()
+
+    def _flush_batch(self) -> None:
+        if not self._pending:
+            return
+        batch = self._pa.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        if hasattr(self._writer, "write_batch"):
+            self._writer.write_batch(batch)
+        else:
+            self._writer.write_table(self._pa.Table.from_batches([batch]))
+        for values in self._columns.values():
+            values.clear()
+        self._pending = 0
+
+    def close(self) -> None:
+        self._flush_batch()
+        self._writer.close()
+
+
+def export_format(path: str, fmt: Optional[str] = None) -> str:
+    """Format named explicitly or implied by the file extension (default JSONL)."""
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'. Available: {', '.join(FORMATS)}")
+        return fmt
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return {"csv": "csv", "arrow": "arrow", "feather": "arrow", "parquet": "parquet"}.get(ext, "jsonl")
+
+
+def open_exporter(path: str, fmt: Optional[str] = None) -> Exporter:
+    """
+    Exporter writing to ``path``.
+
+    Raises ``ImportError`` for Arrow or Parquet output without pyarrow.
+    """
+    fmt = export_format(path, fmt)
+    if fmt in ("arrow", "parquet"):
+        try:
+            return ArrowExporter(path, parquet=fmt == "parquet")
+        except ImportError:
+            raise ImportError(f"{fmt} export needs pyarrow (pip install pyarrow)") from None
+    fh = open(path, "w", encoding="utf-8", newline="" if fmt == "csv" else None)
+    return CsvExporter(fh, close_file=True) if fmt == "csv" else JsonlExporter(fh, close_file=True)
@@ -0,0 +1,199 @@
+"""
+Streaming HAR 1.2 export of HTTP and browser measurements.
+
+``HarWriter`` writes each entry to disk as soon as it is added, so a page
+with thousands of requests never exists as one JSON document in memory.
+Pages are written last because their timings are only known once the load
+has finished; HAR readers do not depend on key order.
+
+The ``HttpClient`` request contributes its time to first byte and total
+time (wait and receive phases). Browser entries carry the full DNS, connect,
+TLS, wait and receive breakdown from Playwright's resource timing.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, TextIO
+from urllib.parse import parse_qsl, urlsplit
+import json
+
+
+HAR_VERSION = "1.2"
+CREATOR = {"name": "Ninja Analyzer", "version": "1.0"}
+
+
+def iso_time(epoch_s: float) -> str:
+    return datetime.fromtimestamp(epoch_s, tz=timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _headers(pairs) -> List[Dict[str, str]]:
+    items = pairs.items() if hasattr(pairs, "items") else pairs
+    return [{"name": str(k), "value": str(v)} for k, v in items]
+
+
+def _query(url: str) -> List[Dict[str, str]]:
+    return [{"name": k, "value": v} for k, v in parse_qsl(urlsplit(url).query, keep_blank_values=True)]
+
+
+def _http_version(raw_version: Optional[int]) -> str:
+    return {10: "HTTP/1.0", 11: "HTTP/1.1", 20: "HTTP/2"}.get(raw_version, "unknown")
+
+
+def _body_size(content_length: Optional[str], body: bytes) -> int:
+    # A malformed or merged header ("123, 123") must not fail the whole analysis
+    try:
+        return int(content_length) if content_length else len(body)
+    except ValueError:
+        return len(body)
+
+
+def _phase(end: float, start: float) -> float:
+    return round(end - start, 3) if end >= 0 and start >= 0 else -1
+
+
+class HarWriter:
+    def __init__(self, fh: TextIO, close_file: bool = False) -> None:
+        self.fh = fh
+        self.close_file = close_file
+        self.entry_count = 0
+        self._pages: List[Dict[str, Any]] = []
+        self.fh.write('{"log":{"version":"%s","creator":%s,"entries":[' % (HAR_VERSION, json.dumps(CREATOR)))
+
+    @classmethod
+    def open(cls, path: str) -> "HarWriter":
+        return cls(open(path, "w", encoding="utf-8"), close_file=True)
+
+    def add_page(self, page_id: str, title: str, started_s: float,
+                 on_content_load_ms: Optional[float] = None, on_load_ms: Optional[float] = None) -> None:
+        self._pages.append({
+            "startedDateTime": iso_time(started_s),
+            "id": page_id,
+            "title": title,
+            "pageTimings": {
+                "onContentLoad": round(on_content_load_ms, 3) if on_content_load_ms is not None else -1,
+                "onLoad": round(on_load_ms, 3) if on_load_ms is not None else -1,
+            },
+        })
+
+    def add_entry(self, entry: Dict[str, Any]) -> None:
+        if self.entry_count:
+            self.fh.write(",")
+        self.fh.write(json.dumps(entry, separators=(",", ":")))
+        self.entry_count += 1
+
+    def close(self) -> None:
+        self.fh.write('],"pages":%s}}' % json.dumps(self._pages, separators=(",", ":")))
+        self.fh.flush()
+        if self.close_file:
+            self.fh.close()
+
+    def __enter__(self) -> "HarWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def http_entries(response, started_s: float, elapsed_ms: float, page_id: str) -> List[Dict[str, Any]]:
+    """HAR entries for a ``requests`` response and the redirects before it."""
+    entries = []
+    hops = [*response.history, response]
+    offset_s = 0.0
+    for resp in hops:
+        ttfb_ms = resp.elapsed.total_seconds() * 1000
+        # Only the final hop's total time is measured; earlier hops end at their first byte.
+        total_ms = elapsed_ms - offset_s * 1000 if resp is response else ttfb_ms
+        request = resp.request
+        body = resp.content if resp is response else b""
+        entries.append({
+            "pageref": page_id,
+            "startedDateTime": iso_time(started_s + offset_s),
+            "time": round(max(total_ms, ttfb_ms), 3),
+            "request": {
+                "method": request.method,
+                "url": resp.url,
+                "httpVersion": _http_version(getattr(resp.raw, "version", None)),
+                "cookies": [],
+                "headers": _headers(request.headers),
+                "queryString": _query(resp.url),
+                "headersSize": -1,
+                "bodySize": 0,
+            },
+            "response": {
+                "status": resp.status_code,
+                "statusText": resp.reason or "",
+                "httpVersion": _http_version(getattr(resp.raw, "version", None)),
+                "cookies": [],
+                "headers": _headers(resp.headers),
+                "content": {"size": len(body), "mimeType": resp.headers.get("content-type", "")},
+                "redirectURL": resp.headers.get("location", ""),
+                "headersSize": -1,
+                "bodySize": _body_size(resp.headers.get("content-length"), body),
+            },
+            "cache": {},
+            "timings": {
+                "blocked": -1,
+                "dns": -1,
+                "connect": -1,
+                "send": 0,
+                "wait": round(ttfb_ms, 3),
+                "receive": round(max(0.0, total_ms - ttfb_ms), 3),
+            },
+            "_source": "http_client",
+        })
+        offset_s += ttfb_ms / 1000
+    return entries
+
+
+def browser_entry(request: Any, page_id: str) -> Optional[Dict[str, Any]]:
+    """HAR entry for a finished Playwright request, or None without a response."""
+    response = request.response()
+    if response is None:
+        return None
+    timing = request.timing
+    try:
+        sizes = request.sizes()
+    except Exception:
+        sizes = {}
+    blocked = timing["domainLookupStart"] if timing["domainLookupStart"] >= 0 else timing["requestStart"]
+    ssl = _phase(timing["connectEnd"], timing["secureConnectionStart"]) if timing["secureConnectionStart"] > 0 else -1
+    timings = {
+        "blocked": round(blocked, 3) if blocked >= 0 else -1,
+        "dns": _phase(timing["domainLookupEnd"], timing["domainLookupStart"]),
+        "connect": _phase(timing["connectEnd"], timing["connectStart"]),
+        "ssl": ssl,
+        "send": 0,
+        "wait": _phase(timing["responseStart"], timing["requestStart"]),
+        "receive": _phase(timing["responseEnd"], timing["responseStart"]),
+    }
+    total = sum(v for k, v in timings.items() if k != "ssl" and v > 0)
+    headers = response.headers
+    return {
+        "pageref": page_id,
+        "startedDateTime": iso_time(timing["startTime"] / 1000),
+        "time": round(total, 3),
+        "request": {
+            "method": request.method,
+            "url": request.url,
+            "httpVersion": "unknown",
+            "cookies": [],
+            "headers": _headers(request.headers),
+            "queryString": _query(request.url),
+            "headersSize": sizes.get("requestHeadersSize", -1),
+            "bodySize": sizes.get("requestBodySize", 0),
+        },
+        "response": {
+            "status": response.status,
+            "statusText": response.status_text,
+            "httpVersion": "unknown",
+            "cookies": [],
+            "headers": _headers(headers),
+            "content": {"size": sizes.get("responseBodySize", -1), "mimeType": headers.get("content-type", "")},
+            "redirectURL": headers.get("location", ""),
+            "headersSize": sizes.get("responseHeadersSize", -1),
+            "bodySize": sizes.get("responseBodySize", -1),
+        },
+        "cache": {},
+        "timings": timings,
+        "_resourceType": request.resource_type,
+        "_source": "browser",
+    }
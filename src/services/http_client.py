@@ -3,9 +3,14 @@ Simple HTTP client wrapper around requests with sane defaults and helpers.
 """
 
 from typing import Dict, Optional
-import time
+from urllib.parse import urlparse
 import requests
 
+from src.services.rate_limiter import HostRateLimiter
+from src.services.replay import ReplayAdapter, ReplayArchive
+from src.utils.timing import timed
+from src.utils.tracing import span
+
 
 DEFAULT_HEADERS: Dict[str, str] = {
     "Accept": "*/*",
@@ -19,9 +24,12 @@ DEFAULT_HEADERS: Dict[str, str] = {
 
 
 class HttpResponse:
-    def __init__(self, response: requests.Response, elapsed_ms: float) -> None:
+    def __init__(self, response: requests.Response, elapsed_ms: float, uncertainty_ms: float = 0.0,
+                 ttfb_ms: Optional[float] = None) -> None:
         self.response = response
         self.elapsed_ms = elapsed_ms
+        self.uncertainty_ms = uncertainty_ms
+        self.ttfb_ms = ttfb_ms
 
     @property
     def status_code(self) -> int:
@@ -41,15 +49,83 @@ class HttpResponse:
 
 
 class HttpClient:
-    def __init__(self, timeout: int = 10, headers: Optional[Dict[str, str]] = None) -> None:
+    def __init__(
+        self,
+        timeout: int = 10,
+        headers: Optional[Dict[str, str]] = None,
+        rate_limiter: Optional[HostRateLimiter] = None,
+        pause_gc: bool = False,
+        archive: Optional[ReplayArchive] = None,
+    ) -> None:
         self.timeout = timeout
         self.headers = {**DEFAULT_HEADERS, **(headers or {})}
+        self.rate_limiter = rate_limiter
+        # Keeps GC off for the whole request; only for single-threaded runs, since
+        # overlapping requests would leave it disabled indefinitely
+        self.pause_gc = pause_gc
+        # Recording archives capture every response; replay archives answer instead of the network.
+        self.archive = archive
+        self._replay_adapter = ReplayAdapter(archive) if archive and not archive.recording else None
 
-    def get(self, url: str, headers: Optional[Dict[str, str]] = None, allow_redirects: bool = True) -> HttpResponse:
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        allow_redirects: bool = True,
+        timeout: Optional[float] = None,
+        proxy: Optional[str] = None,
+    ) -> HttpResponse:
         merged_headers = {**self.headers, **(headers or {})}
-        t0 = time.time()
-        resp = requests.get(url, timeout=self.timeout, allow_redirects=allow_redirects, headers=merged_headers)
-        t1 = time.time()
-        return HttpResponse(resp, elapsed_ms=round((t1 - t0) * 1000, 2))
+        host = urlparse(url).netloc
+        if self.rate_limiter:
+            # Waiting for a token happens before the timed window.
+            with span("http.rate_limit_wait"):
+                self.rate_limiter.acquire(host)
+        # A fresh session per call keeps every test on cold connections, but it
+        # is built and the request prepared before the clock starts.
+        session = requests.Session()
+        if self._replay_adapter:
+            session.mount("http://", self._replay_adapter)
+            session.mount("https://", self._replay_adapter)
+        try:
+            prepared = session.prepare_request(requests.Request("GET", url, headers=merged_headers))
+            proxies = {"http": proxy, "https": proxy} if proxy else {}
+            # Streamed, so send() returns at the final response's headers
+            settings = session.merge_environment_settings(prepared.url, proxies, True, None, None)
+            window = timed(pause_gc=self.pause_gc)
+            try:
+                with span("http.request", host=host):
+                    with window:
+                        # First-byte mark; the body is then read inside the window
+                        resp = session.send(
+                            prepared,
+                            timeout=timeout or self.timeout,
+                            allow_redirects=allow_redirects,
+                            **settings,
+                        )
+                        window.split()
+                        resp.content
+            except requests.RequestException:
+                if self.rate_limiter:
+                    self.rate_limiter.record(host, error=True)
+                raise
+        finally:
+            session.close()
+        elapsed_ms = round(window.elapsed_ms, 2)
+        if self.archive and self.archive.recording:
+            self.archive.add_response(resp, elapsed_ms)
+        if self.rate_limiter:
+            self.rate_limiter.record(
+                host,
+                status_code=resp.status_code,
+                elapsed_ms=elapsed_ms,
+                retry_after=resp.headers.get("retry-after"),
+            )
+        if self._replay_adapter:
+            # A replay sleeps out the whole recorded response; the archived first byte is the measurement
+            ttfb_ms = round(resp.elapsed.total_seconds() * 1000, 2)
+        else:
+            ttfb_ms = round(window.split_ms, 2) if window.split_ms is not None else None
+        return HttpResponse(resp, elapsed_ms=elapsed_ms, uncertainty_ms=window.uncertainty_ms, ttfb_ms=ttfb_ms)
 
 
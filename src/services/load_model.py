@@ -0,0 +1,196 @@
+"""
+Regression model estimating full page load time without a browser.
+
+``load_features`` extracts cheap predictors from the HTTP-only measurement
+(document time, size, redirects and the resources referenced by the HTML).
+Every engine result stores them under ``load_features``, so a batch run with
+the browser enabled yields training pairs of features and the measured
+``full_load_time``.
+
+``LoadTimeModel.fit`` solves a ridge-regularized least-squares problem with
+NumPy and reports k-fold cross-validated error. The model is saved as a
+small, versioned JSON file; loading a file of another format version fails
+instead of producing silently wrong estimates.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import re
+
+import numpy as np
+
+
+MODEL_FORMAT = "ninja-analyzer-load-model"
+# 2: css_files counts stylesheet links in any attribute order
+MODEL_VERSION = 2
+FEATURES = (
+    "response_time", "content_kb", "redirects", "css_files", "js_files", "images",
+    "render_blocking_css", "render_blocking_js",
+)
+# Ridge penalty on the standardized coefficients (the intercept is not penalized)
+RIDGE_ALPHA = 1.0
+CV_FOLDS = 5
+MIN_TRAINING_ROWS = 10
+
+_LINK_RE = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+_REL_RE = re.compile(r'(?<![\w-])rel\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))', re.IGNORECASE)
+_HREF_RE = re.compile(r'(?<![\w-])href\s*=\s*(?:"[^"]+"|\'[^\']+\'|[^\s"\'>]+)', re.IGNORECASE)
+_JS_RE = re.compile(r'<script[^>]+src=["\']([^"\']+)["\']', re.IGNORECASE)
+_IMG_RE = re.compile(r'<img[^>]+src=["\']([^"\']+)["\']', re.IGNORECASE)
+
+
+def _stylesheet_links(html: str) -> int:
+    """``<link>`` tags with a ``stylesheet`` rel and an href, whatever the attribute order."""
+    count = 0
+    for tag in _LINK_RE.findall(html):
+        rel = _REL_RE.search(tag)
+        if rel is None or _HREF_RE.search(tag) is None:
+            continue
+        # Same rule as render_blocking._HeadParser: alternate stylesheets are not applied
+        tokens = next(group for group in rel.groups() if group is not None).lower().split()
+        if "stylesheet" in tokens and "alternate" not in tokens:
+            count += 1
+    return count
+
+
+def load_features(html: str, response_time: float, content_size: int, redirects: int,
+                  best_practices: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """Model inputs available from the document request alone."""
+    best_practices = best_practices or {}
+    return {
+        'response_time': float(response_time),
+        'content_kb': round(content_size / 1024, 3),
+        'redirects': float(redirects),
+        'css_files': float(_stylesheet_links(html)),
+        'js_files': float(len(_JS_RE.findall(html))),
+        'images': float(len(_IMG_RE.findall(html))),
+        'render_blocking_css': float(best_practices.get('render_blocking_css', 0)),
+        'render_blocking_js': float(best_practices.get('render_blocking_js', 0)),
+    }
+
+
+def training_pairs(records: Iterable[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Feature matrix and measured load times from batch output records.
+
+    Only complete browser measurements count: results whose full load fell
+    back to an estimate or skipped a stage are ignored.
+    """
+    rows: List[List[float]] = []
+    targets: List[float] = []
+    for record in records:
+        for result in record.get("results") or ():
+            features = result.get("load_features")
+            full = result.get("full_load_time") or {}
+            if not features or result.get("partial") or full.get("fallback") is not None \
+                    or full.get("estimator") or not full.get("total_load_time"):
+                continue
+            rows.append([float(features.get(name, 0.0)) for name in FEATURES])
+            targets.append(float(full["total_load_time"]))
+    return np.array(rows, dtype=np.float64).reshape(-1, len(FEATURES)), np.array(targets, dtype=np.float64)
+
+
+def read_records(paths: Sequence[str]) -> Iterable[Dict[str, Any]]:
+    """Records from one or more batch JSONL output files."""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _solve(X: np.ndarray, y: np.ndarray, alpha: float) -> Tuple[np.ndarray, float]:
+    """Ridge least squares on standardized columns; returns raw-scale coefficients and intercept."""
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = (X - mean) / scale
+    y_mean = y.mean()
+    # Augmenting with sqrt(alpha) * I turns ridge into an ordinary lstsq problem
+    A = np.vstack([Z, np.sqrt(alpha) * np.eye(Z.shape[1])])
+    b = np.concatenate([y - y_mean, np.zeros(Z.shape[1])])
+    beta = np.linalg.lstsq(A, b, rcond=None)[0]
+    coefficients = beta / scale
+    return coefficients, float(y_mean - mean @ coefficients)
+
+
+def _error_metrics(actual: np.ndarray, predicted: np.ndarray) -> Dict[str, float]:
+    errors = predicted - actual
+    total = float(np.sum((actual - actual.mean()) ** 2))
+    return {
+        'mae_ms': round(float(np.mean(np.abs(errors))), 2),
+        'rmse_ms': round(float(np.sqrt(np.mean(errors ** 2))), 2),
+        'mape': round(float(np.mean(np.abs(errors) / np.maximum(actual, 1.0))), 4),
+        'r2': round(1.0 - float(np.sum(errors ** 2)) / total, 4) if total > 0 else 0.0,
+    }
+
+
+class LoadTimeModel:
+    def __init__(self, coefficients: Sequence[float], intercept: float, features: Sequence[str] = FEATURES,
+                 metrics: Optional[Dict[str, Any]] = None, samples: int = 0,
+                 trained_at: Optional[str] = None) -> None:
+        if tuple(features) != FEATURES:
+            raise ValueError(f"model features {list(features)} do not match this version's {list(FEATURES)}")
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.metrics = metrics or {}
+        self.samples = samples
+        self.trained_at = trained_at
+
+    @classmethod
+    def fit(cls, X: np.ndarray, y: np.ndarray, alpha: float = RIDGE_ALPHA, folds: int = CV_FOLDS,
+            seed: int = 0) -> "LoadTimeModel":
+        """Fit on all rows; ``metrics`` holds the k-fold cross-validated error."""
+        if len(y) < MIN_TRAINING_ROWS:
+            raise ValueError(f"need at least {MIN_TRAINING_ROWS} browser measurements, got {len(y)}")
+        order = np.random.default_rng(seed).permutation(len(y))
+        predicted = np.empty_like(y)
+        for fold in np.array_split(order, min(folds, len(y))):
+            train = np.setdiff1d(order, fold, assume_unique=True)
+            coefficients, intercept = _solve(X[train], y[train], alpha)
+            predicted[fold] = X[fold] @ coefficients + intercept
+        # Predictions are floored at the document time, as in predict()
+        predicted = np.maximum(predicted, X[:, 0])
+        coefficients, intercept = _solve(X, y, alpha)
+        return cls(
+            coefficients, intercept, metrics={**_error_metrics(y, predicted), 'folds': min(folds, len(y))},
+            samples=int(len(y)), trained_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        )
+
+    def predict_many(self, X: np.ndarray) -> np.ndarray:
+        # A page cannot finish loading before its document arrived
+        return np.maximum(X @ self.coefficients + self.intercept, X[:, 0])
+
+    def predict(self, features: Dict[str, float]) -> float:
+        row = np.array([[float(features.get(name, 0.0)) for name in FEATURES]])
+        return float(self.predict_many(row)[0])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'format': MODEL_FORMAT,
+            'version': MODEL_VERSION,
+            'trained_at': self.trained_at,
+            'samples': self.samples,
+            'features': list(FEATURES),
+            'coefficients': [round(float(c), 6) for c in self.coefficients],
+            'intercept': round(self.intercept, 6),
+            'metrics': self.metrics,
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_dict(), fh, indent=2)
+            fh.write("\n")
+
+    @classmethod
+    def load(cls, path: str) -> "LoadTimeModel":
+        with open(path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        if data.get('format') != MODEL_FORMAT:
+            raise ValueError(f"{path} is not a load-time model file")
+        if data.get('version') != MODEL_VERSION:
+            raise ValueError(f"{path} has model version {data.get('version')}, expected {MODEL_VERSION}")
+        return cls(data['coefficients'], data['intercept'], data['features'], data.get('metrics'),
+                   data.get('samples', 0), data.get('trained_at'))
@@ -0,0 +1,290 @@
+"""
+Long-running monitor that re-analyzes a list of URLs on per-URL intervals.
+
+Targets sit in one heap ordered by when they are due; a single dispatcher
+coroutine sleeps until the next one and hands it to a fixed pool of analysis
+threads, so thousands of URLs cost one heap entry each and at most
+``workers`` tests run at a time. First checks are spread over the interval
+and every later one is jittered so the targets never fire in lockstep.
+A failed check (an exception or a 5xx) is retried with exponential backoff
+capped at ``max_backoff_s``; the next success resets it.
+
+Every result is appended to a ``ResultArchive`` and, with a detector state
+file, fed to the online ``RegressionDetector``; its events are printed as
+JSON lines on stdout as they happen. The engine, its HTTP client, circuit
+breaker, rate limiter and per-thread browsers are shared by all checks, so
+browsers stay warm between tests. Document requests still run on fresh
+connections, as every measurement in the engine does.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import signal
+import sys
+import threading
+import time
+
+from src.services.http_client import HttpClient
+from src.services.rate_limiter import HostRateLimiter
+from src.services.regression import RegressionDetector
+from src.services.resilience import AdaptiveTimeout, CircuitBreaker
+from src.services.result_archive import ResultArchive
+from src.services.results import SpeedResult
+from src.services.scheduler import PRIORITY_BULK, configure_scheduler
+from src.services.speed_engine import SpeedEngine, DescribeError
+from src.utils.url import is_valid_url, normalize_url
+
+
+DEFAULT_INTERVAL_S = 300.0
+MIN_INTERVAL_S = 10.0
+
+
+class MonitorTarget:
+    __slots__ = ("url", "interval_s", "checks", "failures", "last_error", "next_check")
+
+    def __init__(self, url: str, interval_s: float = DEFAULT_INTERVAL_S) -> None:
+        self.url = url
+        self.interval_s = max(MIN_INTERVAL_S, interval_s)
+        self.checks = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.next_check = 0.0
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "interval_s": self.interval_s,
+            "checks": self.checks,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+def read_monitor_config(path: str, default_interval_s: float = DEFAULT_INTERVAL_S) -> Iterator[MonitorTarget]:
+    """
+    Targets from a text file with one ``<url> [interval seconds]`` per line.
+
+    Blank lines and ``#`` comments are skipped, invalid URLs raise ``ValueError``.
+    """
+    with open(path, "r", encoding="utf-8") as fh:
+        for number, line in enumerate(fh, 1):
+            fields = line.split("#", 1)[0].split()
+            if not fields:
+                continue
+            url = normalize_url(fields[0])
+            if not is_valid_url(url):
+                raise ValueError(f"{path}:{number}: invalid URL '{fields[0]}'")
+            yield MonitorTarget(url, float(fields[1]) if len(fields) > 1 else default_interval_s)
+
+
+def check_failed(result: SpeedResult) -> bool:
+    return result.status_code >= 500
+
+
+class Monitor:
+    def __init__(
+        self,
+        targets: List[MonitorTarget],
+        archive: ResultArchive,
+        engine_options: Optional[Dict[str, Any]] = None,
+        workers: int = 8,
+        jitter: float = 0.1,
+        max_backoff_s: float = 3600.0,
+        flush_every_s: float = 30.0,
+        scheduler_limits: Optional[Dict[str, int]] = None,
+        rate_limit: Optional[float] = 1.0,
+        on_result: Optional[Callable[[MonitorTarget, SpeedResult, float], None]] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """
+        ``on_result(target, result, timestamp)`` runs on the event loop after
+        each archived result; it must be quick.
+        """
+        self.targets = targets
+        self.archive = archive
+        self.workers = max(1, workers)
+        self.jitter = min(max(jitter, 0.0), 0.5)
+        self.max_backoff_s = max_backoff_s
+        self.flush_every_s = flush_every_s
+        self.on_result = on_result
+        self._random = random.Random(seed)
+        scheduler = configure_scheduler(max_concurrent=self.workers + 1, **(scheduler_limits or {}))
+        self.engine = SpeedEngine(
+            http=HttpClient(rate_limiter=HostRateLimiter(rate=rate_limit) if rate_limit else None),
+            scheduler=scheduler,
+            breaker=CircuitBreaker(),
+            timeouts=AdaptiveTimeout(),
+            **{"priority": PRIORITY_BULK, "tenant": "monitor", "budget_s": 60.0, **(engine_options or {})},
+        )
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="monitor")
+        self._heap: List[Tuple[float, int, MonitorTarget]] = []
+        self._order = itertools.count()
+        self._running: Set[asyncio.Task] = set()
+        self._stop = asyncio.Event()
+        self.checks = 0
+        self.failures = 0
+        self.max_lag_s = 0.0
+        self.started_at = time.time()
+
+    def _jittered(self, delay: float) -> float:
+        return delay * (1.0 + self._random.uniform(-self.jitter, self.jitter))
+
+    def _schedule(self, target: MonitorTarget, delay: float) -> None:
+        target.next_check = time.time() + delay
+        due = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._heap, (due, next(self._order), target))
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    async def run(self) -> None:
+        """Check targets until ``stop`` is called, then finish running checks."""
+        for target in self.targets:
+            # Spread first checks over one interval instead of starting them all now
+            self._schedule(target, self._random.uniform(0, target.interval_s))
+        slots = asyncio.Semaphore(self.workers)
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+        try:
+            while not self._stop.is_set():
+                now = loop.time()
+                if now - last_flush >= self.flush_every_s:
+                    self.archive.flush()
+                    last_flush = now
+                if not self._heap or self._heap[0][0] > now:
+                    wait = self._heap[0][0] - now if self._heap else self.flush_every_s
+                    try:
+                        await asyncio.wait_for(self._stop.wait(), timeout=min(wait, self.flush_every_s))
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await slots.acquire()
+                due, _, target = heapq.heappop(self._heap)
+                self.max_lag_s = max(self.max_lag_s, loop.time() - due)
+                task = asyncio.create_task(self._check(target))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+            self.archive.flush()
+            await self._close_browsers()
+            self.executor.shutdown(wait=True)
+
+    async def _check(self, target: MonitorTarget) -> None:
+        loop = asyncio.get_running_loop()
+        target.checks += 1
+        self.checks += 1
+        try:
+            result = await loop.run_in_executor(self.executor, self.engine.RunTest, target.url, target.checks)
+        except Exception as ex:
+            result = None
+            target.last_error = DescribeError(ex)
+        else:
+            timestamp = time.time()
+            target.last_error = f"HTTP {result.status_code}" if check_failed(result) else None
+            try:
+                self.archive.append(result, timestamp=timestamp)
+                if self.on_result is not None:
+                    self.on_result(target, result, timestamp)
+            except Exception as ex:
+                # A full disk or a failing callback must not drop the target from the heap
+                print(f"monitor: {target.url}: {DescribeError(ex)}", file=sys.stderr, flush=True)
+        if target.last_error is None:
+            target.failures = 0
+            delay = target.interval_s
+        else:
+            target.failures += 1
+            self.failures += 1
+            # Capped exponent: 2.0 ** 1024 overflows a float after enough failures
+            delay = min(target.interval_s * 2 ** min(target.failures, 30),
+                        max(self.max_backoff_s, target.interval_s))
+        self._schedule(target, self._jittered(delay))
+
+    async def _close_browsers(self) -> None:
+        # Each executor thread owns its browsers; the barrier makes every thread take one close call
+        barrier = threading.Barrier(self.workers)
+
+        def close() -> None:
+            try:
+                barrier.wait(timeout=30)
+            except threading.BrokenBarrierError:
+                pass
+            self.engine.browser_pool.close_thread()
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, close) for _ in range(self.workers)),
+                             return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "targets": len(self.targets),
+            "running": len(self._running),
+            "checks": self.checks,
+            "failures": self.failures,
+            "backing_off": sum(1 for t in self.targets if t.failures),
+            "max_lag_s": round(self.max_lag_s, 3),
+            "archived": len(self.archive),
+            "uptime_s": round(time.time() - self.started_at, 1),
+        }
+
+
+def run_monitor(
+    config_path: str,
+    archive_path: str,
+    default_interval_s: float = DEFAULT_INTERVAL_S,
+    status_every_s: float = 60.0,
+    duration_s: Optional[float] = None,
+    detector_state: Optional[str] = None,
+    **monitor_options: Any,
+) -> Dict[str, Any]:
+    """Monitor the targets in ``config_path`` until interrupted (or for ``duration_s``)."""
+    targets = list(read_monitor_config(config_path, default_interval_s))
+    detector = RegressionDetector(detector_state) if detector_state else None
+    saved_at = [time.monotonic()]
+
+    def detect(target: MonitorTarget, result: SpeedResult, timestamp: float) -> None:
+        for event in detector.update(target.url, result, timestamp):
+            print(json.dumps(event), flush=True)
+        if time.monotonic() - saved_at[0] >= 60:
+            detector.save()
+            saved_at[0] = time.monotonic()
+
+    async def _main() -> Dict[str, Any]:
+        with ResultArchive(archive_path) as archive:
+            monitor = Monitor(targets, archive, on_result=detect if detector else None, **monitor_options)
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, monitor.stop)
+                except (NotImplementedError, RuntimeError):
+                    # Windows: Ctrl+C still raises KeyboardInterrupt
+                    pass
+            if duration_s:
+                loop.call_later(duration_s, monitor.stop)
+
+            async def report() -> None:
+                while True:
+                    await asyncio.sleep(status_every_s)
+                    print(json.dumps(monitor.stats()), file=sys.stderr, flush=True)
+
+            reporter = asyncio.create_task(report()) if status_every_s > 0 else None
+            try:
+                await monitor.run()
+            finally:
+                if reporter is not None:
+                    reporter.cancel()
+                if detector is not None:
+                    detector.save()
+            stats = monitor.stats()
+            if detector is not None:
+                stats["open_regressions"] = sum(1 for _ in detector.alarms())
+            return stats
+
+    return asyncio.run(_main())
@@ -0,0 +1,318 @@
+"""
+Local network emulator: a throttling HTTP/HTTPS forward proxy.
+
+Traffic routed through the proxy gets the round-trip latency, bandwidth,
+jitter and packet loss of a named profile. HTTPS is tunnelled with CONNECT, so
+no certificates are involved. Bandwidth is shared by all connections of one
+proxy port, like a real access link.
+
+The emulator's main port is one shared link (the standalone ``netem``
+command). Analyses use ``session`` instead: every thread gets a port of its
+own, reset for each test, so a page's numbers do not depend on what other
+threads load at the same time. Jitter and loss come from an RNG seeded per
+connection with the emulator seed, the test key, the target host and port
+and the connection's index to that target within the test, so the same
+profile, seed and test replay the same delays whatever else ran before.
+
+Loss is modelled the way TCP experiences it: a lost segment is not dropped
+but delivered late, after a retransmission delay.
+"""
+
+from typing import Dict, Optional, Tuple
+import asyncio
+import random
+import threading
+
+
+SEGMENT_BYTES = 1460
+CHUNK_BYTES = 16 * 1024
+# Chunks buffered per direction before the proxy stops reading (about 1 MB).
+PIPE_DEPTH = 64
+
+
+class NetworkProfile:
+    __slots__ = ("name", "rtt_ms", "down_kbps", "up_kbps", "jitter_ms", "loss")
+
+    def __init__(self, name: str, rtt_ms: float, down_kbps: float, up_kbps: float,
+                 jitter_ms: float = 0.0, loss: float = 0.0) -> None:
+        self.name = name
+        self.rtt_ms = rtt_ms
+        self.down_kbps = down_kbps
+        self.up_kbps = up_kbps
+        self.jitter_ms = jitter_ms
+        self.loss = loss
+
+    def to_dict(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# Values follow the usual DevTools/Lighthouse presets.
+PROFILES: Dict[str, NetworkProfile] = {
+    "3G": NetworkProfile("3G", rtt_ms=300, down_kbps=400, up_kbps=400, jitter_ms=20, loss=0.01),
+    "4G": NetworkProfile("4G", rtt_ms=150, down_kbps=1600, up_kbps=750, jitter_ms=10, loss=0.005),
+    "cable": NetworkProfile("cable", rtt_ms=28, down_kbps=5000, up_kbps=1000, jitter_ms=2, loss=0.0),
+    "fiber": NetworkProfile("fiber", rtt_ms=5, down_kbps=50000, up_kbps=20000, jitter_ms=1, loss=0.0),
+}
+
+MOBILE_PROFILE = "4G"
+
+
+def get_profile(name: str) -> NetworkProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        for key, profile in PROFILES.items():
+            if key.lower() == str(name).lower():
+                return profile
+        raise ValueError(f"Unknown network profile {name!r}; choose from {', '.join(PROFILES)}")
+
+
+class _Link:
+    """One direction of the emulated access link."""
+
+    def __init__(self, kbps: float) -> None:
+        self.bytes_per_s = kbps * 1000 / 8
+        self.free_at = 0.0
+
+    def transmit(self, now: float, size: int) -> float:
+        start = max(now, self.free_at)
+        self.free_at = start + size / self.bytes_per_s
+        return self.free_at
+
+
+class _LinkState:
+    """Both link directions and the connection seeds of one proxy port."""
+
+    def __init__(self, profile: NetworkProfile, seed: str) -> None:
+        self.down = _Link(profile.down_kbps)
+        self.up = _Link(profile.up_kbps)
+        self.seed = seed
+        self._connections: Dict[Tuple[str, int], int] = {}
+
+    def rng(self, target: Tuple[str, int]) -> random.Random:
+        """RNG of the next connection to ``target``; only used on the proxy loop."""
+        index = self._connections.get(target, 0)
+        self._connections[target] = index + 1
+        return random.Random(f"{self.seed}:{target[0]}:{target[1]}:{index}")
+
+
+class NetworkSession:
+    """A proxy port of one thread; ``reset`` starts a test on it."""
+
+    def __init__(self, emulator: "NetworkEmulator", port: int = 0) -> None:
+        self.emulator = emulator
+        self.port = port
+        self.state = _LinkState(emulator.profile, f"{emulator.seed}:")
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.emulator.host}:{self.port}"
+
+    def reset(self, key: str) -> str:
+        """Fresh, idle links seeded by ``key``; returns the proxy URL."""
+        # Connections still open from the previous test keep their old state
+        self.state = _LinkState(self.emulator.profile, f"{self.emulator.seed}:{key}")
+        return self.url
+
+
+class NetworkEmulator:
+    def __init__(self, profile: NetworkProfile, host: str = "127.0.0.1", port: int = 0, seed: int = 0) -> None:
+        self.profile = profile
+        self.host = host
+        self.port = port
+        self.seed = seed
+        self._shared = _LinkState(profile, str(seed))
+        self._local = threading.local()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "NetworkEmulator":
+        """Run the proxy on a background event loop thread."""
+        self._thread = threading.Thread(target=self._run, name=f"netem-{self.profile.name}", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop and self._server:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def session(self, key: str) -> str:
+        """
+        Proxy URL of the calling thread's own port, reset for the test ``key``.
+
+        A thread runs one test at a time, so its port carries only that
+        test's traffic. Needs the emulator started with ``start``.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            if self._loop is None:
+                raise RuntimeError("network sessions need an emulator started with start()")
+            session = NetworkSession(self)
+
+            async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+                await self._handle(reader, writer, session.state)
+
+            server = asyncio.run_coroutine_threadsafe(
+                asyncio.start_server(handle, self.host, 0), self._loop).result()
+            session.port = server.sockets[0].getsockname()[1]
+            self._local.session = session
+        return session.reset(key)
+
+    async def serve_forever(self) -> None:
+        """Run the proxy on the current event loop (standalone mode)."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        async with self._server:
+            await self._server.serve_forever()
+
+    def _delay(self, link: _Link, size: int, rng: random.Random) -> float:
+        """Absolute loop time at which a chunk of ``size`` bytes arrives."""
+        p = self.profile
+        now = asyncio.get_running_loop().time()
+        arrival = link.transmit(now, size) + p.rtt_ms / 2000
+        if p.jitter_ms:
+            arrival += rng.uniform(-p.jitter_ms, p.jitter_ms) / 1000
+        if p.loss:
+            segments = (size + SEGMENT_BYTES - 1) // SEGMENT_BYTES
+            lost = sum(1 for _ in range(segments) if rng.random() < p.loss)
+            arrival += lost * 1.5 * p.rtt_ms / 1000
+        return arrival
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                    link: _Link, rng: random.Random, first: bytes = b"",
+                    source: Optional[asyncio.StreamWriter] = None) -> None:
+        """Copy ``reader`` to ``writer``; ``source`` is the writer of the socket ``reader`` reads from."""
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=PIPE_DEPTH)
+
+        async def deliver() -> None:
+            try:
+                while True:
+                    item = await chunks.get()
+                    if item is None:
+                        return
+                    at, data = item
+                    wait = at - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    writer.write(data)
+                    await writer.drain()
+            except (ConnectionError, OSError):
+                # The peer is gone: close both sockets so the reading side sees EOF,
+                # and keep taking chunks so a put on the full queue cannot block forever
+                for w in (writer, source):
+                    if w is not None:
+                        w.close()
+                while await chunks.get() is not None:
+                    pass
+
+        sender = asyncio.create_task(deliver())
+        last = 0.0
+        try:
+            data = first
+            while True:
+                if data:
+                    # TCP delivers in order, so a chunk never overtakes the previous one.
+                    last = max(last, self._delay(link, len(data), rng))
+                    await chunks.put((last, data))
+                data = await reader.read(CHUNK_BYTES)
+                if not data:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            await chunks.put(None)
+            try:
+                await sender
+                if writer.can_write_eof():
+                    writer.write_eof()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter,
+                      state: Optional[_LinkState] = None) -> None:
+        state = state or self._shared
+        upstream_writer = None
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+            target, first, tunnel = self._parse_request(head)
+            rng = state.rng(target)
+            # A new upstream connection costs one round trip (TCP handshake).
+            await asyncio.sleep(self.profile.rtt_ms / 1000)
+            upstream_reader, upstream_writer = await asyncio.open_connection(*target)
+            if tunnel:
+                client_writer.write(b"HTTP/1.1 200 Connection Established\r\n\r\n")
+                await client_writer.drain()
+            await asyncio.gather(
+                self._pipe(client_reader, upstream_writer, state.up, rng, first, source=client_writer),
+                self._pipe(upstream_reader, client_writer, state.down, rng, source=upstream_writer),
+            )
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            client_writer.write(b"HTTP/1.1 400 Bad Request\r\nConnection: close\r\n\r\n")
+        except OSError:
+            client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nConnection: close\r\n\r\n")
+        finally:
+            for w in (upstream_writer, client_writer):
+                if w is not None:
+                    try:
+                        w.close()
+                    except Exception:
+                        pass
+
+    @staticmethod
+    def _parse_request(head: bytes) -> Tuple[Tuple[str, int], bytes, bool]:
+        """Return the upstream address, bytes to forward first and whether to tunnel."""
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ", 2)
+        if method.upper() == "CONNECT":
+            host, _, port = target.rpartition(":")
+            return (host.strip("[]"), int(port or 443)), b"", True
+        if not target.lower().startswith("http://"):
+            raise ValueError("Proxy requests need an absolute URL")
+        rest = target[len("http://"):]
+        authority, _, path = rest.partition("/")
+        # "http://example.com" and "http://example.com?q" have no path; the origin form needs one
+        authority, mark, query = authority.partition("?")
+        host, _, port = authority.rpartition(":") if ":" in authority else (authority, "", "80")
+        # One request per connection keeps each upstream pairing unambiguous.
+        headers = [
+            line for line in lines[1:]
+            if line and not line.lower().startswith(("connection:", "proxy-connection:", "keep-alive:"))
+        ]
+        request = [f"{method} /{path}{mark}{query} {version}", *headers, "Connection: close", "", ""]
+        return (host.strip("[]"), int(port or 80)), "\r\n".join(request).encode("latin-1"), False
+
+
+_emulators: Dict[Tuple[str, int], NetworkEmulator] = {}
+_emulators_lock = threading.Lock()
+
+
+def get_emulator(profile_name: str, seed: int = 0) -> NetworkEmulator:
+    """
+    Return a running emulator for the profile, starting it on first use.
+
+    Its ``url`` is the shared link; analyses take a ``session`` port instead.
+    """
+    profile = get_profile(profile_name)
+    key = (profile.name, seed)
+    with _emulators_lock:
+        emulator = _emulators.get(key)
+        if emulator is None:
+            emulator = _emulators[key] = NetworkEmulator(profile, seed=seed).start()
+        return emulator
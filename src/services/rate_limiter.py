@@ -0,0 +1,127 @@
+"""
+Per-host politeness rate limiting for bulk HTTP work.
+
+Each host gets a token bucket whose refill rate adapts to how the host behaves
+(additive increase, multiplicative decrease): throttling responses (429/503),
+connection errors and rising latency cut the rate, healthy responses slowly
+restore it. ``Retry-After`` blocks the host until the advertised time.
+
+The bucket table and its lock are injectable, so a ``multiprocessing.Manager``
+dict and lock let every worker process of a run share the same limits.
+"""
+
+from email.utils import parsedate_to_datetime
+from typing import Any, MutableMapping, Optional, Tuple
+import threading
+import time
+
+
+THROTTLE_STATUSES = (429, 503)
+
+# tokens, last refill, current rate, blocked until, latency EWMA, latency baseline
+_BucketState = Tuple[float, float, float, float, float, float]
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Return the ``Retry-After`` delay in seconds, accepting seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        target = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, target - (now if now is not None else time.time()))
+
+
+class HostRateLimiter:
+    def __init__(
+        self,
+        rate: float = 2.0,
+        burst: float = 4.0,
+        min_rate: float = 0.1,
+        max_rate: Optional[float] = None,
+        latency_factor: float = 2.0,
+        max_retry_after: float = 300.0,
+        state: Optional[MutableMapping[str, Any]] = None,
+        lock: Any = None,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate
+        self.latency_factor = latency_factor
+        self.max_retry_after = max_retry_after
+        self._state = state if state is not None else {}
+        self._lock = lock if lock is not None else threading.Lock()
+
+    def _load(self, host: str, now: float) -> _BucketState:
+        state = self._state.get(host)
+        if state is None:
+            return (self.burst, now, self.rate, 0.0, 0.0, 0.0)
+        tokens, updated, rate, blocked, ewma, baseline = state
+        tokens = min(self.burst, tokens + (now - updated) * rate)
+        return (tokens, now, rate, blocked, ewma, baseline)
+
+    def acquire(self, host: str) -> float:
+        """Block until ``host`` may be requested; returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, _, rate, blocked, ewma, baseline = self._load(host, now)
+                if now < blocked:
+                    delay = blocked - now
+                elif tokens >= 1.0:
+                    self._state[host] = (tokens - 1.0, now, rate, blocked, ewma, baseline)
+                    return waited
+                else:
+                    delay = (1.0 - tokens) / rate
+                self._state[host] = (tokens, now, rate, blocked, ewma, baseline)
+            delay = min(delay, 1.0)
+            time.sleep(delay)
+            waited += delay
+
+    def record(
+        self,
+        host: str,
+        status_code: Optional[int] = None,
+        elapsed_ms: Optional[float] = None,
+        retry_after: Optional[str] = None,
+        error: bool = False,
+    ) -> None:
+        """Feed the outcome of a request back into the host's rate."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated, rate, blocked, ewma, baseline = self._load(host, now)
+            throttled = error or status_code in THROTTLE_STATUSES
+            delay = parse_retry_after(retry_after)
+            if delay is not None and throttled:
+                blocked = max(blocked, now + min(delay, self.max_retry_after))
+            if elapsed_ms is not None and not error:
+                ewma = elapsed_ms if ewma == 0.0 else 0.8 * ewma + 0.2 * elapsed_ms
+                # The baseline follows drops immediately and rises slowly, so a
+                # lasting slowdown is eventually accepted as the new normal.
+                baseline = ewma if baseline == 0.0 or ewma < baseline else baseline + 0.02 * (ewma - baseline)
+            if throttled:
+                rate = max(self.min_rate, rate * 0.5)
+                tokens = min(tokens, 0.0)
+            elif baseline and ewma > baseline * self.latency_factor:
+                rate = max(self.min_rate, rate * 0.8)
+            else:
+                rate = min(self.max_rate, rate + self.max_rate * 0.1)
+            self._state[host] = (tokens, updated, rate, blocked, ewma, baseline)
+
+    def current_rate(self, host: str) -> float:
+        with self._lock:
+            state = self._state.get(host)
+            return state[2] if state else self.rate
+
+
+def create_shared_limiter(manager: Any, **options: Any) -> HostRateLimiter:
+    """Build a limiter whose state lives in ``manager`` so processes can share it."""
+    return HostRateLimiter(state=manager.dict(), lock=manager.Lock(), **options)
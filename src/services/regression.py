@@ -0,0 +1,262 @@
+"""
+Online regression detection on TTFB, full load time and page bytes per URL.
+
+Each metric of each URL keeps a handful of numbers: an EWMA baseline mean
+and variance, a fast EWMA of the current level and a two-sided CUSUM. A
+sample updates them in O(1). Values are compared on a log scale (plus a
+small per-metric offset, so 2 ms -> 4 ms on a tiny TTFB is not a "doubling"),
+which makes the thresholds relative: a CDN that stops caching and doubles
+TTFB trips the detector the same way on a fast and a slow site.
+
+Single-sample noise is filtered by clipping every standardized deviation at
+``CLIP_Z`` before it enters the CUSUM: one spike adds at most
+``CLIP_Z - SLACK_Z``, under half of ``THRESHOLD_Z``, so isolated outliers do
+not raise an alarm while a doubled TTFB is flagged after about three samples.
+The baseline stops learning while a shift is suspected, so it does not
+absorb the regression it is tracking. An alarm ends with ``recovered`` when
+the metric returns, or ``rebaselined`` once the new level has held for
+``REBASELINE_AFTER`` samples and becomes the baseline.
+
+State for all URLs lives in one NumPy structured array (``STATE_DTYPE``, 48
+bytes per URL and metric) saved atomically with ``save``, so a restarted
+monitor carries on from where it stopped.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import math
+import os
+import time
+
+import numpy as np
+
+from src.services.result_archive import ResultArchive
+
+
+STATE_FORMAT = "ninja-analyzer-regression-state"
+STATE_VERSION = 1
+
+# (metric, log offset, minimum standard deviation on the log scale)
+METRICS: Tuple[Tuple[str, float, float], ...] = (
+    ('ttfb', 20.0, 0.10),
+    ('full_load_time', 50.0, 0.10),
+    ('content_size', 1024.0, 0.02),
+)
+METRIC_NAMES = [name for name, _, _ in METRICS]
+
+WARMUP = 10            # samples that only build the baseline
+ALPHA = 0.05           # baseline EWMA weight
+LEVEL_ALPHA = 0.3      # current-level EWMA weight
+CLIP_Z = 4.0
+SLACK_Z = 0.5
+THRESHOLD_Z = 8.0
+REBASELINE_AFTER = 20
+
+STATE_DTYPE = np.dtype([
+    ('mean', '<f8'),
+    ('var', '<f8'),
+    ('level', '<f8'),
+    ('cusum_up', '<f8'),
+    ('cusum_down', '<f8'),
+    ('samples', '<u4'),
+    ('alarm_samples', '<u2'),
+    ('alarm', 'i1'),
+    ('_pad', 'u1'),
+])
+
+ALARM_NONE = 0
+ALARM_REGRESSION = 1
+ALARM_IMPROVEMENT = -1
+
+
+def result_metrics(result: Any) -> Dict[str, Optional[float]]:
+    """
+    Metric values of a ``SpeedResult`` or result dict.
+
+    TTFB falls back to the document response time for results without it
+    (non-deep tests); a missing or zero full load time (no browser and no
+    estimate) is skipped.
+    """
+    data = result.to_dict() if hasattr(result, "to_dict") else result
+    ttfb = data.get('ttf')
+    return {
+        'ttfb': data.get('response_time') if ttfb is None else ttfb,
+        'full_load_time': (data.get('full_load_time') or {}).get('total_load_time') or None,
+        'content_size': data.get('content_size'),
+    }
+
+
+def _value(y: float, offset: float) -> float:
+    return round(max(math.exp(y) - offset, 0.0), 2)
+
+
+class RegressionDetector:
+    def __init__(self, state_path: Optional[str] = None, capacity: int = 1024) -> None:
+        self.state_path = state_path
+        self._index: Dict[str, int] = {}
+        self._urls: List[str] = []
+        self._state = np.zeros((max(1, capacity), len(METRICS)), dtype=STATE_DTYPE)
+        if state_path and os.path.exists(state_path):
+            self._load(state_path)
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def _load(self, path: str) -> None:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data['format']) != STATE_FORMAT or int(data['version']) != STATE_VERSION:
+                raise ValueError(f"{path} is not a version {STATE_VERSION} regression state file")
+            if [str(m) for m in data['metrics']] != METRIC_NAMES:
+                raise ValueError(f"{path} tracks different metrics: {list(data['metrics'])}")
+            urls = [str(u) for u in data['urls']]
+            state = data['state'].astype(STATE_DTYPE)
+        self._urls = urls
+        self._index = {url: i for i, url in enumerate(urls)}
+        self._state = np.zeros((max(len(urls) * 2, 1024), len(METRICS)), dtype=STATE_DTYPE)
+        self._state[:len(urls)] = state
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the state of every URL; the old file is replaced only once the new one is complete."""
+        path = path or self.state_path
+        if not path:
+            raise ValueError("no state path given")
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, format=STATE_FORMAT, version=STATE_VERSION, metrics=np.array(METRIC_NAMES),
+                     urls=np.array(self._urls, dtype=str), state=self._state[:len(self._urls)])
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    def _row(self, url: str) -> int:
+        row = self._index.get(url)
+        if row is None:
+            row = self._index[url] = len(self._urls)
+            self._urls.append(url)
+            if row == len(self._state):
+                grown = np.zeros((len(self._state) * 2, len(METRICS)), dtype=STATE_DTYPE)
+                grown[:row] = self._state
+                self._state = grown
+        return row
+
+    def update(self, url: str, result: Any, timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Feed one result; returns the events it caused (usually none)."""
+        return self.update_values(url, result_metrics(result), timestamp)
+
+    def update_values(self, url: str, values: Dict[str, Optional[float]],
+                      timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        row = self._state[self._row(url)]
+        events = []
+        for column, (metric, offset, min_std) in enumerate(METRICS):
+            value = values.get(metric)
+            if value is None or value != value or value < 0:
+                continue
+            kind = self._step(row[column], math.log(value + offset), min_std)
+            if kind:
+                s = row[column]
+                baseline = _value(float(s['mean']), offset)
+                current = _value(float(s['level']), offset)
+                events.append({
+                    'url': url,
+                    'metric': metric,
+                    'event': kind,
+                    'timestamp': time.time() if timestamp is None else timestamp,
+                    'baseline': baseline,
+                    'current': current,
+                    'change': round(current / baseline - 1, 3) if baseline > 0 else None,
+                    'samples': int(s['samples']),
+                })
+        return events
+
+    @staticmethod
+    def _step(s: np.void, y: float, min_std: float) -> Optional[str]:
+        # Scalar arithmetic on Python floats; the record is written back once per field
+        n = int(s['samples']) + 1
+        s['samples'] = min(n, 2 ** 32 - 1)
+        mean, var = float(s['mean']), float(s['var'])
+        level = y if n == 1 else float(s['level']) + LEVEL_ALPHA * (y - float(s['level']))
+        s['level'] = level
+        if n <= WARMUP:
+            # Plain running mean and variance until the baseline is trusted
+            delta = y - mean
+            mean += delta / n
+            s['mean'] = mean
+            s['var'] = var + (delta * (y - mean) - var) / n
+            return None
+
+        std = math.sqrt(max(var, min_std * min_std))
+        z = min(max((y - mean) / std, -CLIP_Z), CLIP_Z)
+        up = max(0.0, float(s['cusum_up']) + z - SLACK_Z)
+        down = max(0.0, float(s['cusum_down']) - z - SLACK_Z)
+        alarm = int(s['alarm'])
+        kind = None
+        if alarm == ALARM_NONE:
+            if up > THRESHOLD_Z:
+                alarm, kind = ALARM_REGRESSION, 'regression'
+            elif down > THRESHOLD_Z:
+                alarm, kind = ALARM_IMPROVEMENT, 'improvement'
+        else:
+            s['alarm_samples'] = int(s['alarm_samples']) + 1
+            if (level - mean) / std * alarm < 1.0:
+                # The current level is back within one deviation of the baseline
+                up, down = 0.0, 0.0
+                alarm, kind = ALARM_NONE, 'recovered'
+            elif s['alarm_samples'] >= REBASELINE_AFTER:
+                # The new level held long enough: it is the baseline now
+                mean, up, down = level, 0.0, 0.0
+                alarm, kind = ALARM_NONE, 'rebaselined'
+        if kind is not None and alarm == ALARM_NONE:
+            s['alarm_samples'] = 0
+        s['alarm'] = alarm
+        s['cusum_up'], s['cusum_down'] = up, down
+
+        if alarm == ALARM_NONE and up < THRESHOLD_Z / 2 and down < THRESHOLD_Z / 2:
+            d = z * std
+            mean += ALPHA * d
+            var = (1 - ALPHA) * (var + ALPHA * d * d)
+        s['mean'], s['var'] = mean, var
+        return kind
+
+    def status(self, url: str) -> Dict[str, Any]:
+        """Baseline, current level and alarm of every metric of ``url``."""
+        row = self._state[self._index[url]]
+        status = {}
+        for column, (metric, offset, _) in enumerate(METRICS):
+            s = row[column]
+            if not s['samples']:
+                continue
+            status[metric] = {
+                'samples': int(s['samples']),
+                'baseline': _value(float(s['mean']), offset),
+                'current': _value(float(s['level']), offset),
+                'alarm': {ALARM_REGRESSION: 'regression', ALARM_IMPROVEMENT: 'improvement'}.get(int(s['alarm'])),
+            }
+        return status
+
+    def alarms(self) -> Iterator[Tuple[str, str]]:
+        """(url, metric) pairs with an open regression alarm."""
+        rows, columns = np.nonzero(self._state['alarm'][:len(self._urls)] == ALARM_REGRESSION)
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            yield self._urls[row], METRIC_NAMES[column]
+
+    @property
+    def nbytes(self) -> int:
+        return self._state[:len(self._urls)].nbytes
+
+
+def scan_archive(detector: RegressionDetector, archive: ResultArchive,
+                 start: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Feed archived results to ``detector`` in time order and yield its events."""
+    records = archive.scan(start)
+    if not len(records):
+        return
+    # Appends from concurrent checks are only roughly in time order
+    records = records[np.argsort(records['timestamp'], kind='stable')]
+    ttfb = np.where(np.isnan(records['ttfb']), records['response_time'], records['ttfb'])
+    strings = archive.strings
+    for record, first_byte in zip(records, ttfb.tolist()):
+        values = {
+            'ttfb': first_byte,
+            'full_load_time': float(record['full_load_time']) or None,
+            'content_size': float(record['content_size']),
+        }
+        yield from detector.update_values(strings[record['url']], values, float(record['timestamp']))
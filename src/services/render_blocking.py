@@ -0,0 +1,320 @@
+"""
+Render-blocking resources and critical request chains.
+
+Stylesheets and synchronous scripts in ``<head>`` (and the stylesheets they
+pull in with ``@import``) must arrive before the browser paints anything.
+``find_render_blocking`` lists them from the HTML; it only parses the text
+before ``</head>`` or ``<body``, so its cost does not grow with the page body.
+
+Their timings come from one of two sources. After a browser load the
+``NetworkLog`` requests already carry start and end timestamps and the URL of
+their initiator, so the chain is rebuilt from those. Without a browser each
+blocking resource is fetched over HTTP and stylesheets are parsed for
+``@import`` rules; every resource is assumed to start once the document's
+first byte arrives and an import once its parent stylesheet finished.
+
+A resource's estimated saving is how long its chain keeps running after the
+HTML itself has arrived: the time first render would move earlier if it no
+longer blocked.
+"""
+
+from html.parser import HTMLParser
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin
+import re
+
+from src.utils.bytes import format_bytes
+
+
+# Stylesheets up to this size fit in the first round trips and can be inlined
+INLINE_CSS_BYTES = 14 * 1024
+# Bounds for the HTTP-only chain walk
+MAX_FETCHES = 20
+MAX_IMPORT_DEPTH = 4
+# Request priorities Chrome gives to resources on the critical path
+CRITICAL_PRIORITIES = {"VeryHigh", "High"}
+CRITICAL_TYPES = {"document", "stylesheet", "script", "font"}
+
+_IMPORT_RE = re.compile(
+    r"""@import\s+(?:url\(\s*)?["']?([^"')\s;]+)["']?\s*\)?\s*([^;]*);""",
+    re.IGNORECASE,
+)
+_HEAD_END_RE = re.compile(r"</head\b|<body\b", re.IGNORECASE)
+_JS_TYPES = {"", "text/javascript", "application/javascript", "text/ecmascript", "application/ecmascript"}
+
+# (url, bytes, elapsed_ms, body) or None when the fetch failed
+Fetch = Callable[[str], Optional[Tuple[str, int, float, str]]]
+
+
+def _media_blocks(media: Optional[str]) -> bool:
+    """True unless the media query can never match a screen on load."""
+    if not media:
+        return True
+    queries = [q.strip().lower() for q in media.split(",")]
+    return any(not q.startswith(("print", "speech", "not all")) for q in queries)
+
+
+def css_imports(css: str, base_url: str) -> List[str]:
+    """URLs of the ``@import`` rules in a stylesheet that apply to screens."""
+    return [
+        urldefrag(urljoin(base_url, href))[0]
+        for href, media in _IMPORT_RE.findall(css)
+        if _media_blocks(media.strip())
+    ]
+
+
+class _HeadParser(HTMLParser):
+    def __init__(self, base_url: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.resources: List[Dict[str, Any]] = []
+        self._seen: Set[str] = set()
+        self.done = False
+        self._in_style = False
+
+    def _add(self, href: str, kind: str, media: Optional[str] = None) -> None:
+        url = urldefrag(urljoin(self.base_url, href.strip()))[0]
+        if not url.startswith(("data:", "blob:", "javascript:")) and url not in self._seen:
+            self._seen.add(url)
+            self.resources.append({"url": url, "type": kind, "media": media})
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self.done:
+            return
+        a = {k.lower(): (v if v is not None else "") for k, v in attrs}
+        if tag == "body":
+            self.done = True
+        elif tag == "base" and a.get("href"):
+            self.base_url = urljoin(self.base_url, a["href"])
+        elif tag == "link":
+            rel = a.get("rel", "").lower().split()
+            if "stylesheet" in rel and "alternate" not in rel and "disabled" not in a and a.get("href") \
+                    and _media_blocks(a.get("media")):
+                self._add(a["href"], "stylesheet", a.get("media") or None)
+        elif tag == "script":
+            if a.get("src") and "async" not in a and "defer" not in a \
+                    and a.get("type", "").lower() in _JS_TYPES:
+                self._add(a["src"], "script")
+        elif tag == "style":
+            self._in_style = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "head":
+            self.done = True
+        elif tag == "style":
+            self._in_style = False
+
+    def handle_data(self, data: str) -> None:
+        if self._in_style and not self.done:
+            for url in css_imports(data, self.base_url):
+                self._add(url, "stylesheet", None)
+
+
+def find_render_blocking(html: str, base_url: str) -> List[Dict[str, Any]]:
+    """Stylesheets and parser-blocking scripts in ``<head>``, in document order."""
+    head_end = _HEAD_END_RE.search(html)
+    parser = _HeadParser(base_url)
+    try:
+        parser.feed(html[:head_end.start()] if head_end else html)
+        parser.close()
+    except Exception:
+        # Keep whatever was found before malformed markup
+        pass
+    return parser.resources
+
+
+def _node(url: str, kind: str, size: int, start_ms: Optional[float], end_ms: Optional[float]) -> Dict[str, Any]:
+    return {
+        'url': url, 'type': kind, 'bytes': size,
+        'start_ms': round(start_ms, 1) if start_ms is not None else None,
+        'end_ms': round(end_ms, 1) if end_ms is not None else None,
+        'children': [],
+    }
+
+
+def _chain_end(node: Dict[str, Any]) -> float:
+    ends = [node['end_ms'] or 0.0, *(_chain_end(child) for child in node['children'])]
+    return max(ends)
+
+
+def _chain_depth(node: Dict[str, Any]) -> int:
+    return 1 + max((_chain_depth(child) for child in node['children']), default=0)
+
+
+def _chain_bytes(node: Dict[str, Any]) -> int:
+    return node['bytes'] + sum(_chain_bytes(child) for child in node['children'])
+
+
+def chains_from_log(page_url: str, requests: Iterable[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], float]:
+    """
+    Critical request tree rooted at the document, from ``NetworkLog`` entries.
+
+    Returns the tree (None when the document is not in the log) and the
+    document's end time in milliseconds after its start.
+    """
+    entries = [e for e in requests if e.get("url") and e.get("start_s") is not None and not e.get("from_cache")]
+    document = next((e for e in entries if e["type"] == "document"), None)
+    if document is None:
+        return None, 0.0
+    origin_s = document["start_s"]
+
+    def ms(ts: Optional[float]) -> Optional[float]:
+        return (ts - origin_s) * 1000 if ts is not None else None
+
+    root = _node(document["url"], "document", document["encoded_bytes"], 0.0, ms(document["end_s"]))
+    nodes = {urldefrag(document["url"])[0]: root, urldefrag(page_url)[0]: root}
+    critical = [
+        e for e in entries
+        if e is not document and e["type"] in CRITICAL_TYPES and e.get("priority") in CRITICAL_PRIORITIES
+    ]
+    critical.sort(key=lambda e: e["start_s"])
+    for entry in critical:
+        key = urldefrag(entry["url"])[0]
+        if key in nodes:
+            continue
+        node = _node(entry["url"], entry["type"], entry["encoded_bytes"], ms(entry["start_s"]), ms(entry["end_s"]))
+        parent = nodes.get(urldefrag(entry.get("initiator") or "")[0], root)
+        parent['children'].append(node)
+        nodes[key] = node
+    return root, root['end_ms'] or 0.0
+
+
+def chains_from_fetch(page_url: str, blocking: List[Dict[str, Any]], fetch: Fetch, ttfb_ms: float,
+                      document_ms: float, document_bytes: int) -> Dict[str, Any]:
+    """Critical request tree built by fetching blocking resources and following ``@import``."""
+    root = _node(page_url, "document", document_bytes, 0.0, document_ms)
+    budget = [MAX_FETCHES]
+    seen = set()
+
+    def visit(parent: Dict[str, Any], url: str, kind: str, start_ms: float, depth: int) -> None:
+        if url in seen or budget[0] <= 0:
+            return
+        seen.add(url)
+        budget[0] -= 1
+        fetched = fetch(url)
+        if fetched is None:
+            parent['children'].append(_node(url, kind, 0, start_ms, None))
+            return
+        final_url, size, elapsed_ms, body = fetched
+        node = _node(url, kind, size, start_ms, start_ms + elapsed_ms)
+        parent['children'].append(node)
+        if kind == "stylesheet" and depth < MAX_IMPORT_DEPTH:
+            for child in css_imports(body, final_url):
+                visit(node, child, "stylesheet", node['end_ms'], depth + 1)
+
+    # The parser finds head resources as soon as the first bytes arrive
+    for resource in blocking:
+        visit(root, resource["url"], resource["type"], ttfb_ms, 1)
+    return root
+
+
+def _action(resource: Dict[str, Any], node: Dict[str, Any]) -> str:
+    if resource["type"] == "script":
+        return "defer"
+    if node['children']:
+        return "replace_import"
+    return "inline" if _chain_bytes(node) <= INLINE_CSS_BYTES else "inline_critical"
+
+
+def analyze_render_blocking(html: str, page_url: str, ttfb_ms: float, document_ms: float,
+                            document_bytes: int = 0, requests: Optional[Iterable[Dict[str, Any]]] = None,
+                            fetch: Optional[Fetch] = None,
+                            blocking: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Render-blocking resources with their chains and estimated savings.
+
+    ``requests`` are ``NetworkLog`` entries from a browser load; without them
+    ``fetch`` is used to time the blocking resources over HTTP. ``blocking``
+    takes an earlier ``find_render_blocking`` result so the head is parsed once.
+    """
+    if blocking is None:
+        blocking = find_render_blocking(html, page_url)
+    tree = None
+    source = None
+    if requests is not None:
+        tree, document_end_ms = chains_from_log(page_url, requests)
+        source = 'browser'
+    if tree is None and fetch is not None:
+        tree = chains_from_fetch(page_url, blocking, fetch, ttfb_ms, document_ms, document_bytes)
+        document_end_ms = document_ms
+        source = 'http'
+    if tree is None:
+        return {
+            'source': None, 'blocking': [
+                {'url': r['url'], 'type': r['type'], 'media': r['media']} for r in blocking
+            ],
+            'critical_chain': None, 'longest_chain': None, 'estimated_savings_ms': None, 'fallback': 'no_timings',
+        }
+
+    by_url = {}
+    stack = list(tree['children'])
+    while stack:
+        node = stack.pop()
+        by_url.setdefault(urldefrag(node['url'])[0], node)
+        stack.extend(node['children'])
+
+    items = []
+    for resource in blocking:
+        node = by_url.get(resource["url"])
+        if node is None or node['end_ms'] is None:
+            # Served from cache or never requested
+            continue
+        chain_end = _chain_end(node)
+        items.append({
+            'url': resource['url'],
+            'type': resource['type'],
+            'media': resource['media'],
+            'bytes': _chain_bytes(node),
+            'imports': _chain_depth(node) - 1,
+            'start_ms': node['start_ms'],
+            'end_ms': round(chain_end, 1),
+            'savings_ms': round(max(0.0, chain_end - document_end_ms), 1),
+            'action': _action(resource, node),
+        })
+    items.sort(key=lambda item: -item['savings_ms'])
+
+    # Longest path through the tree, by end time
+    path = [tree]
+    while path[-1]['children']:
+        path.append(max(path[-1]['children'], key=_chain_end))
+    return {
+        'source': source,
+        'blocking': items,
+        'critical_chain': tree,
+        'longest_chain': {
+            'length': len(path),
+            'duration_ms': round(_chain_end(tree), 1),
+            'urls': [node['url'] for node in path],
+        },
+        # Render can start at the document's end once nothing blocks it
+        'estimated_savings_ms': max((item['savings_ms'] for item in items), default=0.0),
+        'fallback': None,
+    }
+
+
+_ACTIONS = {
+    'defer': "Add defer to {name} ({size})",
+    'inline': "Inline {name} ({size}) into the HTML",
+    'inline_critical': "Inline the critical rules of {name} ({size}) and load the rest asynchronously",
+    'replace_import': "Replace the @import chain in {name} ({size}, {imports} level(s)) with <link> tags",
+}
+
+
+def describe_actions(analysis: Optional[Dict[str, Any]], limit: int = 3) -> List[str]:
+    """Specific, quantified recommendations for the largest render-blocking savings."""
+    if not analysis or analysis.get('fallback') is not None:
+        return []
+    lines = []
+    for item in analysis['blocking']:
+        if item['savings_ms'] <= 0 or len(lines) >= limit:
+            continue
+        name = item['url'].rstrip('/').rsplit('/', 1)[-1].split('?', 1)[0] or item['url']
+        action = _ACTIONS[item['action']].format(name=name, size=format_bytes(item['bytes']), imports=item['imports'])
+        lines.append(f"{action}: first render could start ~{item['savings_ms']:.0f} ms earlier")
+    blocking_count = sum(1 for item in analysis['blocking'] if item['savings_ms'] > 0)
+    if blocking_count > 1:
+        lines.append(
+            f"Removing all {blocking_count} render-blocking resources could start rendering "
+            f"~{analysis['estimated_savings_ms']:.0f} ms earlier"
+        )
+    return lines
@@ -0,0 +1,212 @@
+"""
+Record-and-replay archives for offline, repeatable measurements.
+
+An archive is a zip file holding ``index.jsonl`` (one line per recorded
+response: method, URL, status, headers, timings and a body reference) and the
+bodies under ``bodies/<sha256>``, stored once however many responses share
+them. Bodies are kept decoded, as both ``requests`` and the browser hand them
+over; the original ``Content-Encoding`` header is preserved for reporting.
+
+Replay goes through ``ReplayAdapter`` for ``HttpClient`` (optionally sleeping
+for the recorded or a fixed latency) and through Playwright request routing
+for the browser, which aborts anything that was not recorded so a replayed
+load never reaches the network.
+"""
+
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import hashlib
+import io
+import json
+import threading
+import time
+import zipfile
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+INDEX_NAME = "index.jsonl"
+# Headers that describe the wire encoding rather than the stored body.
+TRANSPORT_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class ArchiveMiss(requests.ConnectionError):
+    """Raised when a replayed request has no recorded response."""
+
+
+class ReplayArchive:
+    def __init__(self, path: str, recording: bool, latency: Union[str, float, None] = None) -> None:
+        """Use ``ReplayArchive.record`` or ``ReplayArchive.replay`` instead."""
+        self.path = path
+        self.recording = recording
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._stored: set = set()
+        self._index: List[str] = []
+        mode = "w" if recording else "r"
+        self._zip = zipfile.ZipFile(path, mode, compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+        if not recording:
+            with self._zip.open(INDEX_NAME) as fh:
+                for line in io.TextIOWrapper(fh, encoding="utf-8"):
+                    entry = json.loads(line)
+                    # The first recording of a URL wins, so replays are stable.
+                    self._entries.setdefault((entry["method"], entry["url"]), entry)
+
+    @classmethod
+    def record(cls, path: str) -> "ReplayArchive":
+        return cls(path, recording=True)
+
+    @classmethod
+    def replay(cls, path: str, latency: Union[str, float, None] = None) -> "ReplayArchive":
+        """Open for replay; ``latency`` is None, ``"recorded"`` or milliseconds."""
+        return cls(path, recording=False, latency=latency)
+
+    @property
+    def count(self) -> int:
+        return len(self._index) if self.recording else len(self._entries)
+
+    def add(self, method: str, url: str, status: int, headers: List[Tuple[str, str]], body: bytes,
+            timing: Optional[Dict[str, float]] = None, source: str = "http") -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "headers": [[k, v] for k, v in headers],
+            "body": digest,
+            "size": len(body),
+            "timing": timing or {},
+            "source": source,
+        }
+        with self._lock:
+            if digest not in self._stored:
+                self._zip.writestr(f"bodies/{digest}", body)
+                self._stored.add(digest)
+            self._index.append(json.dumps(entry, separators=(",", ":")))
+
+    def add_response(self, response: requests.Response, elapsed_ms: Optional[float] = None) -> None:
+        """Record a ``requests`` response and the redirects that led to it."""
+        for resp in [*response.history, response]:
+            self.add(
+                resp.request.method if resp.request is not None else "GET",
+                resp.url,
+                resp.status_code,
+                list(resp.headers.items()),
+                resp.content,
+                timing={
+                    "ttfb_ms": round(resp.elapsed.total_seconds() * 1000, 2),
+                    **({"elapsed_ms": elapsed_ms} if resp is response and elapsed_ms is not None else {}),
+                },
+            )
+
+    def lookup(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get((method.upper(), url))
+        if entry is None and "#" in url:
+            entry = self._entries.get((method.upper(), url.split("#", 1)[0]))
+        return entry
+
+    def body(self, entry: Dict[str, Any]) -> bytes:
+        with self._lock:
+            return self._zip.read(f"bodies/{entry['body']}")
+
+    def delay_ms(self, entry: Dict[str, Any]) -> float:
+        if self.latency is None:
+            return 0.0
+        if self.latency == "recorded":
+            timing = entry.get("timing") or {}
+            return float(timing.get("elapsed_ms") or timing.get("ttfb_ms") or 0.0)
+        return float(self.latency)
+
+    def close(self) -> None:
+        with self._lock:
+            if self.recording and self._zip.fp is not None:
+                self._zip.writestr(INDEX_NAME, "\n".join(self._index) + ("\n" if self._index else ""))
+            self._zip.close()
+
+    def __enter__(self) -> "ReplayArchive":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """``requests`` transport adapter answering from a replay archive."""
+
+    def __init__(self, archive: ReplayArchive) -> None:
+        super().__init__()
+        self.archive = archive
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        entry = self.archive.lookup(request.method, request.url)
+        if entry is None:
+            raise ArchiveMiss(f"Not in archive: {request.method} {request.url}", request=request)
+        delay_ms = self.archive.delay_ms(entry)
+        if delay_ms:
+            time.sleep(delay_ms / 1000)
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = self.archive.body(entry)
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        response.elapsed = timedelta(milliseconds=entry.get("timing", {}).get("ttfb_ms") or delay_ms)
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+def attach_browser(page: Any, archive: ReplayArchive) -> Callable[[], None]:
+    """
+    Record or replay a Playwright page through ``archive``.
+
+    Returns a function to call once the load has finished; when recording it
+    fetches the bodies of all finished requests into the archive.
+    """
+    if not archive.recording:
+        def fulfill(route) -> None:
+            request = route.request
+            entry = archive.lookup(request.method, request.url)
+            if entry is None:
+                route.abort("internetdisconnected")
+                return
+            headers = {k: v for k, v in entry["headers"] if k.lower() not in TRANSPORT_HEADERS}
+            route.fulfill(status=entry["status"], headers=headers, body=archive.body(entry))
+
+        page.route("**/*", fulfill)
+        return lambda: None
+
+    finished: List[Any] = []
+    page.on("requestfinished", finished.append)
+
+    def flush() -> None:
+        # Bodies are fetched after the load so the recording does not slow it.
+        for request in finished:
+            response = request.response()
+            if response is None:
+                continue
+            try:
+                body = response.body() if not 300 <= response.status < 400 else b""
+            except Exception:
+                body = b""
+            timing = request.timing
+            archive.add(
+                request.method,
+                request.url,
+                response.status,
+                [(h["name"], h["value"]) for h in response.headers_array()],
+                body,
+                timing={
+                    "ttfb_ms": round(timing["responseStart"] - timing["requestStart"], 2)
+                    if timing.get("responseStart", -1) >= 0 and timing.get("requestStart", -1) >= 0 else None,
+                    "elapsed_ms": round(timing["responseEnd"], 2) if timing.get("responseEnd", -1) >= 0 else None,
+                },
+                source="browser",
+            )
+
+    return flush
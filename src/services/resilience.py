@@ -0,0 +1,166 @@
+"""
+Failure isolation for bulk runs: per-host circuit breakers, latency-derived
+timeouts and deadlines that bound the total time spent on one URL.
+"""
+
+from collections import deque
+from typing import Deque, Dict, Optional
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised when a host's circuit is open and requests are being short-circuited."""
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"Circuit open for {host}; retry in {retry_in:.0f} s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the analysis budget runs out before a stage can start."""
+
+
+class Deadline:
+    """Absolute point in monotonic time shared by every stage of one analysis."""
+
+    def __init__(self, budget_s: Optional[float]) -> None:
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s if budget_s else None
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: float, stage: str = "stage") -> float:
+        """Return ``cap`` limited by the remaining budget, or raise if none is left."""
+        left = self.remaining()
+        if left <= 0.0:
+            raise DeadlineExceeded(f"Analysis budget exhausted before {stage}")
+        return min(cap, left)
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker, tracked per host.
+
+    After ``failure_threshold`` consecutive failures the host is open for
+    ``reset_timeout`` seconds; then a single trial request is let through and
+    its outcome closes or re-opens the circuit. A trial that ends without an
+    outcome is handed back with ``release_trial``, and one held for longer
+    than ``reset_timeout`` is given to the next caller.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        # Host -> when its half-open trial request was let through
+        self._trial: Dict[str, float] = {}
+
+    def state(self, host: str) -> str:
+        with self._lock:
+            return self._state(host, time.monotonic())
+
+    def _state(self, host: str, now: float) -> str:
+        opened = self._opened_at.get(host)
+        if opened is None:
+            return "closed"
+        return "open" if now - opened < self.reset_timeout else "half_open"
+
+    def check(self, host: str) -> None:
+        """Raise ``CircuitOpenError`` unless a request to ``host`` may proceed."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(host, now)
+            if state == "closed":
+                return
+            if state == "half_open":
+                started = self._trial.get(host)
+                if started is None or now - started >= self.reset_timeout:
+                    self._trial[host] = now
+                    return
+            opened = self._opened_at[host]
+            raise CircuitOpenError(host, max(0.0, self.reset_timeout - (now - opened)))
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._trial.pop(host, None)
+
+    def release_trial(self, host: str) -> None:
+        """Give back a trial that ended without a success or failure being recorded."""
+        with self._lock:
+            self._trial.pop(host, None)
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            count = self._failures.get(host, 0) + 1
+            self._failures[host] = count
+            if self._trial.pop(host, None) is not None or count >= self.failure_threshold:
+                self._opened_at[host] = time.monotonic()
+
+
+class AdaptiveTimeout:
+    """
+    Timeouts derived from recently observed latencies.
+
+    The timeout for a host is ``multiplier`` times the chosen percentile of its
+    last ``window`` samples, clamped to ``[floor, ceiling]`` seconds. Hosts
+    with fewer than ``min_samples`` samples get ``default``: other hosts'
+    latencies say nothing about this one. A request that timed out counts as
+    a sample at its timeout, so a slow host's timeout can grow back.
+    """
+
+    def __init__(
+        self,
+        default: float = 10.0,
+        percentile: float = 0.95,
+        multiplier: float = 3.0,
+        floor: float = 2.0,
+        ceiling: float = 30.0,
+        window: int = 200,
+        min_samples: int = 5,
+    ) -> None:
+        self.default = default
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.floor = floor
+        self.ceiling = ceiling
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Deque[float]] = {}
+
+    def observe(self, host: str, elapsed_s: float) -> None:
+        with self._lock:
+            samples = self._hosts.get(host)
+            if samples is None:
+                samples = self._hosts[host] = deque(maxlen=self.window)
+            samples.append(elapsed_s)
+
+    def observe_timeout(self, host: str, timeout_s: float) -> None:
+        """Record a request to ``host`` that gave up after ``timeout_s``."""
+        self.observe(host, timeout_s)
+
+    def _quantile(self, samples: Deque[float]) -> float:
+        ordered = sorted(samples)
+        idx = min(len(ordered) - 1, int(round(self.percentile * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def timeout_for(self, host: str) -> float:
+        with self._lock:
+            samples = self._hosts.get(host)
+            if samples is None or len(samples) < self.min_samples:
+                return self.default
+            value = self._quantile(samples) * self.multiplier
+        return max(self.floor, min(self.ceiling, value))
@@ -0,0 +1,388 @@
+"""
+Append-only result history read through ``mmap``.
+
+An archive is two files next to each other:
+
+``<path>.rec``
+    A 64-byte header followed by fixed-width little-endian records
+    (``RECORD_DTYPE``). Reading maps the file as a NumPy structured array, so
+    scans and aggregations parse nothing and only page in what they touch.
+``<path>.str``
+    The string table: URLs, servers, content types and network profiles,
+    each stored once as ``<u4 length><utf-8 bytes><u4 crc32>``. A string's id
+    is its position in the table.
+
+Crash safety: strings are written and flushed before any record that refers
+to them, and each record carries a CRC of its own bytes. On open, a torn
+string entry or record at the end of a file (a crash mid-append) is cut off;
+everything before it is intact. Compaction never renumbers strings; it
+rewrites only the record file into a temporary file and swaps it in with
+``os.replace``, so a crash leaves either the old or the new records.
+
+Records are normally in time order, which lets ``scan`` binary-search a
+range. The first append older than the newest record (an import of old
+batch files, a clock step) sets ``HEADER_UNSORTED`` in the record header
+before the record is written; ``scan`` then filters with a mask until
+``compact`` sorts the file again.
+
+There is a single writer per archive; readers may open it at any time and
+see the records that were complete when they mapped the file.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+
+from src.services.load_model import read_records
+from src.services.results import SpeedResult
+
+
+MAGIC_RECORDS = b"NINJAREC"
+MAGIC_STRINGS = b"NINJASTR"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('response_time', '<f8'),
+    ('ttfb', '<f8'),
+    ('full_load_time', '<f8'),
+    ('dns', '<f8'),
+    ('content_size', '<i8'),
+    ('url', '<u4'),
+    ('server', '<u4'),
+    ('content_type', '<u4'),
+    ('network_profile', '<u4'),
+    ('test_number', '<u4'),
+    ('status_code', '<i2'),
+    ('redirects', '<i2'),
+    ('performance_score', '<i2'),
+    ('flags', '<u2'),
+    ('crc', '<u4'),
+])
+STRING_FIELDS = ('url', 'server', 'content_type', 'network_profile')
+
+# Bits of the ``flags`` field
+FLAG_MOBILE = 1
+FLAG_PARTIAL = 2
+FLAG_BROWSER = 4
+FLAG_DEEP = 8
+
+# Bits of the record header ``flags`` field; older files have zeros there
+HEADER_UNSORTED = 1
+
+_HEADER = struct.Struct("<8sIII")
+_LENGTH = struct.Struct("<I")
+
+
+def _header(magic: bytes, record_size: int, flags: int = 0) -> bytes:
+    return _HEADER.pack(magic, FORMAT_VERSION, record_size, flags).ljust(HEADER_SIZE, b"\0")
+
+
+def _check_header(data: bytes, magic: bytes, path: str) -> int:
+    """Validate a file header and return its flags."""
+    found, version, record_size, flags = _HEADER.unpack_from(data)
+    if found != magic:
+        raise ValueError(f"{path} is not a result archive file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has archive version {version}, expected {FORMAT_VERSION}")
+    if magic == MAGIC_RECORDS and record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} has {record_size}-byte records, expected {RECORD_DTYPE.itemsize}")
+    return flags
+
+
+def _with_crc(rows: np.ndarray) -> np.ndarray:
+    raw = rows.view(np.uint8).reshape(len(rows), RECORD_DTYPE.itemsize)
+    rows['crc'] = [zlib.crc32(row[:-4].tobytes()) for row in raw]
+    return rows
+
+
+def _nan(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+class ResultArchive:
+    def __init__(self, path: str, readonly: bool = False) -> None:
+        self.path = path
+        self.records_path = path + ".rec"
+        self.strings_path = path + ".str"
+        self.readonly = readonly
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self.unsorted = False
+        self._last_timestamp = -np.inf
+        if not readonly:
+            for file_path, magic, size in ((self.records_path, MAGIC_RECORDS, RECORD_DTYPE.itemsize),
+                                           (self.strings_path, MAGIC_STRINGS, 0)):
+                if not os.path.exists(file_path):
+                    with open(file_path, "wb") as fh:
+                        fh.write(_header(magic, size))
+                        fh.flush()
+                        os.fsync(fh.fileno())
+        self._load_strings()
+        self._count = self._recover_records()
+        self._records_fh = None if readonly else open(self.records_path, "ab", buffering=0)
+        self._strings_fh = None if readonly else open(self.strings_path, "ab", buffering=0)
+
+    def _load_strings(self) -> None:
+        with open(self.strings_path, "rb") as fh:
+            data = fh.read()
+        _check_header(data, MAGIC_STRINGS, self.strings_path)
+        pos = HEADER_SIZE
+        while pos + _LENGTH.size <= len(data):
+            (length,) = _LENGTH.unpack_from(data, pos)
+            end = pos + _LENGTH.size + length
+            if end + _LENGTH.size > len(data):
+                break
+            raw = data[pos + _LENGTH.size:end]
+            if _LENGTH.unpack_from(data, end)[0] != zlib.crc32(raw):
+                break
+            self._ids[raw.decode("utf-8")] = len(self.strings)
+            self.strings.append(raw.decode("utf-8"))
+            pos = end + _LENGTH.size
+        if pos < len(data) and not self.readonly:
+            # Torn entry from an interrupted append
+            os.truncate(self.strings_path, pos)
+
+    def _recover_records(self) -> int:
+        with open(self.records_path, "rb") as fh:
+            flags = _check_header(fh.read(HEADER_SIZE), MAGIC_RECORDS, self.records_path)
+        self.unsorted = bool(flags & HEADER_UNSORTED)
+        size = os.path.getsize(self.records_path) - HEADER_SIZE
+        count = size // RECORD_DTYPE.itemsize
+        if count:
+            last = np.fromfile(self.records_path, dtype=RECORD_DTYPE, count=1,
+                               offset=HEADER_SIZE + (count - 1) * RECORD_DTYPE.itemsize)
+            if int(last['crc'][0]) != int(_with_crc(last.copy())['crc'][0]):
+                count -= 1
+        if count * RECORD_DTYPE.itemsize != size and not self.readonly:
+            os.truncate(self.records_path, HEADER_SIZE + count * RECORD_DTYPE.itemsize)
+        if count:
+            self._last_timestamp = float(np.fromfile(
+                self.records_path, dtype=RECORD_DTYPE, count=1,
+                offset=HEADER_SIZE + (count - 1) * RECORD_DTYPE.itemsize)['timestamp'][0])
+        return count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def string_id(self, value: Optional[str]) -> int:
+        """Id of ``value`` in the string table, appending it when new."""
+        value = "" if value is None else str(value)
+        sid = self._ids.get(value)
+        if sid is None:
+            if self.readonly:
+                raise ValueError("archive is open read-only")
+            raw = value.encode("utf-8")
+            self._strings_fh.write(_LENGTH.pack(len(raw)) + raw + _LENGTH.pack(zlib.crc32(raw)))
+            sid = self._ids[value] = len(self.strings)
+            self.strings.append(value)
+        return sid
+
+    def _row(self, result: SpeedResult, timestamp: float) -> tuple:
+        full = result.full_load_time or {}
+        flags = ((FLAG_MOBILE if result.mobile_test else 0) | (FLAG_PARTIAL if result.partial else 0)
+                 | (FLAG_BROWSER if full.get('fallback', 'estimate') is None else 0)
+                 | (FLAG_DEEP if result.deep else 0))
+        return (
+            timestamp, result.response_time, _nan(result.ttf), _nan(full.get('total_load_time')),
+            _nan(result.dns), result.content_size,
+            self.string_id(result.url), self.string_id(result.server), self.string_id(result.content_type),
+            self.string_id(result.network_profile), result.test_number,
+            result.status_code, result.redirects,
+            (result.performance_grade or {}).get('score', -1), flags, 0,
+        )
+
+    def append_many(self, results: Iterable[Any], timestamp: Optional[float] = None,
+                    fsync: bool = False) -> int:
+        """
+        Append ``SpeedResult`` objects or result dicts in one write.
+
+        ``fsync`` makes the records durable before returning; without it a
+        power loss may drop the newest records, never corrupt older ones.
+        """
+        stamp = time.time() if timestamp is None else timestamp
+        rows = [
+            self._row(SpeedResult.from_dict(r) if isinstance(r, dict) else r, stamp)
+            for r in results
+        ]
+        if not rows:
+            return 0
+        if stamp < self._last_timestamp and not self.unsorted:
+            # The flag reaches the disk before the out-of-order record does
+            self._write_header_flags(HEADER_UNSORTED)
+            self.unsorted = True
+        self._last_timestamp = max(self._last_timestamp, stamp)
+        # Strings referenced by these records reach the disk first
+        if fsync:
+            os.fsync(self._strings_fh.fileno())
+        block = _with_crc(np.array(rows, dtype=RECORD_DTYPE))
+        self._records_fh.write(block.tobytes())
+        if fsync:
+            os.fsync(self._records_fh.fileno())
+        self._count += len(rows)
+        return len(rows)
+
+    def append(self, result: Any, timestamp: Optional[float] = None, fsync: bool = False) -> None:
+        self.append_many([result], timestamp, fsync)
+
+    def _write_header_flags(self, flags: int) -> None:
+        # The append handle cannot seek back (O_APPEND), so the header gets its own
+        with open(self.records_path, "r+b") as fh:
+            fh.write(_header(MAGIC_RECORDS, RECORD_DTYPE.itemsize, flags))
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def flush(self) -> None:
+        """Make everything appended so far durable."""
+        os.fsync(self._strings_fh.fileno())
+        os.fsync(self._records_fh.fileno())
+
+    def records(self) -> np.ndarray:
+        """All complete records as a read-only memory-mapped structured array."""
+        if self._count == 0:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        return np.memmap(self.records_path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE,
+                         shape=(self._count,))
+
+    def scan(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """
+        Records with ``start <= timestamp < end``.
+
+        Records in time order are searched with a binary search, so only
+        the pages of the range are read; an archive flagged unsorted is
+        filtered with a mask over every timestamp (``compact`` re-sorts it).
+        """
+        records = self.records()
+        timestamps = records['timestamp']
+        if self.unsorted:
+            keep = np.ones(len(records), dtype=bool)
+            if start is not None:
+                keep &= timestamps >= start
+            if end is not None:
+                keep &= timestamps < end
+            return records[keep]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, "left"))
+        hi = len(records) if end is None else int(np.searchsorted(timestamps, end, "left"))
+        return records[lo:hi]
+
+    def verify(self) -> int:
+        """Number of records whose CRC does not match (a full read of the file)."""
+        records = self.records()
+        return int(np.count_nonzero(records['crc'] != _with_crc(np.array(records))['crc']))
+
+    def summarize_by_url(self, field: str = 'response_time', start: Optional[float] = None,
+                         end: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Count, mean and percentiles of ``field`` per URL over a time range."""
+        records = self.scan(start, end)
+        values = np.asarray(records[field], dtype=np.float64)
+        urls = np.asarray(records['url'])
+        keep = ~np.isnan(values)
+        values, urls = values[keep], urls[keep]
+        if not len(values):
+            return []
+        order = np.lexsort((values, urls))
+        values, urls = values[order], urls[order]
+        bounds = np.flatnonzero(np.diff(urls)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(urls)]))
+        sums = np.add.reduceat(values, starts)
+        out = []
+        for lo, hi, total in zip(starts, ends, sums):
+            group = values[lo:hi]
+            sid = int(urls[lo])
+            out.append({
+                # An id past the table only survives a power loss without fsync
+                'url': self.strings[sid] if sid < len(self.strings) else None,
+                'count': int(hi - lo),
+                'mean': round(float(total) / int(hi - lo), 2),
+                'p50': round(float(np.percentile(group, 50)), 2),
+                'p95': round(float(np.percentile(group, 95)), 2),
+                'min': round(float(group[0]), 2),
+                'max': round(float(group[-1]), 2),
+            })
+        return out
+
+    def compact(self, before: Optional[float] = None, urls: Optional[Sequence[str]] = None) -> int:
+        """
+        Drop records older than ``before`` and/or of the given URLs, and sort
+        the rest by time. Returns the number of records kept.
+        """
+        if self.readonly:
+            raise ValueError("archive is open read-only")
+        records = self.records()
+        keep = np.ones(len(records), dtype=bool)
+        if before is not None:
+            keep &= records['timestamp'] >= before
+        if urls:
+            ids = [self._ids[u] for u in urls if u in self._ids]
+            keep &= ~np.isin(records['url'], ids)
+        kept = np.array(records[keep])
+        kept = kept[np.argsort(kept['timestamp'], kind="stable")]
+        del records
+        tmp_path = self.records_path + ".tmp"
+        with open(tmp_path, "wb") as fh:
+            fh.write(_header(MAGIC_RECORDS, RECORD_DTYPE.itemsize))
+            fh.write(kept.tobytes())
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._records_fh.close()
+        os.replace(tmp_path, self.records_path)
+        self._records_fh = open(self.records_path, "ab", buffering=0)
+        self._count = len(kept)
+        self.unsorted = False
+        self._last_timestamp = float(kept['timestamp'][-1]) if len(kept) else -np.inf
+        return self._count
+
+    def rows(self, records: Optional[np.ndarray] = None) -> Iterator[Dict[str, Any]]:
+        """Records as flat dicts with strings resolved, for export."""
+        records = self.records() if records is None else records
+        for record in records:
+            row = {name: record[name].item() for name in RECORD_DTYPE.names if name not in ('crc', 'flags')}
+            for name in STRING_FIELDS:
+                # An id past the table only survives a power loss without fsync
+                row[name] = self.strings[row[name]] or None if row[name] < len(self.strings) else None
+            flags = int(record['flags'])
+            row['mobile_test'] = bool(flags & FLAG_MOBILE)
+            row['partial'] = bool(flags & FLAG_PARTIAL)
+            row['browser_measured'] = bool(flags & FLAG_BROWSER)
+            for name in ('ttfb', 'full_load_time', 'dns'):
+                if np.isnan(row[name]):
+                    row[name] = None
+            if row['performance_score'] < 0:
+                row['performance_score'] = None
+            yield row
+
+    def close(self) -> None:
+        for fh in (self._records_fh, self._strings_fh):
+            if fh:
+                fh.close()
+        self._records_fh = self._strings_fh = None
+
+    def __enter__(self) -> "ResultArchive":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def import_batch_output(archive: ResultArchive, paths: Sequence[str], fsync: bool = True) -> int:
+    """
+    Append every result of batch JSONL files (the dict format) to an archive.
+
+    Batch lines carry no timestamp, so each file's results are stamped with
+    its modification time; files are imported oldest first so the records
+    stay in time order unless the archive already holds newer ones.
+    """
+    added = 0
+    for path in sorted(paths, key=os.path.getmtime):
+        stamp = os.path.getmtime(path)
+        for record in read_records([path]):
+            added += archive.append_many(record.get("results") or (), timestamp=stamp)
+    if fsync:
+        archive.flush()
+    return added
@@ -0,0 +1,239 @@
+"""
+Typed speed-test results and columnar storage for many of them.
+
+``SpeedResult`` is the one record type the engine builds for every test,
+deep or not, so both kinds of result always carry the same fields. It is a
+slotted dataclass: no per-instance ``__dict__``, and a typo in a field name
+fails at construction instead of producing a missing key. Existing code that
+reads results like a dict keeps working through ``__getitem__``/``get``, and
+``to_dict`` gives the JSON shape written by the batch runner and the API,
+where deep-only keys only appear for deep tests.
+
+``ResultColumns`` keeps the scalar metrics of many results in NumPy arrays
+(strings as integer codes into a shared table). Appends grow the arrays
+geometrically, and ``column`` returns a read-only view of the filled part,
+so statistics and exporters work on the data without copying it.
+"""
+
+from dataclasses import MISSING, dataclass, field, fields
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+# Keys only present in results of deep tests
+DEEP_FIELDS = (
+    'cache_control', 'expires', 'last_modified', 'etag', 'connection', 'keep_alive',
+    'ttf', 'lcp', 'cls', 'fid', 'content_analysis', 'security_headers', 'performance_grade',
+)
+
+
+@dataclass(slots=True)
+class SpeedResult:
+    url: str
+    response_time: float
+    content_size: int
+    status_code: int
+    content_type: str
+    server: str
+    http_version: str
+    redirects: int
+    compression: str
+    dns: Optional[float]
+    cdn: str
+    best_practices: Dict[str, Any]
+    full_load_time: Dict[str, Any]
+    load_features: Dict[str, float]
+    dom_ready_time: float
+    test_number: int
+    mobile_test: bool
+    network_profile: Optional[str] = None
+    throttling: Optional[str] = None
+    repeat_view: Optional[Dict[str, Any]] = None
+    visual_metrics: Optional[Dict[str, Any]] = None
+    main_thread: Optional[Dict[str, Any]] = None
+    coverage: Optional[Dict[str, Any]] = None
+    third_parties: Optional[Dict[str, Any]] = None
+    render_blocking: Optional[Dict[str, Any]] = None
+    partial: bool = False
+    skipped_stages: List[str] = field(default_factory=list)
+    # Timer error per timing in ms (clock resolution and overhead jitter), not measurement variance
+    uncertainty: Dict[str, Any] = field(default_factory=dict)
+    har_path: Optional[str] = None
+    # Deep-test metrics
+    deep: bool = False
+    cache_control: Optional[str] = None
+    expires: Optional[str] = None
+    last_modified: Optional[str] = None
+    etag: Optional[str] = None
+    connection: Optional[str] = None
+    keep_alive: Optional[str] = None
+    ttf: Optional[float] = None
+    lcp: Optional[float] = None
+    cls: Optional[float] = None
+    fid: Optional[float] = None
+    content_analysis: Optional[Dict[str, Any]] = None
+    security_headers: Optional[Dict[str, Any]] = None
+    performance_grade: Optional[Dict[str, Any]] = None
+
+    def _has(self, key: object) -> bool:
+        if key not in _RESULT_KEYS:
+            return False
+        if key in DEEP_FIELDS:
+            return self.deep
+        return key != 'har_path' or self.har_path is not None
+
+    def keys(self) -> List[str]:
+        return [name for name in _RESULT_KEYS if self._has(name)]
+
+    def __contains__(self, key: object) -> bool:
+        return self._has(key)
+
+    def __getitem__(self, key: str) -> Any:
+        if not self._has(key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if self._has(key) else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.keys()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SpeedResult":
+        """Rebuild a result from its ``to_dict`` form (e.g. a batch JSONL line)."""
+        values = {f.name: data.get(f.name) for f in fields(cls) if f.name in data or _required(f)}
+        values['deep'] = 'performance_grade' in data
+        return cls(**values)
+
+
+def _required(f: Any) -> bool:
+    # Results stored by older versions may lack fields added since
+    return f.default is MISSING and f.default_factory is MISSING
+
+
+_RESULT_KEYS = tuple(f.name for f in fields(SpeedResult) if f.name != 'deep')
+
+
+def _number(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+# Column name -> (dtype, getter); NaN or -1 stands for a missing value
+_NUMERIC_COLUMNS: Dict[str, Tuple[str, Any]] = {
+    'response_time': ('f8', lambda r: r.response_time),
+    'content_size': ('i8', lambda r: r.content_size),
+    'status_code': ('i2', lambda r: r.status_code),
+    'redirects': ('i2', lambda r: r.redirects),
+    'test_number': ('i4', lambda r: r.test_number),
+    'dns': ('f8', lambda r: _number(r.dns)),
+    'ttf': ('f8', lambda r: _number(r.ttf)),
+    'full_load_time': ('f8', lambda r: _number((r.full_load_time or {}).get('total_load_time'))),
+    'dom_ready_time': ('f8', lambda r: _number(r.dom_ready_time)),
+    'performance_score': ('i2', lambda r: (r.performance_grade or {}).get('score', -1)),
+    'mobile_test': ('?', lambda r: r.mobile_test),
+    'partial': ('?', lambda r: r.partial),
+    'browser_measured': ('?', lambda r: (r.full_load_time or {}).get('fallback', 'estimate') is None),
+}
+_STRING_COLUMNS: Dict[str, Any] = {
+    'url': lambda r: r.url,
+    'server': lambda r: r.server,
+    'content_type': lambda r: r.content_type,
+    'compression': lambda r: r.compression,
+    'cdn': lambda r: r.cdn,
+    'grade': lambda r: (r.performance_grade or {}).get('grade', ''),
+}
+
+
+class ResultColumns:
+    def __init__(self, capacity: int = 1024) -> None:
+        self._size = 0
+        self._capacity = max(1, capacity)
+        self._arrays = {
+            name: np.empty(self._capacity, dtype=dtype)
+            for name, (dtype, _) in _NUMERIC_COLUMNS.items()
+        }
+        for name in _STRING_COLUMNS:
+            self._arrays[name] = np.empty(self._capacity, dtype=np.int32)
+        # One table for every string column; URLs and servers repeat a lot
+        self._strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    @classmethod
+    def from_results(cls, results: Iterable[Any]) -> "ResultColumns":
+        results = list(results)
+        columns = cls(capacity=len(results) or 1)
+        columns.extend(results)
+        return columns
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for name, array in self._arrays.items():
+            grown = np.empty(self._capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[name] = grown
+
+    def _code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._strings)
+            self._strings.append(value)
+        return code
+
+    def append(self, result: Any) -> None:
+        """Add a ``SpeedResult`` or a result dict."""
+        if isinstance(result, dict):
+            result = SpeedResult.from_dict(result)
+        if self._size == self._capacity:
+            self._grow()
+        i = self._size
+        for name, (_, getter) in _NUMERIC_COLUMNS.items():
+            self._arrays[name][i] = getter(result)
+        for name, getter in _STRING_COLUMNS.items():
+            self._arrays[name][i] = self._code(str(getter(result)))
+        self._size += 1
+
+    def extend(self, results: Iterable[Any]) -> None:
+        for result in results:
+            self.append(result)
+
+    @property
+    def names(self) -> List[str]:
+        return [*_NUMERIC_COLUMNS, *_STRING_COLUMNS]
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of a numeric column, or the codes of a string column."""
+        view = self._arrays[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def strings(self, name: str) -> np.ndarray:
+        """Decoded values of a string column (this one copies)."""
+        table = np.array(self._strings, dtype=object)
+        return table[self.column(name)] if self._strings else np.empty(0, dtype=object)
+
+    def string_table(self) -> List[str]:
+        return list(self._strings)
+
+    def select(self, mask: np.ndarray) -> Dict[str, np.ndarray]:
+        """Numeric columns of the rows where ``mask`` is true."""
+        return {name: self.column(name)[mask] for name in _NUMERIC_COLUMNS}
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Rows as flat dicts, for exporters; string columns decoded."""
+        views = {name: self.column(name) for name in self.names}
+        for i in range(self._size):
+            row = {}
+            for name, view in views.items():
+                row[name] = self._strings[view[i]] if name in _STRING_COLUMNS else view[i].item()
+            yield row
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the filled part of the columns and the string table."""
+        used = sum(array[:self._size].nbytes for array in self._arrays.values())
+        return used + sum(len(s) + 49 for s in self._strings)
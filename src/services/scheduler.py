@@ -0,0 +1,176 @@
+"""
+Process-wide admission scheduler for speed engine work.
+
+Every entry point (UI, batch, API) asks the shared scheduler for a slot before
+measuring a URL. Slots are granted by priority class first, then round-robin
+between tenants of the same class, while respecting a global concurrency
+limit, a per-host cap and a separate limit on headless browser instances.
+A few slots are kept back for interactive work so a click in the UI never
+queues behind a bulk run.
+
+Limits apply per process; a multi-process batch gets one scheduler per worker.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional
+import threading
+
+from src.utils.tracing import span
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+
+PRIORITY_NAMES = {
+    "interactive": PRIORITY_INTERACTIVE,
+    "normal": PRIORITY_NORMAL,
+    "bulk": PRIORITY_BULK,
+}
+
+# How far into a tenant's queue we look for a waiter whose host is not capped.
+_SCAN_DEPTH = 32
+
+
+class _Ticket:
+    __slots__ = ("host", "priority", "tenant", "browser", "event")
+
+    def __init__(self, host: str, priority: int, tenant: str, browser: bool) -> None:
+        self.host = host
+        self.priority = priority
+        self.tenant = tenant
+        self.browser = browser
+        self.event = threading.Event()
+
+
+class AnalysisScheduler:
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        per_host_limit: int = 4,
+        browser_slots: int = 2,
+        interactive_reserve: int = 1,
+    ) -> None:
+        self._lock = threading.Lock()
+        self.max_concurrent = max(1, max_concurrent)
+        self.per_host_limit = max(1, per_host_limit)
+        self.browser_slots = max(1, browser_slots)
+        self.interactive_reserve = max(0, interactive_reserve)
+        self._running = 0
+        self._browsers = 0
+        self._hosts: Dict[str, int] = {}
+        # priority -> tenant -> waiting tickets, plus the tenant rotation order
+        self._waiting: Dict[int, Dict[str, Deque[_Ticket]]] = {}
+        self._rotation: Dict[int, Deque[str]] = {}
+
+    def configure(self, **limits: int) -> None:
+        with self._lock:
+            for name in ("max_concurrent", "per_host_limit", "browser_slots", "interactive_reserve"):
+                if limits.get(name) is not None:
+                    setattr(self, name, max(0 if name == "interactive_reserve" else 1, int(limits[name])))
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, host: str, priority: int = PRIORITY_NORMAL, tenant: str = "default",
+             browser: bool = False) -> Iterator[None]:
+        """Block until a slot for ``host`` is granted and hold it for the ``with`` body."""
+        ticket = _Ticket(host, priority, tenant, browser)
+        with self._lock:
+            self._waiting.setdefault(priority, {}).setdefault(tenant, deque()).append(ticket)
+            rotation = self._rotation.setdefault(priority, deque())
+            if tenant not in rotation:
+                rotation.append(tenant)
+            self._dispatch()
+        with span("scheduler.wait", priority=priority):
+            ticket.event.wait()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running -= 1
+                if ticket.browser:
+                    self._browsers -= 1
+                left = self._hosts.get(host, 1) - 1
+                if left:
+                    self._hosts[host] = left
+                else:
+                    self._hosts.pop(host, None)
+                self._dispatch()
+
+    def _can_run(self, ticket: _Ticket) -> bool:
+        limit = self.max_concurrent
+        if ticket.priority != PRIORITY_INTERACTIVE:
+            limit = max(1, limit - self.interactive_reserve)
+        if self._running >= limit:
+            return False
+        if ticket.browser and self._browsers >= self.browser_slots:
+            return False
+        return self._hosts.get(ticket.host, 0) < self.per_host_limit
+
+    def _dispatch(self) -> None:
+        # Caller holds the lock. Grant as many waiters as the limits allow.
+        granted = True
+        while granted and self._running < self.max_concurrent:
+            granted = False
+            for priority in sorted(self._waiting):
+                ticket = self._next_ticket(priority)
+                if ticket is not None:
+                    self._running += 1
+                    if ticket.browser:
+                        self._browsers += 1
+                    self._hosts[ticket.host] = self._hosts.get(ticket.host, 0) + 1
+                    ticket.event.set()
+                    granted = True
+                    break
+
+    def _next_ticket(self, priority: int) -> Optional[_Ticket]:
+        tenants = self._waiting[priority]
+        rotation = self._rotation[priority]
+        for _ in range(len(rotation)):
+            tenant = rotation[0]
+            rotation.rotate(-1)
+            waiters = tenants[tenant]
+            for idx in range(min(len(waiters), _SCAN_DEPTH)):
+                ticket = waiters[idx]
+                if self._can_run(ticket):
+                    del waiters[idx]
+                    if not waiters:
+                        del tenants[tenant]
+                        rotation.remove(tenant)
+                    if not tenants:
+                        del self._waiting[priority]
+                        del self._rotation[priority]
+                    return ticket
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            waiting: List[int] = [0, 0, 0]
+            for priority, tenants in self._waiting.items():
+                waiting[min(priority, 2)] += sum(len(q) for q in tenants.values())
+            return {
+                "running": self._running,
+                "browsers": self._browsers,
+                "hosts": len(self._hosts),
+                "waiting": dict(zip(PRIORITY_NAMES, waiting)),
+            }
+
+
+_scheduler: Optional[AnalysisScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> AnalysisScheduler:
+    """Return the scheduler shared by all entry points in this process."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = AnalysisScheduler()
+        return _scheduler
+
+
+def configure_scheduler(**limits: int) -> AnalysisScheduler:
+    scheduler = get_scheduler()
+    scheduler.configure(**limits)
+    return scheduler
@@ -0,0 +1,188 @@
+"""
+Performance and security scoring, per result and for whole batches.
+
+Every rule lives in one table below. The per-URL functions
+(``performance_grade`` ...) walk a table with ``bisect``; their plural
+counterparts (``performance_grades`` ...) apply the same table to whole NumPy
+columns with ``searchsorted``. Both paths return identical scores, grades and
+labels, and a changed weight only needs editing here (or passing a new table
+in when re-scoring).
+
+Header presence is packed into an integer bitmask per result, one bit per
+name in ``GRADE_HEADERS`` and ``SECURITY_HEADERS``.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+# (threshold, penalty); a penalty applies when the value is strictly above its threshold
+RESPONSE_TIME_PENALTIES: Tuple[Tuple[float, int], ...] = ((1000, 10), (2000, 20), (3000, 30))
+CONTENT_SIZE_PENALTIES: Tuple[Tuple[float, int], ...] = (
+    (2 * 1024 * 1024, 10), (5 * 1024 * 1024, 15), (10 * 1024 * 1024, 25),
+)
+# Bonus points for each response header that is present and non-empty
+GRADE_HEADERS: Dict[str, int] = {
+    'cache-control': 5,
+    'expires': 5,
+    'content-encoding': 10,
+    'strict-transport-security': 2,
+    'x-frame-options': 2,
+    'x-content-type-options': 2,
+}
+BASE_SCORE = 100
+# (minimum score, grade), ascending
+GRADES: Tuple[Tuple[int, str], ...] = ((60, 'D'), (70, 'C'), (80, 'B'), (90, 'A'), (95, 'A+'))
+LOWEST_GRADE = 'F'
+
+# (response time upper bound, score), ascending; slower than the last bound scores SLOWEST_SCORE
+RESPONSE_TIME_SCORES: Tuple[Tuple[float, int], ...] = ((200, 100), (500, 90), (1000, 80), (2000, 70), (3000, 60))
+SLOWEST_SCORE = 50
+LABELS: Tuple[Tuple[int, str], ...] = ((60, 'Poor'), (70, 'Average'), (80, 'Good'), (90, 'Excellent'))
+LOWEST_LABEL = 'Very Poor'
+
+# Result key -> response header, in bit order after GRADE_HEADERS
+SECURITY_HEADERS: Dict[str, str] = {
+    'https': 'strict-transport-security',
+    'x_frame_options': 'x-frame-options',
+    'x_content_type': 'x-content-type-options',
+    'x_xss_protection': 'x-xss-protection',
+    'content_security_policy': 'content-security-policy',
+    'referrer_policy': 'referrer-policy',
+}
+SECURITY_GRADES: Tuple[Tuple[int, str], ...] = ((1, 'Average'), (3, 'Good'), (5, 'Excellent'))
+LOWEST_SECURITY_GRADE = 'Poor'
+
+_SECURITY_SHIFT = len(GRADE_HEADERS)
+
+
+def header_mask(headers: Mapping[str, Any]) -> int:
+    """
+    Presence bits for the grade and security headers of one response.
+
+    Grade bits need a non-empty value; security bits only need the header,
+    as in the original per-URL checks.
+    """
+    mask = 0
+    for bit, name in enumerate(GRADE_HEADERS):
+        if headers.get(name):
+            mask |= 1 << bit
+    for bit, name in enumerate(SECURITY_HEADERS.values()):
+        if headers.get(name, 'None') != 'None':
+            mask |= 1 << (_SECURITY_SHIFT + bit)
+    return mask
+
+
+def _pick(table: Sequence[Tuple[float, Any]], value: float, below: Any) -> Any:
+    index = bisect_right([threshold for threshold, _ in table], value)
+    return table[index - 1][1] if index else below
+
+
+def _penalty(table: Sequence[Tuple[float, int]], value: float) -> int:
+    index = bisect_left([threshold for threshold, _ in table], value)
+    return table[index - 1][1] if index else 0
+
+
+def _grade_bonus(mask: int, bonuses: Mapping[str, int]) -> int:
+    return sum(points for bit, points in enumerate(bonuses.values()) if mask >> bit & 1)
+
+
+def performance_grade(response_time: float, content_size: float, mask: int) -> Dict[str, Any]:
+    score = (BASE_SCORE - _penalty(RESPONSE_TIME_PENALTIES, response_time)
+             - _penalty(CONTENT_SIZE_PENALTIES, content_size) + _grade_bonus(mask, GRADE_HEADERS))
+    return {'score': max(0, min(100, score)), 'grade': _pick(GRADES, score, LOWEST_GRADE)}
+
+
+def performance_score(response_time: float) -> int:
+    # A time equal to a bound belongs to the next, slower bucket
+    index = bisect_right([bound for bound, _ in RESPONSE_TIME_SCORES], response_time)
+    return RESPONSE_TIME_SCORES[index][1] if index < len(RESPONSE_TIME_SCORES) else SLOWEST_SCORE
+
+
+def performance_label(score: float) -> str:
+    return _pick(LABELS, score, LOWEST_LABEL)
+
+
+def security_score(mask: int) -> Tuple[int, str]:
+    score = bin(mask >> _SECURITY_SHIFT).count("1")
+    return score, _pick(SECURITY_GRADES, score, LOWEST_SECURITY_GRADE)
+
+
+def _thresholds(table: Sequence[Tuple[float, Any]]) -> np.ndarray:
+    return np.array([threshold for threshold, _ in table], dtype=np.float64)
+
+
+def _values(table: Sequence[Tuple[float, Any]], below: Any) -> np.ndarray:
+    return np.array([below, *(value for _, value in table)])
+
+
+def _mask_bits(masks: np.ndarray, shift: int, count: int) -> np.ndarray:
+    """Boolean matrix of shape (results, count) from the bitmask column."""
+    return ((masks[:, None] >> (shift + np.arange(count, dtype=np.int64))) & 1).astype(bool)
+
+
+def performance_grades(response_time: np.ndarray, content_size: np.ndarray, masks: np.ndarray,
+                       response_penalties: Sequence[Tuple[float, int]] = RESPONSE_TIME_PENALTIES,
+                       size_penalties: Sequence[Tuple[float, int]] = CONTENT_SIZE_PENALTIES,
+                       header_bonuses: Mapping[str, int] = GRADE_HEADERS,
+                       grades: Sequence[Tuple[int, str]] = GRADES) -> Tuple[np.ndarray, np.ndarray]:
+    """Scores (int64) and grades (str) for whole columns; same rules as ``performance_grade``."""
+    response_time = np.asarray(response_time, dtype=np.float64)
+    content_size = np.asarray(content_size, dtype=np.float64)
+    masks = np.asarray(masks, dtype=np.int64)
+    score = np.full(response_time.shape, BASE_SCORE, dtype=np.int64)
+    score -= _values(response_penalties, 0)[np.searchsorted(_thresholds(response_penalties), response_time, "left")]
+    score -= _values(size_penalties, 0)[np.searchsorted(_thresholds(size_penalties), content_size, "left")]
+    # Bonuses follow the bit order of GRADE_HEADERS; unknown names earn nothing
+    bonus = np.array([header_bonuses.get(name, 0) for name in GRADE_HEADERS], dtype=np.int64)
+    score += _mask_bits(masks, 0, len(bonus)) @ bonus
+    grade = _values(grades, LOWEST_GRADE)[np.searchsorted(_thresholds(grades), score, "right")]
+    return np.clip(score, 0, 100), grade
+
+
+def performance_scores(response_time: np.ndarray,
+                       table: Sequence[Tuple[float, int]] = RESPONSE_TIME_SCORES,
+                       slowest: int = SLOWEST_SCORE) -> np.ndarray:
+    response_time = np.asarray(response_time, dtype=np.float64)
+    values = np.array([*(score for _, score in table), slowest], dtype=np.int64)
+    return values[np.searchsorted(_thresholds(table), response_time, "right")]
+
+
+def performance_labels(scores: np.ndarray, labels: Sequence[Tuple[int, str]] = LABELS) -> np.ndarray:
+    return _values(labels, LOWEST_LABEL)[np.searchsorted(_thresholds(labels), np.asarray(scores), "right")]
+
+
+def security_scores(masks: np.ndarray,
+                    grades: Sequence[Tuple[int, str]] = SECURITY_GRADES) -> Tuple[np.ndarray, np.ndarray]:
+    bits = _mask_bits(np.asarray(masks, dtype=np.int64), _SECURITY_SHIFT, len(SECURITY_HEADERS))
+    score = bits.sum(axis=1)
+    return score, _values(grades, LOWEST_SECURITY_GRADE)[np.searchsorted(_thresholds(grades), score, "right")]
+
+
+def result_mask(result: Mapping[str, Any]) -> int:
+    """Header bitmask rebuilt from a stored result instead of raw headers."""
+    headers = {
+        'cache-control': result.get('cache_control', 'None'),
+        'expires': result.get('expires', 'None'),
+        'content-encoding': None if result.get('compression', 'none') == 'none' else result['compression'],
+    }
+    for key, name in SECURITY_HEADERS.items():
+        headers[name] = (result.get('security_headers') or {}).get(key, 'None')
+    # Stored results replace missing headers with the string 'None'
+    return header_mask({name: value for name, value in headers.items() if value not in (None, 'None')})
+
+
+def result_columns(results: Iterable[Mapping[str, Any]]) -> Dict[str, np.ndarray]:
+    """Response time, content size and header mask columns from result dicts."""
+    response_time, content_size, masks = [], [], []
+    for result in results:
+        response_time.append(result['response_time'])
+        content_size.append(result['content_size'])
+        masks.append(result_mask(result))
+    return {
+        'response_time': np.array(response_time, dtype=np.float64),
+        'content_size': np.array(content_size, dtype=np.float64),
+        'header_mask': np.array(masks, dtype=np.int64),
+    }
@@ -0,0 +1,1038 @@
+"""
+Speed analysis engine shared by the Flet UI and the headless entry points.
+
+Everything here is free of UI code so the same measurements can run from the
+speed analysis page, the batch CLI or any other caller.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+import hashlib
+import itertools
+import os
+import re
+import socket
+import time
+import uuid
+
+import requests
+
+from src.services.browser_pool import BrowserPool, MOBILE_THROTTLING, get_browser_pool, get_throttling
+from src.services.browser_metrics import (
+    TASK_TRACE_CATEGORIES, CoverageCollector, CpuProfiler, NetworkLog, TraceRecorder, aggregate_profile,
+    main_thread_tasks
+)
+from src.services.har import HarWriter, browser_entry, http_entries
+from src.services.http_client import HttpClient
+from src.services.load_model import LoadTimeModel, load_features
+from src.services.netem import MOBILE_PROFILE, get_emulator, get_profile
+from src.services.render_blocking import analyze_render_blocking, find_render_blocking
+from src.services.replay import ReplayArchive
+from src.services import scoring
+from src.services.scoring import SECURITY_HEADERS
+from src.services.results import SpeedResult
+from src.services.resilience import AdaptiveTimeout, CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded
+from src.services.third_party import block_entities, group_by_entity
+from src.services.visual_metrics import VISUAL_TRACE_CATEGORIES, compute_visual_metrics
+from src.services.scheduler import AnalysisScheduler, PRIORITY_NORMAL, get_scheduler
+from src.utils.stats import paired_difference, summarize_samples
+from src.utils.timing import TimingWindow, timed
+from src.utils.tracing import span
+from src.utils.url import extract_host
+
+
+MOBILE_USER_AGENT = 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15'
+DESKTOP_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Upper bounds for each stage; a deadline can only shorten them.
+DNS_TIMEOUT_S = 5.0
+BROWSER_GOTO_TIMEOUT_MS = 30000
+BROWSER_IDLE_TIMEOUT_MS = 5000
+
+
+def _resolve(hostname: str) -> TimingWindow:
+    """Resolve ``hostname``, timed in the lookup thread so queueing for it is not counted."""
+    with timed() as window:
+        socket.getaddrinfo(hostname, None)
+    return window
+
+
+def _is_browser_timeout(ex: Exception) -> bool:
+    """True for Playwright's TimeoutError (a navigation or wait cap ran out)."""
+    try:
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+    except Exception:
+        return False
+    return isinstance(ex, PlaywrightTimeoutError)
+
+
+def DescribeError(ex: Exception) -> str:
+    """
+    Turn an analysis exception into a short user-facing message.
+
+    Args:
+        ex (Exception): Exception raised while analyzing a URL
+
+    Returns:
+        str: Human readable error message
+    """
+    if isinstance(ex, CircuitOpenError):
+        return f"Host skipped after repeated failures (retry in {ex.retry_in:.0f} s)."
+    if isinstance(ex, DeadlineExceeded):
+        return "Analysis time budget exceeded."
+    msg = str(ex)
+    if 'timeout' in msg.lower():
+        return "Connection timeout. Please try again."
+    if 'failed to establish a new connection' in msg.lower() or 'connection' in msg.lower():
+        return "Connection error. Please check the URL."
+    return f"Analysis error: {msg}"
+
+
+class SpeedEngine:
+    """
+    Runs speed tests against a URL and returns plain result dictionaries.
+    """
+
+    def __init__(self, http: Optional[HttpClient] = None, deep_test: bool = True,
+                 browser_test: bool = True, mobile_test: bool = False,
+                 scheduler: Optional[AnalysisScheduler] = None,
+                 priority: int = PRIORITY_NORMAL, tenant: str = "default",
+                 breaker: Optional[CircuitBreaker] = None,
+                 timeouts: Optional[AdaptiveTimeout] = None,
+                 budget_s: Optional[float] = None,
+                 network_profile: Optional[str] = None,
+                 throttling: Optional[str] = None,
+                 browser_pool: Optional[BrowserPool] = None,
+                 archive: Optional[ReplayArchive] = None,
+                 har_dir: Optional[str] = None,
+                 repeat_view: bool = False,
+                 visual_metrics: bool = False,
+                 cpu_profile: bool = False,
+                 coverage: bool = False,
+                 third_party: bool = False,
+                 render_blocking: bool = False,
+                 load_model: Optional[LoadTimeModel] = None) -> None:
+        """
+        Initialize the engine.
+
+        Args:
+            http (HttpClient): HTTP client used for the document request
+            deep_test (bool): Collect cache, security and content metrics
+            browser_test (bool): Measure full load with a headless browser
+            mobile_test (bool): Emulate a mobile device
+            scheduler (AnalysisScheduler): Slot scheduler, defaults to the shared one
+            priority (int): Scheduler priority class for this engine's work
+            tenant (str): Job or client name used for fair queuing
+            breaker (CircuitBreaker): Optional per-host circuit breaker
+            timeouts (AdaptiveTimeout): Optional latency-derived request timeouts
+            budget_s (float): Optional total time budget for one RunTests call
+            network_profile (str): Emulated network ("3G", "4G", "cable", ...);
+                mobile tests default to 4G, "none" disables emulation
+            throttling (str): Browser CPU/network throttling profile; mobile
+                tests default to "mid-tier-mobile", "none" disables it
+            browser_pool (BrowserPool): Browsers reused across tests
+            archive (ReplayArchive): Record every response into this archive,
+                or replay from it; defaults to the HTTP client's archive
+            har_dir (str): Write one HAR file per test into this directory
+            repeat_view (bool): Also measure a second, warm-cache browser load
+            visual_metrics (bool): Record a filmstrip and compute Speed Index
+            cpu_profile (bool): Collect long tasks, TBT and a sampled JS profile
+            coverage (bool): Measure unused JS and CSS bytes during the load
+            third_party (bool): Group requests, bytes and script time by entity
+            render_blocking (bool): Time render-blocking resources and the
+                critical request chain, fetching them when there is no browser
+            load_model (LoadTimeModel): Trained model used for full-load
+                estimates without a browser instead of fixed per-resource costs
+        """
+        self.http = http or HttpClient(archive=archive)
+        self.archive = archive or self.http.archive
+        self.deep_test = deep_test
+        self.browser_test = browser_test
+        self.mobile_test = mobile_test
+        self.scheduler = scheduler or get_scheduler()
+        self.priority = priority
+        self.tenant = tenant
+        self.breaker = breaker
+        self.timeouts = timeouts
+        self.budget_s = budget_s
+        if network_profile and network_profile != "none":
+            # Fail on a typo now rather than on the first test
+            get_profile(network_profile)
+        self.network_profile = network_profile
+        if throttling and throttling != "none":
+            get_throttling(throttling)
+        self.throttling = throttling
+        self.browser_pool = browser_pool or get_browser_pool()
+        self.har_dir = har_dir
+        self.repeat_view = repeat_view
+        self.visual_metrics = visual_metrics
+        self.cpu_profile = cpu_profile
+        self.coverage = coverage
+        self.third_party = third_party
+        self.render_blocking = render_blocking
+        # getaddrinfo cannot be interrupted, so lookups run here and are abandoned on
+        # timeout; one thread per concurrent analysis, so nobody queues behind another
+        self._dns_executor = ThreadPoolExecutor(max_workers=self.scheduler.max_concurrent,
+                                                thread_name_prefix="dns")
+        self.load_model = load_model
+
+    def GetNetworkProfile(self) -> Optional[str]:
+        """
+        Name of the network profile tests run under, or None for the raw link.
+
+        Returns:
+            str: Profile name; mobile tests get a mobile profile unless one is set
+        """
+        if self.network_profile == "none":
+            return None
+        if self.network_profile:
+            return get_profile(self.network_profile).name
+        return MOBILE_PROFILE if self.mobile_test else None
+
+    def GetThrottling(self) -> Optional[str]:
+        """
+        Name of the browser throttling profile, or None for full speed.
+
+        Returns:
+            str: Profile name; mobile tests get a mid-tier phone unless one is set
+        """
+        if self.throttling == "none":
+            return None
+        if self.throttling:
+            return self.throttling
+        return MOBILE_THROTTLING if self.mobile_test else None
+
+    def RunTests(self, url: str, test_count: int = 1) -> List[SpeedResult]:
+        """
+        Run one or more speed tests against the given URL.
+
+        Args:
+            url (str): Normalized URL to analyze
+            test_count (int): Number of consecutive tests
+
+        Returns:
+            list: One SpeedResult per test; when the time budget runs
+            out, the tests completed so far
+        """
+        deadline = Deadline(self.budget_s)
+        results = []
+        for i in range(test_count):
+            try:
+                results.append(self.RunTest(url, i + 1, deadline))
+            except DeadlineExceeded:
+                if not results:
+                    raise
+                break
+            if deadline.expired:
+                break
+        return results
+
+    def RunTest(self, url: str, test_number: int = 1, deadline: Optional[Deadline] = None) -> SpeedResult:
+        """
+        Run a single speed test once the scheduler grants a slot.
+
+        Args:
+            url (str): Normalized URL to analyze
+            test_number (int): Sequence number stored in the result
+            deadline (Deadline): Budget shared with the other stages and tests
+
+        Returns:
+            SpeedResult: Analysis results
+        """
+        with self.scheduler.slot(extract_host(url), self.priority, self.tenant, browser=self.browser_test):
+            with span("engine.measure", url=url, test=test_number):
+                if not self.har_dir:
+                    return self.MeasureUrl(url, test_number, deadline)
+                har_path = self.GetHarPath(url, test_number)
+                # Entries are streamed as they are measured; a failed test still leaves a valid file
+                with HarWriter.open(har_path) as har:
+                    result = self.MeasureUrl(url, test_number, deadline, har=har)
+                result.har_path = har_path
+                return result
+
+    def GetHarPath(self, url: str, test_number: int) -> str:
+        """
+        Build the HAR file path for one test.
+
+        The name carries a hash of the full URL and a random suffix, so tests of
+        different paths on one host, or concurrent runs, never share a file.
+
+        Args:
+            url (str): Analyzed URL
+            test_number (int): Sequence number of the test
+
+        Returns:
+            str: Path inside ``har_dir``
+        """
+        os.makedirs(self.har_dir, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9.-]+', '_', extract_host(url))
+        url_hash = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+        unique = uuid.uuid4().hex[:8]
+        return os.path.join(self.har_dir, f"{name}-{url_hash}-{time.strftime('%Y%m%d-%H%M%S')}-{test_number}-{unique}.har")
+
+    def MeasureUrl(self, url: str, test_number: int = 1, deadline: Optional[Deadline] = None,
+                   har: Optional[HarWriter] = None) -> SpeedResult:
+        """
+        Measure a single URL without going through the scheduler.
+
+        Stages that no longer fit in the deadline are skipped and listed in
+        the result's ``skipped_stages`` with ``partial`` set.
+
+        Args:
+            url (str): Normalized URL to analyze
+            test_number (int): Sequence number stored in the result
+            deadline (Deadline): Budget shared with the other stages and tests
+            har (HarWriter): Optional HAR receiving the document and browser requests
+
+        Returns:
+            SpeedResult: Analysis results
+        """
+        deadline = deadline or Deadline(self.budget_s)
+        host = extract_host(url)
+        skipped_stages = []
+        if self.breaker:
+            self.breaker.check(host)
+
+        # Pre-request network measurements (DNS lookup); replays stay offline
+        dns_lookup_ms = None
+        dns_uncertainty_ms = None
+        replaying = self.archive is not None and not self.archive.recording
+        if not replaying:
+            try:
+                dns_timeout = deadline.timeout(DNS_TIMEOUT_S, "DNS lookup")
+                with span("engine.dns"):
+                    # Resolve the bare hostname; the netloc may carry a port
+                    lookup = self._dns_executor.submit(_resolve, urlparse(url).hostname or host)
+                    dns_window = lookup.result(timeout=dns_timeout)
+                dns_lookup_ms = round(dns_window.elapsed_ms, 2)
+                dns_uncertainty_ms = dns_window.uncertainty_ms
+            except Exception:
+                dns_lookup_ms = None
+        # Route the document and the browser through this thread's emulator port,
+        # reset so the test gets an idle link and replayable jitter and loss
+        network_profile = None if replaying else self.GetNetworkProfile()
+        proxy = get_emulator(network_profile).session(f"{url}#{test_number}") if network_profile else None
+
+        # Add mobile user agent if mobile test is enabled
+        headers = {}
+        if self.mobile_test:
+            headers['User-Agent'] = MOBILE_USER_AGENT
+        # Encourage compression support (including br)
+        headers['Accept-Encoding'] = 'br, gzip, deflate'
+
+        # Measure response via HttpClient
+        request_timeout = self.timeouts.timeout_for(host) if self.timeouts else self.http.timeout
+        page_id = f"page_{test_number}"
+        started_s = time.time()
+        try:
+            timeout = deadline.timeout(request_timeout, "HTTP request")
+            try:
+                http_resp = self.http.get(
+                    url,
+                    headers=headers,
+                    allow_redirects=True,
+                    timeout=timeout,
+                    proxy=proxy,
+                )
+            except requests.RequestException as ex:
+                if self.breaker:
+                    self.breaker.record_failure(host)
+                if self.timeouts and isinstance(ex, requests.Timeout):
+                    self.timeouts.observe_timeout(host, timeout)
+                raise
+            # 503 is overload, left to the rate limiter: neither a failure nor a success,
+            # so it neither resets the failure count nor closes a half-open breaker
+            if self.breaker and http_resp.status_code != 503:
+                if http_resp.status_code >= 500:
+                    self.breaker.record_failure(host)
+                else:
+                    self.breaker.record_success(host)
+        finally:
+            # No-op once an outcome was recorded; frees a half-open trial otherwise
+            if self.breaker:
+                self.breaker.release_trial(host)
+        if self.timeouts:
+            self.timeouts.observe(host, http_resp.elapsed_ms / 1000)
+        response = http_resp.response
+        response_time = http_resp.elapsed_ms
+        # Timer error of each reading (see src.utils.timing), not run-to-run variance
+        uncertainty = {'response_time': http_resp.uncertainty_ms, 'ttfb': http_resp.uncertainty_ms,
+                       'dns': dns_uncertainty_ms}
+        # First byte of the final document from the request start, redirects included
+        ttfb_ms = http_resp.ttfb_ms
+        content_length = len(response.content)
+        status_code = response.status_code
+        # Decode once; response.text re-runs charset detection on every access
+        with span("engine.decode_body"):
+            html_text = response.text
+        if har:
+            with span("engine.har"):
+                for entry in http_entries(response, started_s, response_time, page_id):
+                    har.add_entry(entry)
+
+        # Full page load: prefer real browser if enabled, else simulate
+        full_load_time = None
+        browser_fallback = None
+        if self.browser_test:
+            if deadline.remaining() * 1000 < BROWSER_IDLE_TIMEOUT_MS:
+                skipped_stages.append('browser')
+                browser_fallback = 'deadline_exceeded'
+            else:
+                if self.http.rate_limiter:
+                    # The browser load hits the same origin again, so it needs a token too.
+                    self.http.rate_limiter.acquire(host)
+                try:
+                    with span("engine.browser"):
+                        full_load_time = self.CollectRealBrowserMetrics(
+                            url, self.mobile_test,
+                            timeout_ms=deadline.timeout(BROWSER_GOTO_TIMEOUT_MS / 1000, "browser load") * 1000,
+                            proxy=proxy, throttling=self.GetThrottling(),
+                            har=har, page_id=page_id, repeat=self.repeat_view,
+                            visual=self.visual_metrics, cpu_profile=self.cpu_profile,
+                            coverage=self.coverage, third_party=self.third_party,
+                            request_log=self.render_blocking
+                        )
+                except DeadlineExceeded:
+                    skipped_stages.append('browser')
+                    browser_fallback = 'deadline_exceeded'
+                except Exception as ex:
+                    if not _is_browser_timeout(ex):
+                        raise
+                    if deadline.expired:
+                        # The load was cut short by the analysis budget
+                        skipped_stages.append('browser')
+                        browser_fallback = 'deadline_exceeded'
+                    else:
+                        # The page itself exceeded the navigation cap
+                        browser_fallback = 'browser_timeout'
+        dom_content_loaded_ms = None
+        repeat_view = None
+        visual_metrics = None
+        main_thread = None
+        coverage = None
+        third_parties = None
+        request_log = None
+        if full_load_time is not None:
+            uncertainty['full_load_time'] = full_load_time.pop('uncertainty_ms', None)
+            dom_content_loaded_ms = full_load_time.pop('dom_content_loaded_ms', None)
+            repeat_view = full_load_time.pop('repeat_view', None)
+            visual_metrics = full_load_time.pop('visual_metrics', None)
+            main_thread = full_load_time.pop('main_thread', None)
+            coverage = full_load_time.pop('coverage', None)
+            third_parties = full_load_time.pop('third_parties', None)
+            request_log = full_load_time.pop('request_log', None)
+
+        # Calculate DOM Content Loaded time
+        dom_ready_time = self.CalculateDOMReadyTime(response_time, content_length)
+
+        # Get response headers
+        response_headers = response.headers
+        content_type = response_headers.get('content-type', 'Unknown')
+        server = response_headers.get('server', 'Unknown')
+        content_encoding = response_headers.get('content-encoding', 'none')
+        cache_control = response_headers.get('cache-control', 'None')
+        expires_hdr = response_headers.get('expires', 'None')
+        # HTTP version (requests uses urllib3 raw.version: 11 => HTTP/1.1)
+        try:
+            raw_ver = getattr(response.raw, 'version', None)
+            http_version = 'HTTP/1.1' if raw_ver == 11 else 'HTTP/1.0' if raw_ver == 10 else 'HTTP/2 (proxy)' if raw_ver == 20 else 'Unknown'
+        except Exception:
+            http_version = 'Unknown'
+        redirect_count = len(getattr(response, 'history', []) or [])
+        # Best-practice analysis on HTML when applicable
+        best_practices = {}
+        blocking = None
+        try:
+            if 'text/html' in content_type.lower():
+                with span("engine.best_practices"):
+                    # Parsed once, shared with the render-blocking analysis below
+                    blocking = find_render_blocking(html_text, response.url)
+                    best_practices = self.AnalyzeHtmlBestPractices(html_text, response.url, blocking)
+        except Exception:
+            best_practices = {}
+        # HTTP-only predictors; stored with browser results they become model training data
+        features = load_features(html_text, response_time, content_length, redirect_count, best_practices)
+        if full_load_time is None:
+            with span("engine.simulate_full_load"):
+                full_load_time = self.SimulateFullPageLoad(html_text, response_time, features)
+            if browser_fallback:
+                full_load_time['fallback'] = browser_fallback
+        if har:
+            har.add_page(page_id, url, started_s, dom_content_loaded_ms,
+                         full_load_time['total_load_time'] if full_load_time.get('fallback') is None else response_time)
+        render_blocking = None
+        if self.render_blocking and 'text/html' in content_type.lower():
+            if request_log is None and deadline.remaining() < 1.0:
+                skipped_stages.append('render_blocking')
+            else:
+                with span("engine.render_blocking"):
+                    render_blocking = analyze_render_blocking(
+                        html_text, response.url, ttfb_ms if ttfb_ms is not None else response_time,
+                        response_time, content_length, requests=request_log,
+                        fetch=self.FetchSubresource(headers, proxy, deadline), blocking=blocking
+                    )
+        # CDN heuristic
+        cdn = self.DetectCdn(server, response_headers)
+
+        # Fields of every result; a deep test adds its own below
+        fields = dict(
+            url=url,
+            response_time=response_time,
+            content_size=content_length,
+            status_code=status_code,
+            content_type=content_type,
+            server=server,
+            http_version=http_version,
+            redirects=redirect_count,
+            compression=content_encoding,
+            dns=dns_lookup_ms,
+            cdn=cdn,
+            best_practices=best_practices,
+            full_load_time=full_load_time,
+            load_features=features,
+            dom_ready_time=dom_ready_time,
+            test_number=test_number,
+            mobile_test=self.mobile_test,
+            network_profile=network_profile,
+            throttling=self.GetThrottling() if self.browser_test else None,
+            repeat_view=repeat_view,
+            visual_metrics=visual_metrics,
+            main_thread=main_thread,
+            coverage=coverage,
+            third_parties=third_parties,
+            render_blocking=render_blocking,
+            partial=bool(skipped_stages),
+            skipped_stages=skipped_stages,
+            uncertainty=uncertainty,
+        )
+
+        # Deep analysis if enabled
+        if self.deep_test:
+            # Analyze additional metrics
+            expires = expires_hdr
+            last_modified = response_headers.get('last-modified', 'None')
+            etag = response_headers.get('etag', 'None')
+            connection = response_headers.get('connection', 'None')
+            keep_alive = response_headers.get('keep-alive', 'None')
+
+            # Calculate additional performance metrics
+            # Prefer real TTFB if available
+            ttf = ttfb_ms if ttfb_ms is not None else self.CalculateTimeToFirstByte(response_time)
+            lcp = self.CalculateLargestContentfulPaint(content_length)
+            cls = self.CalculateCumulativeLayoutShift(content_length)
+            fid = self.CalculateFirstInputDelay(response_time)
+
+            # Analyze content structure
+            with span("engine.content_structure"):
+                content_analysis = self.AnalyzeContentStructure(html_text)
+
+            # Security headers analysis
+            with span("engine.security_headers"):
+                security_headers = self.AnalyzeSecurityHeaders(response_headers)
+
+            # Performance grade calculation
+            with span("engine.performance_grade"):
+                performance_grade = self.CalculatePerformanceGrade(response_time, content_length, response_headers)
+
+            fields.update(
+                deep=True,
+                cache_control=cache_control,
+                expires=expires,
+                last_modified=last_modified,
+                etag=etag,
+                connection=connection,
+                keep_alive=keep_alive,
+                ttf=ttf,
+                lcp=lcp,
+                cls=cls,
+                fid=fid,
+                content_analysis=content_analysis,
+                security_headers=security_headers,
+                performance_grade=performance_grade,
+            )
+
+        return SpeedResult(**fields)
+
+    def CalculateTimeToFirstByte(self, response_time):
+        """Calculate Time to First Byte (TTFB)."""
+        return response_time * 0.3  # Simulate TTFB calculation
+
+    def CalculateLargestContentfulPaint(self, content_size):
+        """Calculate Largest Contentful Paint (LCP)."""
+        # Simulate LCP based on content size
+        if content_size < 1024 * 1024:  # < 1MB
+            return 1.2
+        elif content_size < 5 * 1024 * 1024:  # < 5MB
+            return 2.5
+        else:
+            return 4.0
+
+    def CalculateCumulativeLayoutShift(self, content_size):
+        """Calculate Cumulative Layout Shift (CLS)."""
+        # Simulate CLS based on content size
+        if content_size < 500 * 1024:  # < 500KB
+            return 0.05
+        elif content_size < 1024 * 1024:  # < 1MB
+            return 0.15
+        else:
+            return 0.25
+
+    def CalculateFirstInputDelay(self, response_time):
+        """Calculate First Input Delay (FID)."""
+        # Simulate FID based on response time
+        if response_time < 200:
+            return 50
+        elif response_time < 500:
+            return 100
+        else:
+            return 200
+
+    def AnalyzeContentStructure(self, html_content):
+        """Analyze HTML content structure."""
+        # Count various elements
+        img_count = len(re.findall(r'<img[^>]*>', html_content, re.IGNORECASE))
+        link_count = len(re.findall(r'<a[^>]*href=', html_content, re.IGNORECASE))
+        script_count = len(re.findall(r'<script[^>]*>', html_content, re.IGNORECASE))
+        style_count = len(re.findall(r'<style[^>]*>', html_content, re.IGNORECASE))
+        div_count = len(re.findall(r'<div[^>]*>', html_content, re.IGNORECASE))
+
+        # Check for performance issues
+        inline_styles = len(re.findall(r'style\s*=', html_content, re.IGNORECASE))
+        external_scripts = len(re.findall(r'<script[^>]*src=', html_content, re.IGNORECASE))
+        external_styles = len(re.findall(r'<link[^>]*rel\s*=\s*["\']stylesheet["\']', html_content, re.IGNORECASE))
+
+        return {
+            'img_count': img_count,
+            'link_count': link_count,
+            'script_count': script_count,
+            'style_count': style_count,
+            'div_count': div_count,
+            'inline_styles': inline_styles,
+            'external_scripts': external_scripts,
+            'external_styles': external_styles
+        }
+
+    def AnalyzeSecurityHeaders(self, headers):
+        """Analyze security headers."""
+        security_headers = {key: headers.get(name, 'None') for key, name in SECURITY_HEADERS.items()}
+
+        # Calculate security score
+        security_score, grade = scoring.security_score(scoring.header_mask(headers))
+        security_headers['score'] = security_score
+        security_headers['grade'] = grade
+
+        return security_headers
+
+    def AnalyzeHtmlBestPractices(self, html_content, url='', blocking=None):
+        """Analyze HTML against common best practices.
+        Returns a dict of booleans and counts to be surfaced in the UI.
+        ``url`` resolves relative resource URLs; ``blocking`` reuses an earlier
+        ``find_render_blocking`` result instead of parsing the head again.
+        """
+        out = {}
+        # meta viewport for mobile friendliness
+        out['has_viewport'] = bool(re.search(r'<meta[^>]+name=["\']viewport["\']', html_content, re.IGNORECASE))
+        # title tag
+        out['has_title'] = bool(re.search(r'<title>.*?</title>', html_content, re.IGNORECASE|re.DOTALL))
+        # description meta
+        out['has_meta_description'] = bool(re.search(r'<meta[^>]+name=["\']description["\']', html_content, re.IGNORECASE))
+        # lazy loading images
+        out['lazy_loaded_images'] = len(re.findall(r'<img[^>]*loading=["\']lazy["\']', html_content, re.IGNORECASE))
+        # critical CSS hint
+        out['has_preload_css'] = bool(re.search(r'<link[^>]+rel=["\']preload["\'][^>]+as=["\']style["\']', html_content, re.IGNORECASE))
+        # stylesheets and synchronous scripts in <head> that hold first render
+        if blocking is None:
+            blocking = find_render_blocking(html_content, url)
+        out['render_blocking_css'] = sum(1 for r in blocking if r['type'] == 'stylesheet')
+        out['render_blocking_js'] = sum(1 for r in blocking if r['type'] == 'script')
+        # http resources (mixed content risk)
+        out['http_resources'] = len(re.findall(r'\shref=\"http://|\ssrc=\"http://', html_content, re.IGNORECASE))
+        return out
+
+    def DetectCdn(self, server, headers):
+        """Heuristic CDN detection based on server/header signatures."""
+        sigs = ['cloudflare', 'akamai', 'fastly', 'cloudfront', 'cdn77', 'incapsula', 'cachefly']
+        blob = (server or '') + ' ' + ' '.join([f"{k}:{v}" for k, v in headers.items()])
+        blob = blob.lower()
+        for s in sigs:
+            if s in blob:
+                return s
+        return 'unknown'
+
+    def SimulateFullPageLoad(self, html_content, base_response_time, features=None):
+        """
+        Estimate full page load time without a browser.
+        With a trained ``load_model`` the estimate comes from its regression
+        on ``features`` and carries the model's cross-validated error;
+        otherwise fixed per-resource costs are used.
+        """
+        features = features or load_features(html_content, base_response_time, len(html_content), 0)
+        css_files = int(features['css_files'])
+        js_files = int(features['js_files'])
+        images = int(features['images'])
+
+        if self.load_model is not None:
+            total_load_time = self.load_model.predict(features)
+            return {
+                'total_load_time': round(total_load_time, 2),
+                'css_files': css_files,
+                'js_files': js_files,
+                'images': images,
+                'additional_time': round(total_load_time - base_response_time, 2),
+                'estimator': 'model',
+                'model_trained_at': self.load_model.trained_at,
+                'prediction_error_ms': self.load_model.metrics.get('rmse_ms'),
+            }
+
+        # Calculate additional load time based on resources
+        additional_time = 0
+
+        # CSS files (typically fast)
+        additional_time += css_files * 50  # 50ms per CSS file
+
+        # JavaScript files (can be slow)
+        additional_time += js_files * 100  # 100ms per JS file
+
+        # Images (can be very slow)
+        additional_time += images * 200  # 200ms per image
+
+        # Network latency simulation
+        network_delay = 50  # Base network delay
+
+        # Calculate total load time
+        total_load_time = base_response_time + additional_time + network_delay
+
+        return {
+            'total_load_time': round(total_load_time, 2),
+            'css_files': css_files,
+            'js_files': js_files,
+            'images': images,
+            'additional_time': round(additional_time, 2),
+            'estimator': 'heuristic'
+        }
+
+    def FetchSubresource(self, headers, proxy, deadline):
+        """
+        Build the fetch callback used to time render-blocking resources over HTTP.
+
+        Args:
+            headers (dict): Request headers of the document request
+            proxy (str): Network emulator URL, if any
+            deadline (Deadline): Budget shared with the other stages
+
+        Returns:
+            callable: ``fetch(url)`` returning ``(final_url, bytes, elapsed_ms, text)`` or None
+        """
+        def fetch(resource_url):
+            try:
+                resp = self.http.get(resource_url, headers=headers, allow_redirects=True,
+                                     timeout=deadline.timeout(self.http.timeout, "subresource"), proxy=proxy)
+            except (requests.RequestException, DeadlineExceeded):
+                return None
+            if resp.response.status_code >= 400:
+                return None
+            body = resp.response.text if 'css' in resp.response.headers.get('content-type', '') else ''
+            return resp.response.url, len(resp.response.content), resp.elapsed_ms, body
+        return fetch
+
+    def CollectRealBrowserMetrics(self, url, is_mobile=False, timeout_ms=BROWSER_GOTO_TIMEOUT_MS, proxy=None,
+                                  throttling=None, har=None, page_id='page_1', repeat=False, visual=False,
+                                  cpu_profile=False, coverage=False, third_party=False, block=None,
+                                  request_log=False):
+        """Collect real page load metrics using a headless browser (playwright).
+        Returns a dict compatible with SimulateFullPageLoad output keys.
+        If playwright is not installed, falls back to simulation with a flag.
+        ``timeout_ms`` bounds navigation plus the network-idle wait.
+        ``proxy`` routes all browser traffic, loopback included, through a proxy.
+        ``throttling`` names a CPU/network profile applied over CDP.
+        With ``har`` every finished request is streamed into the HAR writer.
+        With ``repeat`` the page is loaded a second time in the same context and
+        ``repeat_view`` reports that warm-cache load and its cache hit ratios.
+        With ``visual`` a screenshot filmstrip is traced and ``visual_metrics``
+        reports Speed Index and visual progress.
+        With ``cpu_profile`` long tasks, Total Blocking Time and sampled script
+        time per URL and origin are reported under ``main_thread``.
+        With ``coverage`` unused JS and CSS bytes per file and origin are
+        reported under ``coverage``.
+        With ``third_party`` requests, bytes and script time are grouped by
+        entity under ``third_parties``; ``block`` lists entities whose
+        requests are aborted.
+        With ``request_log`` the raw per-request log (timestamps, initiator,
+        priority) is returned under ``request_log``.
+        """
+        try:
+            import playwright.sync_api  # noqa: F401
+        except Exception:
+            # Fallback marker
+            return {
+                'total_load_time': 0,
+                'css_files': 0,
+                'js_files': 0,
+                'images': 0,
+                'additional_time': 0,
+                'fallback': 'playwright_not_installed'
+            }
+
+        page_options = {
+            'viewport': { 'width': 390, 'height': 844 } if is_mobile else { 'width': 1366, 'height': 768 },
+            'user_agent': MOBILE_USER_AGENT if is_mobile else DESKTOP_USER_AGENT,
+            'is_mobile': is_mobile,
+            'has_touch': is_mobile,
+        }
+        throttling_profile = get_throttling(throttling) if throttling else None
+        with self.browser_pool.page(proxy=proxy, throttling=throttling_profile, archive=self.archive,
+                                    **page_options) as page:
+            # Track network requests
+            resources = { 'css': 0, 'js': 0, 'img': 0 }
+            def on_request(req):
+                url = req.url.lower()
+                if url.endswith('.css'):
+                    resources['css'] += 1
+                elif url.endswith('.js'):
+                    resources['js'] += 1
+                elif any(url.endswith(ext) for ext in ['.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg']):
+                    resources['img'] += 1
+            page.on('request', on_request)
+            finished = []
+            if har:
+                page.on('requestfinished', finished.append)
+
+            # One trace serves both the filmstrip and the main-thread tasks
+            categories = set()
+            if visual:
+                categories.update(VISUAL_TRACE_CATEGORIES)
+            if cpu_profile:
+                categories.update(TASK_TRACE_CATEGORIES)
+            cdp = page.context.new_cdp_session(page) if categories or coverage or third_party or request_log else None
+            trace = TraceRecorder(cdp, sorted(categories)) if categories else None
+            profiler = CpuProfiler(cdp) if cpu_profile or third_party else None
+            coverage_collector = CoverageCollector(cdp) if coverage else None
+            network_log = NetworkLog(cdp) if third_party or request_log else None
+            if block is not None:
+                block_entities(page, block)
+            window = self.LoadPage(page, url, timeout_ms)
+            visual_metrics = None
+            main_thread = None
+            coverage_result = None
+            third_parties = None
+            if coverage_collector:
+                # Taken before the profiler stops, which disables the shared Profiler domain
+                with span("browser.coverage"):
+                    coverage_result = coverage_collector.stop(url)
+            script_time = aggregate_profile(profiler.stop()) if profiler else None
+            events = trace.stop(page) if trace else []
+            if visual:
+                # Frames are decoded and compared only after the measured load
+                with span("browser.visual_metrics"):
+                    visual_metrics = compute_visual_metrics(events)
+            if cpu_profile:
+                with span("browser.main_thread"):
+                    main_thread = {**main_thread_tasks(events), **script_time}
+            if third_party:
+                with span("browser.third_parties"):
+                    third_parties = group_by_entity(url, network_log.requests.values(), script_time['origins'])
+            if cdp:
+                try:
+                    cdp.detach()
+                except Exception:
+                    pass
+
+            dom_content_loaded_ms = None
+            if har:
+                with span("browser.har"):
+                    try:
+                        dom_content_loaded_ms = page.evaluate(
+                            "() => { const n = performance.getEntriesByType('navigation')[0];"
+                            " return n ? n.domContentLoadedEventEnd : null; }"
+                        )
+                    except Exception:
+                        pass
+                    for req in finished:
+                        entry = browser_entry(req, page_id)
+                        if entry:
+                            har.add_entry(entry)
+
+            # Second navigation in the same context, with the cache the first one warmed
+            repeat_view = None
+            remaining_ms = timeout_ms - window.elapsed_ms
+            if repeat and remaining_ms > BROWSER_IDLE_TIMEOUT_MS:
+                with span("browser.repeat_view"):
+                    repeat_log = NetworkLog(page.context.new_cdp_session(page))
+                    try:
+                        repeat_window = self.LoadPage(page, url, remaining_ms)
+                        repeat_view = {
+                            'total_load_time': round(repeat_window.elapsed_ms, 2),
+                            **repeat_log.cache_summary()
+                        }
+                    except Exception as ex:
+                        if 'timeout' not in str(ex).lower():
+                            raise
+                    finally:
+                        repeat_log.detach()
+
+        total_ms = round(window.elapsed_ms, 2)
+        # Approximate additional time (beyond initial response unknown here)
+        additional = max(0, total_ms - 0)
+        return {
+            'total_load_time': total_ms,
+            'css_files': resources['css'],
+            'js_files': resources['js'],
+            'images': resources['img'],
+            'additional_time': additional,
+            'fallback': None,
+            'uncertainty_ms': window.uncertainty_ms,
+            'dom_content_loaded_ms': dom_content_loaded_ms,
+            'repeat_view': repeat_view,
+            'visual_metrics': visual_metrics,
+            'main_thread': main_thread,
+            'coverage': coverage_result,
+            'third_parties': third_parties,
+            'request_log': list(network_log.requests.values()) if request_log else None
+        }
+
+    def MeasureThirdPartyImpact(self, url: str, entities: Optional[List[str]] = None, samples: int = 5,
+                                top: int = 3) -> Dict[str, Any]:
+        """
+        Measure what each third party costs by loading with it blocked.
+
+        Baseline and blocked loads alternate in pairs (their order flips on
+        every pair so drift affects both equally), each in a fresh context.
+        Both kinds of load install the same request route, so interception
+        overhead cancels out of the difference.
+
+        Args:
+            url (str): Normalized URL to analyze
+            entities (list): Entities to block; defaults to the ``top`` third
+                parties by bytes in a discovery load
+            samples (int): Load pairs per entity
+            top (int): Entities picked when ``entities`` is not given
+
+        Returns:
+            dict: Discovery grouping and, per entity, baseline/blocked load
+            statistics and the paired load-time delta
+        """
+        network_profile = self.GetNetworkProfile()
+        emulator = get_emulator(network_profile) if network_profile else None
+        throttling = self.GetThrottling()
+        loads = itertools.count()
+
+        def load(block=None, third_party=False):
+            # Every load starts on an idle link with its own replayable seed
+            proxy = emulator.session(f"{url}#impact-{next(loads)}") if emulator else None
+            return self.CollectRealBrowserMetrics(
+                url, self.mobile_test, proxy=proxy, throttling=throttling,
+                third_party=third_party, block=block
+            )
+
+        with self.scheduler.slot(extract_host(url), self.priority, self.tenant, browser=True):
+            with span("engine.third_party_impact", url=url):
+                discovery = load(block=(), third_party=True)
+                if discovery.get('fallback'):
+                    return {'url': url, 'fallback': discovery['fallback']}
+                grouping = discovery['third_parties']
+                if entities is None:
+                    entities = [row['entity'] for row in grouping['entities'] if not row['first_party']][:top]
+                impact = []
+                for entity in entities:
+                    baseline, blocked = [], []
+                    for i in range(samples):
+                        with span("engine.third_party_pair", entity=entity, sample=i):
+                            if i % 2 == 0:
+                                baseline.append(load(block=())['total_load_time'])
+                                blocked.append(load(block=[entity])['total_load_time'])
+                            else:
+                                blocked.append(load(block=[entity])['total_load_time'])
+                                baseline.append(load(block=())['total_load_time'])
+                    # Positive savings: the page loads faster without the entity
+                    savings = paired_difference(blocked, baseline)
+                    impact.append({
+                        'entity': entity,
+                        'baseline': summarize_samples(baseline),
+                        'blocked': summarize_samples(blocked),
+                        'load_time_savings': savings,
+                    })
+        return {
+            'url': url,
+            'samples': samples,
+            'network_profile': network_profile,
+            'throttling': throttling,
+            'third_parties': grouping,
+            'impact': impact,
+            'fallback': None,
+        }
+
+    def LoadPage(self, page, url, timeout_ms):
+        """
+        Navigate and wait for load plus network idle within ``timeout_ms``.
+
+        Args:
+            page: Playwright page
+            url (str): URL to load
+            timeout_ms (float): Budget for navigation and the idle wait
+
+        Returns:
+            TimingWindow: Measured load window
+        """
+        window = timed()
+        with window:
+            with span("browser.goto"):
+                page.goto(url, wait_until='load', timeout=timeout_ms)
+            # Ensure network idle-ish, within what is left of the budget
+            idle_ms = min(BROWSER_IDLE_TIMEOUT_MS, timeout_ms - (time.perf_counter_ns() - window.start_ns) / 1e6)
+            if idle_ms > 0:
+                try:
+                    with span("browser.network_idle"):
+                        page.wait_for_load_state('networkidle', timeout=idle_ms)
+                except Exception:
+                    pass
+        return window
+
+    def CalculateDOMReadyTime(self, response_time, content_size):
+        """
+        Calculate DOM Content Loaded time.
+        This is when the HTML document has been completely loaded and parsed.
+        """
+        # DOM ready is typically 70-80% of total response time
+        dom_ready_ratio = 0.75
+
+        # Adjust based on content size (larger content = longer parsing)
+        if content_size > 1024 * 1024:  # > 1MB
+            dom_ready_ratio = 0.85
+        elif content_size > 500 * 1024:  # > 500KB
+            dom_ready_ratio = 0.80
+        else:
+            dom_ready_ratio = 0.70
+
+        return round(response_time * dom_ready_ratio, 2)
+
+    def CalculatePerformanceGrade(self, response_time, content_size, headers):
+        """Calculate overall performance grade.
+        Penalties and bonuses come from the tables in ``scoring``, shared
+        with the batch re-scoring path.
+        """
+        return scoring.performance_grade(response_time, content_size, scoring.header_mask(headers))
+
+    def CalculatePerformanceScore(self, response_time):
+        """
+        Calculate performance score based on response time.
+
+        Args:
+            response_time (float): Response time in milliseconds
+
+        Returns:
+            int: Performance score (0-100)
+        """
+        return scoring.performance_score(response_time)
+
+    def GetPerformanceLabel(self, score):
+        """
+        Get performance label based on score.
+
+        Args:
+            score (int): Performance score
+
+        Returns:
+            str: Performance label
+        """
+        return scoring.performance_label(score)
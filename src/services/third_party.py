@@ -0,0 +1,136 @@
+"""
+Third-party attribution of browser requests and script time.
+
+Requests are grouped by entity: a known vendor from ``ENTITIES`` when the
+host matches one of its domains, otherwise the host's registrable domain.
+The entity of the page itself is the first party.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+
+# Well-known vendors and the domains they serve tags from
+ENTITIES: Dict[str, tuple] = {
+    "Google Analytics": ("google-analytics.com", "analytics.google.com"),
+    "Google Tag Manager": ("googletagmanager.com",),
+    "Google Ads": ("doubleclick.net", "googlesyndication.com", "googleadservices.com", "adservice.google.com"),
+    "Google Fonts": ("fonts.googleapis.com", "fonts.gstatic.com"),
+    "Google CDN": ("ajax.googleapis.com", "gstatic.com"),
+    "YouTube": ("youtube.com", "ytimg.com", "youtube-nocookie.com"),
+    "Facebook": ("facebook.net", "facebook.com", "fbcdn.net"),
+    "Twitter": ("twitter.com", "twimg.com", "ads-twitter.com"),
+    "LinkedIn": ("linkedin.com", "licdn.com"),
+    "TikTok": ("tiktok.com", "analytics.tiktok.com"),
+    "Microsoft Clarity": ("clarity.ms",),
+    "Bing Ads": ("bat.bing.com",),
+    "Hotjar": ("hotjar.com", "hotjar.io"),
+    "Segment": ("segment.com", "segment.io"),
+    "HubSpot": ("hubspot.com", "hs-scripts.com", "hs-analytics.net", "hsforms.net"),
+    "Intercom": ("intercom.io", "intercomcdn.com"),
+    "Cloudflare CDN": ("cdnjs.cloudflare.com",),
+    "jsDelivr": ("cdn.jsdelivr.net",),
+    "unpkg": ("unpkg.com",),
+    "Stripe": ("stripe.com", "stripe.network"),
+    "Sentry": ("sentry.io", "sentry-cdn.com"),
+    "New Relic": ("newrelic.com", "nr-data.net"),
+    "Cookiebot": ("cookiebot.com",),
+    "OneTrust": ("onetrust.com", "cookielaw.org"),
+}
+
+# Suffixes under which registrations happen one level deeper (example.co.uk)
+_SECOND_LEVEL = {"co", "com", "net", "org", "gov", "edu", "ac"}
+
+_DOMAIN_TO_ENTITY = {domain: entity for entity, domains in ENTITIES.items() for domain in domains}
+
+
+def registrable_domain(host: str) -> str:
+    labels = host.lower().rstrip(".").split(".")
+    if len(labels) <= 2 or labels[-1].isdigit():
+        return ".".join(labels)
+    if labels[-2] in _SECOND_LEVEL and len(labels[-1]) == 2:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def entity_for(url: str) -> Optional[str]:
+    """Entity name for a URL, or None for non-network URLs (data:, blob:)."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    labels = host.split(".")
+    # Longest matching suffix wins, so fonts.gstatic.com beats gstatic.com
+    for i in range(len(labels) - 1):
+        entity = _DOMAIN_TO_ENTITY.get(".".join(labels[i:]))
+        if entity:
+            return entity
+    return registrable_domain(host)
+
+
+def group_by_entity(page_url: str, requests: Iterable[Dict[str, Any]],
+                    script_origins: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Requests, bytes and script time per entity.
+
+    ``requests`` are ``NetworkLog`` entries; ``script_origins`` is the
+    ``origins`` list of an aggregated CPU profile.
+    """
+    first_party = entity_for(page_url)
+    groups: Dict[str, Dict[str, Any]] = {}
+
+    def group(entity: str) -> Dict[str, Any]:
+        row = groups.get(entity)
+        if row is None:
+            row = groups[entity] = {
+                'entity': entity, 'first_party': entity == first_party, 'requests': 0, 'bytes': 0,
+                'main_thread_ms': 0.0 if script_origins is not None else None, 'origins': set(),
+            }
+        return row
+
+    for entry in requests:
+        entity = entity_for(entry.get("url") or "")
+        if entity is None:
+            continue
+        row = group(entity)
+        row['requests'] += 1
+        row['bytes'] += entry.get("encoded_bytes", 0)
+        parts = urlsplit(entry["url"])
+        row['origins'].add(f"{parts.scheme}://{parts.netloc}")
+    for item in script_origins or ():
+        entity = entity_for(item['origin'])
+        if entity is not None:
+            group(entity)['main_thread_ms'] += item['self_time_ms']
+
+    rows = sorted(groups.values(), key=lambda r: (r['first_party'], -r['bytes']))
+    for row in rows:
+        row['origins'] = sorted(row['origins'])
+        if row['main_thread_ms'] is not None:
+            row['main_thread_ms'] = round(row['main_thread_ms'], 1)
+    third = [r for r in rows if not r['first_party']]
+    total_bytes = sum(r['bytes'] for r in rows)
+    return {
+        'first_party': first_party,
+        'third_party_requests': sum(r['requests'] for r in third),
+        'third_party_bytes': sum(r['bytes'] for r in third),
+        'third_party_byte_share': round(sum(r['bytes'] for r in third) / total_bytes, 3) if total_bytes else 0.0,
+        'entities': rows,
+    }
+
+
+def block_entities(page: Any, entities: Iterable[str]) -> None:
+    """
+    Abort every request to the given entities.
+
+    An empty set still installs the route, so baseline and blocked loads pay
+    the same request-interception overhead.
+    """
+    blocked = set(entities)
+
+    def handle(route) -> None:
+        if entity_for(route.request.url) in blocked:
+            route.abort("blockedbyclient")
+        else:
+            route.fallback()
+
+    page.route("**/*", handle)
@@ -0,0 +1,108 @@
+"""
+Speed Index and visual progress from a filmstrip of page screenshots.
+
+Frames come from Chrome's trace (``disabled-by-default-devtools.screenshot``),
+which the compositor records off the main thread, so capturing them does not
+delay the load; they are decoded and compared only after the load finished.
+
+Visual progress follows the histogram method used by WebPageTest and
+Lighthouse: for each colour channel, how far a frame's histogram has moved
+from the first frame towards the last one. All frames are processed in one
+pass of NumPy array operations.
+"""
+
+from typing import Any, Dict, List, Tuple
+import base64
+import io
+
+import numpy as np
+
+from src.services.browser_metrics import navigation_start
+
+
+SCREENSHOT_CATEGORY = "disabled-by-default-devtools.screenshot"
+VISUAL_TRACE_CATEGORIES = (SCREENSHOT_CATEGORY, "blink.user_timing", "loading")
+# Near-white pixels are ignored so a blank page does not count as progress.
+WHITE_THRESHOLD = 250
+# Frames are decoded at reduced size; histograms are normalized anyway.
+DECODE_SIZE = (200, 200)
+
+
+def screenshot_frames(events: List[Dict[str, Any]]) -> List[Tuple[float, str]]:
+    frames = [
+        (float(e["ts"]), e["args"]["snapshot"])
+        for e in events
+        if e.get("name") == "Screenshot" and (e.get("args") or {}).get("snapshot")
+    ]
+    frames.sort(key=lambda frame: frame[0])
+    return frames
+
+
+def decode_frames(snapshots: List[str]) -> np.ndarray:
+    """Decode base64 JPEG frames into a uint8 array of shape (frames, pixels, 3)."""
+    from PIL import Image
+
+    decoded = []
+    for snapshot in snapshots:
+        image = Image.open(io.BytesIO(base64.b64decode(snapshot)))
+        # JPEG draft mode decodes straight to a smaller scale
+        image.draft("RGB", DECODE_SIZE)
+        decoded.append(np.asarray(image.convert("RGB").resize(DECODE_SIZE), dtype=np.uint8).reshape(-1, 3))
+    return np.stack(decoded)
+
+
+def histograms(frames: np.ndarray) -> np.ndarray:
+    """Per-frame, per-channel 256-bin histograms, shape (frames, 3, 256)."""
+    count = frames.shape[0]
+    keep = ~np.all(frames >= WHITE_THRESHOLD, axis=2)
+    # One bincount over all frames: bin = frame * 768 + channel * 256 + value
+    offsets = (np.arange(count)[:, None, None] * 768 + np.arange(3)[None, None, :] * 256)
+    bins = (frames.astype(np.int32) + offsets.astype(np.int32))[keep]
+    return np.bincount(bins.ravel(), minlength=count * 768).reshape(count, 3, 256)
+
+
+def visual_progress(hists: np.ndarray) -> np.ndarray:
+    """Progress of every frame from 0.0 (first frame) to 1.0 (last frame)."""
+    initial = hists[0]
+    target = hists[-1]
+    target_diff = np.abs(target - initial)
+    total = target_diff.sum()
+    if total == 0:
+        return np.ones(hists.shape[0])
+    current_diff = np.abs(hists - initial[None])
+    matched = np.minimum(current_diff, target_diff[None]).sum(axis=(1, 2))
+    return matched / total
+
+
+def speed_index(times_ms: np.ndarray, progress: np.ndarray) -> float:
+    """Area above the visual progress curve, in milliseconds."""
+    if times_ms.size < 2:
+        return float(times_ms[0]) if times_ms.size else 0.0
+    intervals = np.diff(times_ms)
+    # Nothing is painted before the first frame
+    return float(np.sum((1.0 - progress[:-1]) * intervals) + times_ms[0])
+
+
+def compute_visual_metrics(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Speed Index, first visual change and visually complete from trace events."""
+    frames = screenshot_frames(events)
+    if not frames:
+        return {'fallback': 'no_frames'}
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return {'fallback': 'pillow_not_installed', 'frames': len(frames)}
+    nav = navigation_start(events)
+    start_us = float(nav["ts"]) if nav else frames[0][0]
+    times_ms = np.maximum(0.0, (np.array([ts for ts, _ in frames]) - start_us) / 1000)
+    progress = visual_progress(histograms(decode_frames([snapshot for _, snapshot in frames])))
+    changed = np.nonzero(progress > 0)[0]
+    complete = np.nonzero(progress >= 1.0 - 1e-9)[0]
+    return {
+        'speed_index': round(speed_index(times_ms, progress), 1),
+        'first_visual_change': round(float(times_ms[changed[0]]), 1) if changed.size else None,
+        'visually_complete': round(float(times_ms[complete[0]]), 1) if complete.size else None,
+        'frames': len(frames),
+        'visual_progress': [[round(float(t), 1), round(float(p) * 100, 1)] for t, p in zip(times_ms, progress)],
+        'fallback': None,
+    }
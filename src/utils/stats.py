@@ -0,0 +1,58 @@
+"""
+Summary statistics for repeated measurements.
+"""
+
+from typing import Dict, List, Optional, Sequence
+import math
+import statistics
+
+
+# Two-sided 95% Student t critical values by degrees of freedom
+_T95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+    10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086, 25: 2.060, 30: 2.042, 60: 2.000, 120: 1.980,
+}
+
+
+def t_critical_95(dof: int) -> float:
+    """Critical value for a 95% interval; rounds dof down to the nearest tabulated value."""
+    if dof <= 0:
+        return math.inf
+    best = max(k for k in _T95 if k <= dof)
+    return _T95[best] if dof <= 120 else 1.960
+
+
+def summarize_samples(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    """Count, mean, median, spread and 95% confidence interval of the mean."""
+    values = [float(v) for v in values]
+    n = len(values)
+    if n == 0:
+        return {'n': 0, 'mean': None, 'median': None, 'stdev': None, 'min': None, 'max': None,
+                'ci95_low': None, 'ci95_high': None}
+    mean = statistics.fmean(values)
+    stdev = statistics.stdev(values) if n > 1 else 0.0
+    margin = t_critical_95(n - 1) * stdev / math.sqrt(n) if n > 1 else math.inf
+    return {
+        'n': n,
+        'mean': round(mean, 2),
+        'median': round(statistics.median(values), 2),
+        'stdev': round(stdev, 2),
+        'min': round(min(values), 2),
+        'max': round(max(values), 2),
+        'ci95_low': round(mean - margin, 2) if n > 1 else None,
+        'ci95_high': round(mean + margin, 2) if n > 1 else None,
+    }
+
+
+def paired_difference(baseline: Sequence[float], variant: Sequence[float]) -> Dict[str, Optional[float]]:
+    """
+    Statistics of ``variant - baseline`` over paired samples.
+
+    ``significant`` is true when the 95% interval of the mean difference
+    excludes zero.
+    """
+    deltas: List[float] = [v - b for b, v in zip(baseline, variant)]
+    summary = summarize_samples(deltas)
+    low, high = summary['ci95_low'], summary['ci95_high']
+    summary['significant'] = low is not None and (low > 0 or high < 0)
+    return summary
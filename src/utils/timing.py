@@ -0,0 +1,157 @@
+"""
+Measurement timing helpers built on monotonic nanosecond clocks.
+
+``timed()`` opens a timing window on ``perf_counter_ns``; ``split()`` marks
+an intermediate point such as the first response byte. The fixed cost of
+opening and closing a window is calibrated once per process and subtracted
+from every reading.
+
+Each reading carries an ``uncertainty_ms``. It is the timer's own error: the
+clock resolution plus the spread of the window overhead during calibration,
+typically well under a microsecond. It does not cover network, server or
+scheduling variance, which dominate real page timings; that needs repeated
+tests of the same page. Windows can optionally
+keep the garbage collector paused so a collection cannot land inside a
+sub-millisecond measurement. Pauses are reference counted across threads, so
+this is only meant for short windows or single-threaded runs: overlapping
+long windows would keep the collector off for as long as any one is open.
+"""
+
+from typing import Any, Optional
+import gc
+import threading
+import time
+
+
+_calibration_lock = threading.Lock()
+_calibration: Optional["Calibration"] = None
+
+_gc_lock = threading.Lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+
+class Calibration:
+    __slots__ = ("overhead_ns", "spread_ns", "resolution_ns")
+
+    def __init__(self, overhead_ns: int, spread_ns: int, resolution_ns: int) -> None:
+        self.overhead_ns = overhead_ns
+        self.spread_ns = spread_ns
+        self.resolution_ns = resolution_ns
+
+    @property
+    def uncertainty_ns(self) -> int:
+        return self.resolution_ns + self.spread_ns
+
+
+def _pause_gc() -> None:
+    global _gc_pauses, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+
+
+def _resume_gc() -> None:
+    global _gc_pauses
+    with _gc_lock:
+        _gc_pauses -= 1
+        if _gc_pauses == 0 and _gc_was_enabled:
+            gc.enable()
+
+
+class TimingWindow:
+    __slots__ = ("pause_gc", "start_ns", "split_ns", "end_ns", "calibration")
+
+    def __init__(self, pause_gc: bool = False) -> None:
+        self.pause_gc = pause_gc
+        self.start_ns = 0
+        self.split_ns = 0
+        self.end_ns = 0
+        self.calibration = calibrate()
+
+    def __enter__(self) -> "TimingWindow":
+        if self.pause_gc:
+            _pause_gc()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        self.end_ns = time.perf_counter_ns()
+        if self.pause_gc:
+            _resume_gc()
+        return False
+
+    def split(self) -> None:
+        """Mark a point inside the open window (the last mark wins)."""
+        self.split_ns = time.perf_counter_ns()
+
+    @property
+    def raw_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+    @property
+    def split_ms(self) -> Optional[float]:
+        """Time from the window start to the mark, overhead removed; None without a mark."""
+        if not self.split_ns:
+            return None
+        return round(max(0, self.split_ns - self.start_ns - self.calibration.overhead_ns) / 1e6, 3)
+
+    @property
+    def elapsed_ns(self) -> int:
+        """Window duration with the calibrated client-side overhead removed."""
+        return max(0, self.raw_ns - self.calibration.overhead_ns)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round(self.elapsed_ns / 1e6, 3)
+
+    @property
+    def uncertainty_ms(self) -> float:
+        """Error added by the timer itself; not the variance of what was measured."""
+        return round(self.calibration.uncertainty_ns / 1e6, 6)
+
+
+class _CalibrationWindow(TimingWindow):
+    """A window that runs the same enter/exit code without needing a calibration."""
+
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        self.pause_gc = False
+        self.start_ns = 0
+        self.split_ns = 0
+        self.end_ns = 0
+        self.calibration = None
+
+
+def calibrate(samples: int = 2000, force: bool = False) -> Calibration:
+    """Measure (once per process) the cost of an empty timing window."""
+    global _calibration
+    # Only ever bound to a finished Calibration, so the unlocked read is safe
+    calibration = _calibration
+    if calibration is not None and not force:
+        return calibration
+    with _calibration_lock:
+        if _calibration is not None and not force:
+            return _calibration
+        info = time.get_clock_info("perf_counter")
+        resolution_ns = max(1, int(info.resolution * 1e9))
+        readings = []
+        for _ in range(samples):
+            window = _CalibrationWindow()
+            with window:
+                pass
+            readings.append(window.raw_ns)
+        readings.sort()
+        median = readings[len(readings) // 2]
+        # Inter-decile range: robust against the odd preempted sample.
+        spread = readings[int(len(readings) * 0.9)] - readings[int(len(readings) * 0.1)]
+        _calibration = Calibration(median, spread, resolution_ns)
+        return _calibration
+
+
+def timed(pause_gc: bool = False) -> TimingWindow:
+    """Return a context manager measuring the enclosed block."""
+    return TimingWindow(pause_gc=pause_gc)
@@ -0,0 +1,165 @@
+"""
+Lightweight stage tracing for the analyzer's own overhead.
+
+Spans are recorded with ``perf_counter_ns`` and can be exported as Chrome
+trace-event JSON (load it in ``chrome://tracing`` or Perfetto) or summarized
+per stage. While tracing is disabled, ``span()`` returns a shared no-op
+context manager, so instrumented code pays one attribute check per stage.
+
+Setting ``NINJA_TRACE=<path>`` enables tracing at import time and writes the
+trace to that path when the process exits.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import atexit
+import json
+import os
+import threading
+import time
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Optional[Dict[str, Any]]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = 0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> bool:
+        end = time.perf_counter_ns()
+        args = self.args
+        if exc_type is not None:
+            args = {**(args or {}), "error": exc_type.__name__}
+        self.tracer._record(self.name, self.start, end - self.start, args)
+        return False
+
+
+# name, start ns, duration ns, thread id, args
+_Event = Tuple[str, int, int, int, Optional[Dict[str, Any]]]
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False, max_events: int = 1_000_000) -> None:
+        self.enabled = enabled
+        self.max_events = max_events
+        self.dropped = 0
+        self._events: List[_Event] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name: str, **args: Any):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args or None)
+
+    def _record(self, name: str, start: int, duration: int, args: Optional[Dict[str, Any]]) -> None:
+        event = (name, start, duration, threading.get_ident(), args)
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                self.dropped += 1
+                return
+            self._events.append(event)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._events.clear()
+            self.dropped = 0
+
+    def events(self) -> List[_Event]:
+        with self._lock:
+            return list(self._events)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        trace = []
+        for name, start, duration, tid, args in self.events():
+            event = {
+                "name": name,
+                "cat": name.split(".", 1)[0],
+                "ph": "X",
+                "ts": (start - self._origin) / 1000,
+                "dur": duration / 1000,
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            trace.append(event)
+        return {"traceEvents": trace, "displayTimeUnit": "ms", "otherData": {"dropped": self.dropped}}
+
+    def export_chrome_trace(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(self.chrome_trace(), fh, default=str)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-stage statistics in milliseconds, slowest total first."""
+        by_name: Dict[str, List[int]] = {}
+        for name, _, duration, _, _ in self.events():
+            by_name.setdefault(name, []).append(duration)
+        rows = []
+        for name, durations in by_name.items():
+            durations.sort()
+            n = len(durations)
+            total = sum(durations)
+            rows.append({
+                "stage": name,
+                "count": n,
+                "total_ms": total / 1e6,
+                "mean_ms": total / n / 1e6,
+                "p50_ms": durations[n // 2] / 1e6,
+                "p95_ms": durations[min(n - 1, int(n * 0.95))] / 1e6,
+                "max_ms": durations[-1] / 1e6,
+            })
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return rows
+
+    def format_summary(self) -> str:
+        header = f"{'stage':<32}{'count':>8}{'total ms':>12}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+        lines = [header, "-" * len(header)]
+        for r in self.summary():
+            lines.append(
+                f"{r['stage']:<32}{r['count']:>8}{r['total_ms']:>12.2f}{r['mean_ms']:>10.2f}"
+                f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['max_ms']:>10.2f}"
+            )
+        return "\n".join(lines)
+
+
+_tracer = Tracer(enabled=bool(os.environ.get("NINJA_TRACE")))
+
+if _tracer.enabled:
+    atexit.register(_tracer.export_chrome_trace, os.environ["NINJA_TRACE"])
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def enable_tracing(enabled: bool = True) -> Tracer:
+    _tracer.enabled = enabled
+    return _tracer
+
+
+def span(name: str, **args: Any):
+    """Context manager timing ``name`` on the process-wide tracer."""
+    if not _tracer.enabled:
+        return _NULL_SPAN
+    return _Span(_tracer, name, args or None)